@@ -0,0 +1,101 @@
+"""
+Benchmark query agregat: count per (source, menit) untuk satu topik dan
+rentang waktu, dihitung dari tabel events (GROUP BY, O(event)) vs dibaca
+dari tabel rollup (O(bucket)). Juga mengukur biaya tulis rollup di
+transaksi consumer (insert dengan vs tanpa update rollup).
+
+Jalankan dari root proyek:
+    python -m benchmarks.aggregate_bench --events 500000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+def make_events(n: int, topics: int, sources: int):
+    from src.records import QueuedEvent
+
+    # ~1000 event per detik timestamp, jadi banyak event berbagi bucket yang sama.
+    return [
+        QueuedEvent(
+            f"topic-{i % topics}",
+            f"{(i * 2654435761) % 2**32:08x}-{i:07d}",
+            f"2025-01-01T{(i // 3600000) % 24:02d}:{(i // 60000) % 60:02d}:{(i // 1000) % 60:02d}.{i % 1000:03d}Z",
+            f"source-{i % sources}",
+            b'{"value": 1}',
+        )
+        for i in range(n)
+    ]
+
+def ingest(path: str, events, batch_size: int, rollups: bool) -> float:
+    import src.main as main
+
+    original = main.apply_rollups
+    if not rollups:
+        main.apply_rollups = lambda cursor, events: None
+    try:
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        main.init_db(conn)
+        start = time.perf_counter()
+        for i in range(0, len(events), batch_size):
+            main.process_batch_in_db(conn, events[i:i + batch_size])
+        elapsed = time.perf_counter() - start
+        conn.close()
+    finally:
+        main.apply_rollups = original
+    return len(events) / elapsed
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=500000)
+    parser.add_argument("--topics", type=int, default=4)
+    parser.add_argument("--sources", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from src.main import app_state
+    from src.rollups import parse_timestamp, query_rollups
+
+    app_state["payload_compress_min_bytes"] = None
+    events = make_events(args.events, args.topics, args.sources)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = ingest(os.path.join(tmp, "plain.db"), events, args.batch_size, rollups=False)
+        path = os.path.join(tmp, "rollup.db")
+        with_rollups = ingest(path, events, args.batch_size, rollups=True)
+        print(f"Insert tanpa rollup : {plain:10.0f} events/s")
+        print(f"Insert dengan rollup: {with_rollups:10.0f} events/s ({(1 - with_rollups / plain) * 100:+.1f}% biaya)")
+
+        conn = sqlite3.connect(path)
+        since, until = "2025-01-01", "2025-01-02"
+
+        def from_events():
+            return conn.execute(
+                "SELECT source, substr(timestamp, 1, 16) AS minute, COUNT(*) FROM events "
+                "WHERE topic = ? AND timestamp >= ? AND timestamp < ? GROUP BY source, minute",
+                ("topic-0", since, until)
+            ).fetchall()
+
+        def from_rollups():
+            return query_rollups(conn, 60, ["topic-0"], None, parse_timestamp(since), parse_timestamp(until), 100000)
+
+        expected = sorted(count for _, _, count in from_events())
+        assert expected == sorted(row[3] for row in from_rollups())
+        buckets = len(expected)
+        print(f"Query {buckets} bucket ({args.events // args.topics} event di topik):")
+        print(f"  GROUP BY events : {timed(from_events, args.repeat):9.2f} ms")
+        print(f"  tabel rollup    : {timed(from_rollups, args.repeat):9.2f} ms")
+        conn.close()
+
+if __name__ == "__main__":
+    main()
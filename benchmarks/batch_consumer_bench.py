@@ -0,0 +1,71 @@
+"""
+Benchmark group commit consumer: events/s untuk berbagai ukuran batch,
+dengan dan tanpa dedup front cache (LRU + Bloom filter).
+
+Jalankan dari root proyek:
+    python -m benchmarks.batch_consumer_bench --events 20000 --sizes 1,10,100,500,1000
+"""
+import argparse
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+def make_events(n: int, duplicate_ratio: float):
+    from src.records import QueuedEvent
+
+    num_unique = int(n * (1 - duplicate_ratio))
+    ids = [str(uuid.uuid4()) for _ in range(num_unique)]
+    ids += ids[: n - num_unique]
+    return [
+        QueuedEvent.from_dict({
+            "topic": "bench",
+            "event_id": event_id,
+            "timestamp": datetime.now().isoformat() + "Z",
+            "source": "benchmark",
+            "payload": {"i": i},
+        })
+        for i, event_id in enumerate(ids)
+    ]
+
+def run(label: str, events, batch_size: int, use_dedup_cache: bool = False) -> float:
+    from src.dedup_cache import DedupIndex
+    from src.main import open_database, process_batch_in_db, process_event_in_db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_FILE"] = os.path.join(tmp, "bench.db")
+        db = open_database()
+        dedup = DedupIndex() if use_dedup_cache else None
+
+        start = time.perf_counter()
+        if batch_size == 0:
+            for event in events:
+                process_event_in_db(db.writer, event)
+        else:
+            for i in range(0, len(events), batch_size):
+                process_batch_in_db(db.writer, events[i:i + batch_size], dedup)
+        elapsed = time.perf_counter() - start
+        db.close()
+
+    rate = len(events) / elapsed
+    print(f"{label:>22}: {rate:>10.0f} events/s ({elapsed:.2f}s)")
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--duplicates", type=float, default=0.20)
+    parser.add_argument("--sizes", default="1,10,100,500,1000")
+    args = parser.parse_args()
+
+    events = make_events(args.events, args.duplicates)
+    print(f"{len(events)} event, {args.duplicates * 100:.0f}% duplikat")
+
+    run("per-event", events, 0)
+    for size in (int(s) for s in args.sizes.split(",")):
+        run(f"batch={size}", events, size)
+        run(f"batch={size} +cache", events, size, use_dedup_cache=True)
+
+if __name__ == "__main__":
+    main()
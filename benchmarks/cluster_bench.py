@@ -0,0 +1,146 @@
+"""
+Benchmark skala ingest mode cluster: 1, 2, dan 4 node aggregator lokal
+(src/cluster.py, proses uvicorn terpisah). Load generator (beberapa proses,
+klien httpx keep-alive) mengirim batch ke semua node secara bergiliran;
+setiap node meneruskan sub-batch ke pemilik key. Diukur laju ack
+`POST /publish` dan laju sampai semua event di-commit menurut /stats
+gabungan, serta pembagian key per node.
+
+`--routing node` (default): klien mengirim ke node mana pun dan node
+meneruskan sub-batch (digabung per node tujuan). `--routing client`:
+klien menghitung pemilik key dengan ring yang sama (HashRing) dan
+mengirim sub-batch langsung ke pemiliknya, tanpa hop tambahan.
+
+Node dan load generator berbagi CPU mesin yang sama, jadi skala hanya
+terlihat jika jumlah core cukup (kira-kira node + proses klien). Di
+mesin 1 CPU throughput justru turun dengan bertambahnya node.
+
+Jalankan dari root proyek:
+    python -m benchmarks.cluster_bench --events 200000 --nodes 1,2,4
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+import httpx
+
+def make_bodies(worker: int, events: int, batch_size: int, topics: int, duplicate_ratio: float, urls, routing: str):
+    """Daftar (index node tujuan atau None = bergiliran, body JSON)."""
+    from src.cluster import HashRing
+
+    ring = HashRing(urls)
+    bodies = []
+    for start in range(0, events, batch_size):
+        chunk = []
+        owners = []
+        for i in range(start, min(start + batch_size, events)):
+            # Sebagian event mengulang key batch sebelumnya (dikirim lewat node lain);
+            # key yang diulang (i % 100 >= 50) sendiri bukan duplikat.
+            key = i - batch_size + 50 if i >= batch_size and (i % 100) < min(duplicate_ratio, 0.5) * 100 else i
+            topic, event_id = f"topic-{key % topics}", f"w{worker}-{key}"
+            chunk.append(json.dumps({
+                "topic": topic, "event_id": event_id,
+                "timestamp": f"2025-01-01T00:{(key // 60000) % 60:02d}:{(key // 1000) % 60:02d}Z",
+                "source": "bench", "payload": {"level": "info", "i": key},
+            }))
+            owners.append(ring.owner(topic, event_id))
+        if routing == "client":
+            for node in sorted(set(owners)):
+                part = [line for line, owner in zip(chunk, owners) if owner == node]
+                bodies.append((node, ("[" + ",".join(part) + "]").encode()))
+        else:
+            bodies.append((None, ("[" + ",".join(chunk) + "]").encode()))
+    return bodies
+
+def run_client(worker: int, urls, events: int, batch_size: int, topics: int, duplicate_ratio: float,
+               concurrency: int, routing: str, start_at: float, results):
+    bodies = make_bodies(worker, events, batch_size, topics, duplicate_ratio, urls, routing)
+
+    async def main():
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+            next_body = iter(enumerate(bodies))
+
+            async def sender():
+                for index, (node, body) in next_body:
+                    url = urls[(worker + index) % len(urls) if node is None else node]
+                    while True:
+                        res = await client.post(url + "/publish", content=body, headers={"Content-Type": "application/json"})
+                        if res.status_code == 200:
+                            break
+                        await asyncio.sleep(float(res.headers.get("retry-after", "0.1")))
+
+            await asyncio.sleep(max(0.0, start_at - time.time()))
+            await asyncio.gather(*(sender() for _ in range(concurrency)))
+        results.put(time.time())
+
+    asyncio.run(main())
+
+def bench(nodes: int, args, base_port: int):
+    from src.cluster import FORWARDED_HEADER, node_urls, start_nodes, stop_nodes
+
+    urls = node_urls(nodes, base_port)
+    total = args.events * args.clients
+    with tempfile.TemporaryDirectory() as tmp:
+        secret = "cluster-bench"
+        processes = start_nodes(nodes, base_port, tmp, env={"CONSUMER_BATCH_SIZE": "1000", "CLUSTER_SECRET": secret})
+        try:
+            context = multiprocessing.get_context("spawn")
+            results = context.Queue()
+            start_at = time.time() + 2.0  # klien selesai membangun body sebelum mulai
+            clients = [
+                context.Process(target=run_client, args=(
+                    worker, urls, args.events, args.batch_size, args.topics, args.duplicates,
+                    args.concurrency, args.routing, start_at, results))
+                for worker in range(args.clients)
+            ]
+            for client in clients:
+                client.start()
+            acked = max(results.get() for _ in clients) - start_at
+            for client in clients:
+                client.join()
+
+            with httpx.Client(timeout=30.0) as client:
+                while True:
+                    stats = client.get(urls[0] + "/stats").json()
+                    if stats["unique_processed"] + stats["duplicate_dropped"] >= total:
+                        break
+                    time.sleep(0.02)
+                committed = time.time() - start_at
+                per_node = [client.get(url + "/stats", headers={FORWARDED_HEADER: secret}).json()["unique_processed"]
+                            for url in urls]
+        finally:
+            stop_nodes(processes)
+    return total, acked, committed, stats, per_node
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100000, help="event per proses klien")
+    parser.add_argument("--clients", type=int, default=2, help="jumlah proses load generator")
+    parser.add_argument("--concurrency", type=int, default=16, help="request paralel per proses klien")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--topics", type=int, default=16)
+    parser.add_argument("--duplicates", type=float, default=0.2, help="porsi event yang mengulang key lama")
+    parser.add_argument("--nodes", default="1,2,4")
+    parser.add_argument("--routing", choices=("node", "client"), default="node",
+                        help="node = node meneruskan ke pemilik key, client = klien mengirim langsung ke pemilik")
+    parser.add_argument("--base-port", type=int, default=18300)
+    args = parser.parse_args()
+
+    print(f"{args.clients} klien x {args.events} event (batch {args.batch_size}, {args.duplicates:.0%} duplikat), "
+          f"routing {args.routing}, {os.cpu_count()} CPU")
+    baseline = None
+    for nodes in (int(n) for n in args.nodes.split(",")):
+        total, acked, committed, stats, per_node = bench(nodes, args, args.base_port)
+        rate = total / committed
+        baseline = baseline or rate
+        print(f"  {nodes} node: ack {total / acked:9.0f} event/s, commit {rate:9.0f} event/s "
+              f"({rate / baseline:.2f}x), unik {stats['unique_processed']}, duplikat {stats['duplicate_dropped']}, "
+              f"key per node {per_node}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark filter field payload: "event topik X dengan payload.level ==
+'error'" dijawab lewat tabel payload_index (range scan PK) vs membaca
+seluruh topik lalu mem-parse payload di Python (yang selama ini dilakukan
+klien). Juga mengukur biaya tulis index di transaksi consumer.
+
+Jalankan dari root proyek:
+    python -m benchmarks.payload_index_bench --events 200000
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+LEVELS = ("debug", "info", "info", "info", "warn", "info", "info", "info", "info", "info",
+          "info", "info", "info", "info", "info", "info", "info", "info", "info", "error")
+
+def make_events(n: int, topics: int):
+    from src.records import QueuedEvent
+
+    return [
+        QueuedEvent(
+            f"topic-{i % topics}",
+            f"{(i * 2654435761) % 2**32:08x}-{i:07d}",
+            f"2025-01-01T{(i // 3600000) % 24:02d}:{(i // 60000) % 60:02d}:{(i // 1000) % 60:02d}.{i % 1000:03d}Z",
+            "bench",
+            json.dumps({"level": LEVELS[(i // topics) % len(LEVELS)], "user": {"id": i % 1000}, "msg": "x" * 64}).encode(),
+        )
+        for i in range(n)
+    ]
+
+def ingest(path: str, events, batch_size: int, fields) -> float:
+    import src.main as main
+
+    main.app_state["indexed_fields"] = fields
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    main.init_db(conn)
+    start = time.perf_counter()
+    for i in range(0, len(events), batch_size):
+        main.process_batch_in_db(conn, events[i:i + batch_size])
+    elapsed = time.perf_counter() - start
+    conn.close()
+    main.app_state["indexed_fields"] = {}
+    return len(events) / elapsed
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--topics", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=100, help="ukuran halaman GET /events")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from src.main import app_state, fetch_events
+    from src.payload_index import sync_index_fields
+
+    app_state["payload_compress_min_bytes"] = None
+    events = make_events(args.events, args.topics)
+    fields = {f"topic-{t}": ("level", "user.id") for t in range(args.topics)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = ingest(os.path.join(tmp, "plain.db"), events, args.batch_size, {})
+        path = os.path.join(tmp, "indexed.db")
+        indexed = ingest(path, events, args.batch_size, fields)
+        print(f"Insert tanpa index : {plain:10.0f} events/s")
+        print(f"Insert dengan index: {indexed:10.0f} events/s ({(1 - indexed / plain) * 100:+.1f}% biaya, 2 field)")
+
+        conn = sqlite3.connect(path)
+        sync_index_fields(conn, fields, fields)
+        conn.execute("UPDATE payload_index_fields SET ready = 1")
+        conn.commit()
+
+        def full_scan():
+            # Seluruh topik dibaca per halaman lalu difilter di sisi klien.
+            matches, after = [], None
+            while True:
+                page = fetch_events(conn, "topic-0", after, None, None, 1000)
+                matches.extend(row for row in page if json.loads(row[4]).get("level") == "error")
+                if len(page) < 1000:
+                    return matches
+                after = (page[-1][2], page[-1][1])
+
+        def index_lookup():
+            matches, after = [], None
+            while True:
+                page = fetch_events(conn, "topic-0", after, None, None, 1000, [("level", "error")])
+                matches.extend(page)
+                if len(page) < 1000:
+                    return matches
+                after = (page[-1][2], page[-1][1])
+
+        assert [row[1] for row in full_scan()] == [row[1] for row in index_lookup()]
+        first_page = lambda: fetch_events(conn, "topic-0", None, None, None, args.limit, [("level", "error")])
+        print(f"Filter level=error ({len(index_lookup())} dari {args.events // args.topics} event di topik):")
+        print(f"  scan topik + filter klien : {timed(full_scan, args.repeat):9.2f} ms")
+        print(f"  payload_index (semua)     : {timed(index_lookup, args.repeat):9.2f} ms")
+        print(f"  payload_index (limit {args.limit:<4}): {timed(first_page, args.repeat):9.2f} ms")
+        conn.close()
+
+if __name__ == "__main__":
+    main()
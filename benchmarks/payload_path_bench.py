@@ -0,0 +1,89 @@
+"""
+Benchmark jalur payload: path lama (json.dumps saat tulis, json.loads per
+baris saat baca, lalu di-serialize ulang oleh FastAPI) vs fast path
+(payload di-encode sekali, disimpan apa adanya, disisipkan ke respons).
+
+Jalankan dari root proyek:
+    python -m benchmarks.payload_path_bench --events 2000 --sizes 1024,65536
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+def make_payload(size: int) -> dict:
+    # Payload bersarang realistis, bukan satu string besar
+    item = {"key": "k" * 16, "value": 12345.678, "tags": ["a", "b", "c"], "ok": True}
+    per_item = len(json.dumps(item))
+    return {"items": [dict(item, key=f"k{i:015d}") for i in range(max(1, size // per_item))]}
+
+def old_path(conn, raw_events) -> float:
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from src.main import Event
+
+    start = time.perf_counter()
+    events = [Event(**e) for e in raw_events]
+    with conn:
+        conn.executemany(
+            "INSERT INTO old_events (topic, event_id, timestamp, source, payload) VALUES (?, ?, ?, ?, ?)",
+            [(e.topic, e.event_id, e.timestamp, e.source, json.dumps(e.payload)) for e in events]
+        )
+    rows = []
+    for topic, event_id, timestamp, source, payload in conn.execute("SELECT * FROM old_events"):
+        rows.append({"topic": topic, "event_id": event_id, "timestamp": timestamp, "source": source, "payload": json.loads(payload)})
+    JSONResponse(jsonable_encoder({"topic": "bench", "events": rows}))
+    return time.perf_counter() - start
+
+def fast_path(conn, raw_events) -> float:
+    from src.main import encode_payload_for_storage, fetch_events, render_event
+    from src.records import QueuedEvent
+
+    start = time.perf_counter()
+    events = [QueuedEvent.from_dict(e) for e in raw_events]
+    with conn:
+        conn.executemany(
+            "INSERT INTO events (topic, event_id, timestamp, source, payload) VALUES (?, ?, ?, ?, ?)",
+            [(e.topic, e.event_id, e.timestamp, e.source, encode_payload_for_storage(e.payload)) for e in events]
+        )
+    rows = fetch_events(conn, "bench")
+    b"".join((b'{"topic": "bench", "events": [', b", ".join(render_event(row) for row in rows), b"]}"))
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--sizes", default="1024,65536")
+    parser.add_argument("--compress", action="store_true", help="aktifkan PAYLOAD_COMPRESSION=zlib pada fast path")
+    args = parser.parse_args()
+
+    from src.main import app_state, init_db
+    from src.db import Database
+
+    app_state["payload_compress_min_bytes"] = 1024 if args.compress else None
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        payload = make_payload(size)
+        def events():
+            return [{"topic": "bench", "event_id": str(i), "timestamp": "2025-01-01T00:00:00Z", "source": "bench", "payload": payload}
+                    for i in range(args.events)]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(os.path.join(tmp, "bench.db"))
+            conn = db.open_writer()
+            init_db(conn)
+            conn.execute("CREATE TABLE old_events (topic TEXT, event_id TEXT, timestamp TEXT, source TEXT, payload TEXT)")
+
+            old = old_path(conn, events())
+            fast = fast_path(conn, events())
+            file_size = os.path.getsize(db.path) + os.path.getsize(db.path + "-wal")
+            db.close()
+
+        actual = len(json.dumps(payload))
+        print(f"payload ~{actual / 1024:.0f} KiB x {args.events}: "
+              f"lama {args.events / old:>8.0f} ev/s | fast path {args.events / fast:>8.0f} ev/s "
+              f"({old / fast:.1f}x), file {file_size / 1e6:.1f} MB")
+
+if __name__ == "__main__":
+    main()
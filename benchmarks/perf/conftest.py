@@ -0,0 +1,143 @@
+"""
+Harness suite benchmark regresi (dijalankan lewat pytest, terpisah dari
+tests/ karena butuh waktu & DB besar):
+
+    python -m pytest benchmarks/perf -q
+    python -m pytest benchmarks/perf -q --perf-threshold 0.3 --perf-report perf.json
+    python -m pytest benchmarks/perf -q --perf-update-baseline
+
+Setiap benchmark mengukur beberapa putaran; waktu per operasi yang
+dibandingkan adalah putaran tercepat (paling sedikit terganggu proses
+lain, seperti saran `timeit`), median ikut dicatat di laporan. Benchmark
+gagal jika lebih lambat dari baseline * (1 + threshold). Threshold per benchmark
+bisa ditimpa di bagian "thresholds" file baseline.
+"""
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def pytest_addoption(parser):
+    group = parser.getgroup("perf", "benchmark regresi")
+    group.addoption("--perf-baseline", default=os.getenv("PERF_BASELINE", os.path.join(HERE, "baseline.json")),
+                    help="file baseline JSON (default benchmarks/perf/baseline.json)")
+    group.addoption("--perf-report", default=os.getenv("PERF_REPORT", "perf_report.json"),
+                    help="file laporan JSON hasil run ini")
+    group.addoption("--perf-threshold", type=float, default=float(os.getenv("PERF_THRESHOLD", "1.0")),
+                    help="batas regresi relatif default (1.0 = gagal jika lebih dari 2x lebih lambat)")
+    group.addoption("--perf-update-baseline", action="store_true",
+                    help="tulis hasil run ini sebagai baseline baru (tanpa membandingkan)")
+    group.addoption("--perf-large-rows", type=int, default=int(os.getenv("PERF_LARGE_ROWS", "1000000")),
+                    help="jumlah baris DB besar untuk benchmark baca & startup")
+
+class PerfRecorder:
+    def __init__(self, baseline: Dict, threshold: float, update: bool):
+        self.baseline = baseline.get("results", {})
+        self.thresholds = baseline.get("thresholds", {})
+        self.threshold = threshold
+        self.update = update
+        self.results = {}
+
+    def measure(self, name: str, fn: Callable[[], object], ops: int = 1, rounds: int = 5, warmup: int = 1) -> float:
+        """
+        Menjalankan `fn` (satu putaran = `ops` operasi) sebanyak `warmup` +
+        `rounds` kali, mencatat detik per operasi, lalu gagal jika putaran
+        tercepat melewati threshold terhadap baseline.
+        """
+        for _ in range(warmup):
+            fn()
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) / ops)
+        best = min(samples)
+
+        result = {"min_s": best, "median_s": statistics.median(samples), "rounds": rounds, "ops_per_round": ops}
+        baseline = self.baseline.get(name)
+        threshold = self.thresholds.get(name, self.threshold)
+        if baseline is not None:
+            result.update(baseline_s=baseline["min_s"], ratio=best / baseline["min_s"], threshold=threshold)
+        self.results[name] = result
+
+        if baseline is not None and not self.update and best > baseline["min_s"] * (1 + threshold):
+            pytest.fail(
+                f"Regresi {name}: {best * 1e6:.1f} us/op vs baseline {baseline['min_s'] * 1e6:.1f} us/op "
+                f"({best / baseline['min_s']:.2f}x, batas {1 + threshold:.2f}x)"
+            )
+        return best
+
+@pytest.fixture(scope="session")
+def perf(request):
+    config = request.config
+    baseline_path = config.getoption("--perf-baseline")
+    baseline = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+    recorder = PerfRecorder(baseline, config.getoption("--perf-threshold"), config.getoption("--perf-update-baseline"))
+    yield recorder
+
+    machine = {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+    report = {
+        "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "machine": machine,
+        "results": recorder.results,
+    }
+    with open(config.getoption("--perf-report"), "w") as f:
+        json.dump(report, f, indent=2)
+
+    if recorder.update:
+        results = dict(recorder.baseline)
+        results.update({name: {"min_s": r["min_s"]} for name, r in recorder.results.items()})
+        with open(baseline_path, "w") as f:
+            json.dump({"machine": machine, "thresholds": recorder.thresholds, "results": dict(sorted(results.items()))}, f, indent=2)
+            f.write("\n")
+
+@pytest.fixture(scope="session")
+def large_rows(request) -> int:
+    return request.config.getoption("--perf-large-rows")
+
+def build_large_db(path: str, rows: int, small_rows: int = 10000, tiny_topics: int = 1000):
+    """
+    DB berisi topik "large" (`rows` event), "small" (`small_rows` event),
+    dan `tiny_topics` topik kecil (10 event). Baris ditulis langsung dengan
+    executemany lalu index, topic_stats, dan rollup dibangun oleh init_db,
+    jauh lebih cepat daripada lewat consumer.
+    """
+    import sqlite3
+    from src.main import EVENTS_TABLE_SQL, init_db
+
+    payload = json.dumps({"level": "info", "msg": "x" * 100})
+
+    def generate():
+        for i in range(rows):
+            yield ("large", f"{i:09d}", f"2025-01-01T{(i // 3600000) % 24:02d}:{(i // 60000) % 60:02d}:{(i // 1000) % 60:02d}.{i % 1000:03d}Z", "perf", payload)
+        for i in range(small_rows):
+            yield ("small", f"{i:09d}", f"2025-01-01T00:{(i // 60000) % 60:02d}:{(i // 1000) % 60:02d}.{i % 1000:03d}Z", "perf", payload)
+        for t in range(tiny_topics):
+            for i in range(10):
+                yield (f"tiny-{t}", f"{i:09d}", f"2025-01-01T00:00:0{i}Z", "perf", payload)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute(EVENTS_TABLE_SQL)
+    with conn:
+        conn.executemany("INSERT INTO events (topic, event_id, timestamp, source, payload) VALUES (?, ?, ?, ?, ?)", generate())
+    init_db(conn)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+@pytest.fixture(scope="session")
+def large_db(tmp_path_factory, large_rows) -> str:
+    path = str(tmp_path_factory.mktemp("perf") / "large.db")
+    build_large_db(path, large_rows)
+    return path
@@ -0,0 +1,45 @@
+import asyncio
+import itertools
+import pytest
+from benchmarks.perf.ingest_perf_test import make_events
+
+async def call(fn, *args):
+    return await fn(*args)
+
+@pytest.fixture(params=["sqlite", "log"])
+def engine(request, monkeypatch, tmp_path):
+    from src.main import configure_payload_storage, open_storage
+
+    monkeypatch.setenv("STORAGE_ENGINE", request.param)
+    configure_payload_storage()
+    storage = open_storage(str(tmp_path / "engine.db"))
+    loop = asyncio.new_event_loop()
+    # Engine menjadwalkan kerja dari dalam event loop (seperti consumer).
+    yield request.param, storage, lambda fn, *args: loop.run_until_complete(call(fn, *args))
+    storage.close()
+    loop.close()
+
+def test_engine_insert_and_scan(perf, engine):
+    """StorageEngine: insert-if-absent 500 event (20% duplikat) dan halaman scan 100 event."""
+    name, storage, run = engine
+    rounds = itertools.count()
+    previous = []
+
+    def insert_batch():
+        nonlocal previous
+        events = make_events(f"engine-{next(rounds)}", 400) + previous[:100]
+        run(storage.insert_if_absent, events)
+        previous = events
+
+    perf.measure(f"engine_{name}_insert_batch500", insert_batch, ops=500, rounds=10)
+
+    run(storage.insert_if_absent, make_events("scan", 10000, topic="scan"))
+
+    def pages():
+        after = None
+        for _ in range(20):
+            page = run(storage.scan_topic, "scan", after, None, None, 100)
+            assert len(page) == 100
+            after = (page[-1][2], page[-1][1])
+
+    perf.measure(f"engine_{name}_scan_page100", pages, ops=20)
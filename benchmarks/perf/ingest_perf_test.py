@@ -0,0 +1,84 @@
+import itertools
+import json
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+
+def make_events(prefix: str, n: int, topic: str = "perf"):
+    from src.records import QueuedEvent
+
+    payload = json.dumps({"level": "info", "msg": "x" * 100}).encode()
+    return [QueuedEvent(topic, f"{prefix}-{i}", "2025-01-01T00:00:00Z", "perf", payload) for i in range(n)]
+
+@pytest.fixture
+def writer_conn(tmp_path):
+    from src.main import init_db
+
+    conn = sqlite3.connect(tmp_path / "ingest.db")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    init_db(conn)
+    yield conn
+    conn.close()
+
+def test_dedup_insert_single_event(perf, writer_conn):
+    """process_event_in_db: satu transaksi per event, event baru & duplikat."""
+    from src.main import process_event_in_db
+
+    rounds = itertools.count()
+    seen = []
+
+    def insert_new():
+        events = make_events(f"single-{next(rounds)}", 200)
+        for event in events:
+            assert process_event_in_db(writer_conn, event)
+        seen.extend(events)
+
+    def insert_duplicates():
+        for event in seen[:200]:
+            assert not process_event_in_db(writer_conn, event)
+
+    perf.measure("dedup_insert_single_new", insert_new, ops=200)
+    perf.measure("dedup_insert_single_duplicate", insert_duplicates, ops=200)
+
+@pytest.mark.parametrize("bloom", [False, True], ids=["probe", "bloom"])
+def test_dedup_insert_batch(perf, writer_conn, bloom):
+    """process_batch_in_db: group commit 500 event (20% duplikat dari batch sebelumnya)."""
+    from src.dedup_cache import DedupIndex
+    from src.main import process_batch_in_db
+
+    dedup = DedupIndex() if bloom else None
+    rounds = itertools.count()
+    previous = []
+
+    def insert_batch():
+        nonlocal previous
+        events = make_events(f"batch-{next(rounds)}", 400) + previous[:100]
+        process_batch_in_db(writer_conn, events, dedup)
+        previous = events
+
+    perf.measure(f"dedup_insert_batch500_{'bloom' if bloom else 'probe'}", insert_batch, ops=500, rounds=10)
+
+@pytest.mark.parametrize("size", [1, 100, 10000])
+def test_publish_request(perf, monkeypatch, tmp_path, size):
+    """POST /publish: parse, validasi, dan enqueue satu batch (per request)."""
+    monkeypatch.setenv("DATABASE_FILE", str(tmp_path / "publish.db"))
+    from src.main import app
+
+    requests = 50 if size < 10000 else 3
+    bodies = iter([
+        json.dumps([
+            {"topic": f"topic-{i % 8}", "event_id": f"r{r}-{i}", "timestamp": "2025-01-01T00:00:00Z",
+             "source": "perf", "payload": {"level": "info", "i": i}}
+            for i in range(size)
+        ]).encode()
+        for r in range((requests) * 6)
+    ])
+
+    with TestClient(app) as client:
+        def publish():
+            for _ in range(requests):
+                res = client.post("/publish", content=next(bodies), headers={"Content-Type": "application/json"})
+                assert res.status_code == 200
+
+        perf.measure(f"publish_batch_{size}", publish, ops=requests)
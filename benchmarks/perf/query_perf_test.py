@@ -0,0 +1,57 @@
+import sqlite3
+import time
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="module")
+def large_client(large_db):
+    mp = pytest.MonkeyPatch()
+    mp.setenv("DATABASE_FILE", large_db)
+    from src.main import app, app_state
+
+    with TestClient(app) as client:
+        # Tunggu scan Bloom filter (background, memindai semua key) selesai
+        # agar tidak ikut terukur.
+        while any(partition.dedup_loader is not None and not partition.dedup_loader.done()
+                  for partition in app_state["partitions"]):
+            time.sleep(0.05)
+        yield client
+    mp.undo()
+
+def middle_cursor(path: str, topic: str) -> str:
+    from src.main import encode_cursor
+
+    conn = sqlite3.connect(path)
+    count = conn.execute("SELECT unique_count FROM topic_stats WHERE topic = ?", (topic,)).fetchone()[0]
+    timestamp, event_id = conn.execute(
+        "SELECT timestamp, event_id FROM events WHERE topic = ? ORDER BY timestamp, event_id LIMIT 1 OFFSET ?",
+        (topic, count // 2)
+    ).fetchone()
+    conn.close()
+    return encode_cursor(timestamp, event_id)
+
+@pytest.mark.parametrize("topic", ["small", "large"], ids=["10k", "large"])
+def test_events_pages(perf, large_client, large_db, topic):
+    """GET /events: halaman pertama, halaman di tengah topik (cursor), dan filter since/until."""
+    cursor = middle_cursor(large_db, topic)
+    label = "10k" if topic == "small" else "large"
+
+    def page(params):
+        def run():
+            for _ in range(20):
+                res = large_client.get("/events", params=params)
+                assert res.status_code == 200 and len(res.json()["events"]) == 100
+        return run
+
+    perf.measure(f"events_first_page_{label}", page({"topic": topic, "limit": 100}), ops=20)
+    perf.measure(f"events_deep_page_{label}", page({"topic": topic, "limit": 100, "after": cursor}), ops=20)
+    perf.measure(f"events_since_page_{label}", page({"topic": topic, "limit": 100, "since": "2025-01-01T00:00:05Z",
+                                                     "until": "2025-01-01T00:00:06Z"}), ops=20)
+
+def test_events_full_topic_ndjson(perf, large_client):
+    """GET /events?format=ndjson: membaca seluruh topik 10k event."""
+    def stream():
+        res = large_client.get("/events", params={"topic": "small", "format": "ndjson"})
+        assert res.status_code == 200 and res.text.count("\n") == 10000
+
+    perf.measure("events_ndjson_10k", stream, rounds=5)
@@ -0,0 +1,18 @@
+def test_load_initial_stats_large_db(perf, monkeypatch, large_db):
+    """load_initial_stats & open_partitions pada DB besar (harus O(topik), bukan O(event))."""
+    monkeypatch.setenv("DATABASE_FILE", large_db)
+    from src.main import app_state, load_initial_stats, open_partitions
+
+    partitions = open_partitions()
+    try:
+        perf.measure("startup_load_initial_stats", lambda: load_initial_stats(partitions), rounds=10)
+        assert len(app_state["stats"]["topics"]) == 1002
+    finally:
+        for partition in partitions:
+            partition.db.close()
+
+    def open_close():
+        for partition in open_partitions():
+            partition.db.close()
+
+    perf.measure("startup_open_partitions", open_close, rounds=5)
@@ -0,0 +1,73 @@
+"""
+Benchmark memori & throughput validasi untuk backlog event di queue:
+model Pydantic `Event` (jalur lama List[Event]) vs `QueuedEvent` (__slots__
++ payload byte) dari `parse_event_batch`.
+
+Jalankan dari root proyek:
+    python -m benchmarks.queue_memory_bench --events 100000
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+import uuid
+
+def make_body(n: int) -> bytes:
+    return json.dumps([
+        {
+            "topic": "bench",
+            "event_id": str(uuid.uuid4()),
+            "timestamp": "2025-01-01T00:00:00Z",
+            "source": "benchmark",
+            "payload": {"run_id": str(uuid.uuid4()), "seq": i, "tags": ["a", "b"], "ok": True},
+        }
+        for i in range(n)
+    ]).encode()
+
+def measure(label: str, parse, body: bytes, n: int):
+    # Throughput diukur tanpa tracemalloc (tracemalloc memperlambat alokasi Python)
+    gc.collect()
+    start = time.perf_counter()
+    events = parse(body)
+    elapsed = time.perf_counter() - start
+    assert len(events) == n
+    del events
+
+    gc.collect()
+    tracemalloc.start()
+    events = parse(body)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del events
+    print(f"{label:>28}: {n / elapsed:>9.0f} event/s validasi, {current / 1e6:>7.1f} MB ditahan ({current / n:.0f} B/event)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100000)
+    args = parser.parse_args()
+
+    from typing import List
+    from pydantic import TypeAdapter
+    from src.main import Event
+    from src.records import parse_event_batch
+
+    body = make_body(args.events)
+    print(f"{args.events} event, body {len(body) / 1e6:.1f} MB")
+
+    adapter = TypeAdapter(List[Event])
+    # FastAPI: json.loads body lalu validasi List[Event]
+    measure("List[Event] (Pydantic)", lambda b: adapter.validate_python(json.loads(b)), body, args.events)
+
+    def pydantic_with_payload(b):
+        # Setara fungsional: jalur lama tetap harus json.dumps payload sebelum ditulis
+        events = adapter.validate_python(json.loads(b))
+        for event in events:
+            json.dumps(event.payload)
+        return events
+
+    measure("List[Event] + encode payload", pydantic_with_payload, body, args.events)
+    measure("QueuedEvent (__slots__)", parse_event_batch, body, args.events)
+
+if __name__ == "__main__":
+    main()
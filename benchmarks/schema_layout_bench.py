@@ -0,0 +1,113 @@
+"""
+Benchmark layout penyimpanan: dua tabel (dedup_store + processed_events,
+layout lama) vs satu tabel `events` WITHOUT ROWID. Mengukur laju insert
+consumer (group commit, tanpa dedup cache) dan ukuran file akhir.
+
+Jalankan dari root proyek:
+    python -m benchmarks.schema_layout_bench --events 1000000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+
+SPLIT_SCHEMA = """
+CREATE TABLE dedup_store (
+    topic TEXT,
+    event_id TEXT,
+    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (topic, event_id)
+);
+CREATE TABLE processed_events (
+    topic TEXT,
+    event_id TEXT,
+    timestamp TEXT,
+    source TEXT,
+    payload TEXT,
+    UNIQUE(topic, event_id)
+);
+CREATE INDEX idx_processed_events_topic_time ON processed_events (topic, timestamp, event_id);
+CREATE TABLE topic_stats (topic TEXT PRIMARY KEY, unique_count INTEGER NOT NULL, first_seen TIMESTAMP, last_seen TIMESTAMP);
+"""
+
+def split_write_batch(conn: sqlite3.Connection, events) -> int:
+    """Jalur tulis layout lama: insert key ke dedup_store, lalu event ke processed_events."""
+    new_per_topic = Counter()
+    with conn:
+        cursor = conn.cursor()
+        for event in events:
+            cursor.execute("INSERT OR IGNORE INTO dedup_store (topic, event_id) VALUES (?, ?)", (event.topic, event.event_id))
+            if cursor.rowcount == 0:
+                continue
+            cursor.execute(
+                "INSERT INTO processed_events (topic, event_id, timestamp, source, payload) VALUES (?, ?, ?, ?, ?)",
+                (event.topic, event.event_id, event.timestamp, event.source, event.payload.decode())
+            )
+            new_per_topic[event.topic] += 1
+        cursor.executemany(
+            "INSERT INTO topic_stats (topic, unique_count, first_seen, last_seen) "
+            "VALUES (?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP) "
+            "ON CONFLICT(topic) DO UPDATE SET unique_count = unique_count + excluded.unique_count, "
+            "last_seen = excluded.last_seen",
+            new_per_topic.items()
+        )
+    return sum(new_per_topic.values())
+
+def make_events(n: int, topics: int):
+    from src.records import QueuedEvent
+
+    return [
+        QueuedEvent.from_dict({
+            "topic": f"topic-{i % topics}",
+            "event_id": f"{(i * 2654435761) % 2**32:08x}-{i:07d}",  # urutan acak seperti UUID
+            "timestamp": f"2025-01-01T00:{(i // 60000) % 60:02d}:{(i // 1000) % 60:02d}.{i % 1000:03d}Z",
+            "source": "benchmark",
+            "payload": {"i": i, "user": f"user-{i % 5000}", "value": i * 0.5},
+        })
+        for i in range(n)
+    ]
+
+def run(label: str, events, batch_size: int, layout: str):
+    from src.main import app_state, init_db, process_batch_in_db
+
+    app_state["payload_compress_min_bytes"] = None
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        if layout == "split":
+            conn.executescript(SPLIT_SCHEMA)
+            write = split_write_batch
+        else:
+            init_db(conn)
+            write = process_batch_in_db
+
+        start = time.perf_counter()
+        for i in range(0, len(events), batch_size):
+            write(conn, events[i:i + batch_size])
+        elapsed = time.perf_counter() - start
+
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.close()
+        file_size = os.path.getsize(path)
+
+    print(f"{label:>28}: {len(events) / elapsed:>9.0f} events/s ({elapsed:.1f}s), file {file_size / 1e6:.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--topics", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    events = make_events(args.events, args.topics)
+    print(f"{len(events)} event unik, {args.topics} topik, batch={args.batch}")
+
+    run("dedup_store + processed_events", events, args.batch, "split")
+    run("events WITHOUT ROWID", events, args.batch, "single")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark memindahkan seluruh isi aggregator ke node baru: snapshot
+export + import segmen (src/snapshot.py) vs cara lama, yaitu membaca
+setiap topik lewat halaman GET /events (render JSON per baris) lalu
+mem-publish ulang lewat consumer (process_batch_in_db).
+
+Jalankan dari root proyek:
+    python -m benchmarks.snapshot_bench --events 200000
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+def build_source(path: str, n: int, topics: int, batch_size: int):
+    import src.main as main
+    from src.records import QueuedEvent
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    main.init_db(conn)
+    payload = json.dumps({"value": 1, "msg": "x" * 200}).encode()
+    for start in range(0, n, batch_size):
+        main.process_batch_in_db(conn, [
+            QueuedEvent(f"topic-{i % topics}", f"{i:09d}", f"2025-01-01T00:{(i // 60000) % 60:02d}:{(i // 1000) % 60:02d}Z", "bench", payload)
+            for i in range(start, min(start + batch_size, n))
+        ])
+    conn.close()
+
+def republish(source: str, target: str, batch_size: int) -> int:
+    """Cara lama: halaman /events per topik -> JSON -> /publish -> consumer."""
+    import src.main as main
+    from src.records import QueuedEvent
+
+    src_conn = sqlite3.connect(source)
+    dst_conn = sqlite3.connect(target)
+    dst_conn.execute("PRAGMA journal_mode = WAL")
+    dst_conn.execute("PRAGMA synchronous = NORMAL")
+    main.init_db(dst_conn)
+    moved = 0
+    for (topic,) in src_conn.execute("SELECT topic FROM topic_stats").fetchall():
+        after = None
+        while True:
+            page = main.fetch_events(src_conn, topic, after, None, None, batch_size)
+            if not page:
+                break
+            body = b"[" + b",".join(main.render_event(row) for row in page) + b"]"
+            batch = [QueuedEvent(e["topic"], e["event_id"], e["timestamp"], e["source"], json.dumps(e["payload"]).encode())
+                     for e in json.loads(body)]
+            main.process_batch_in_db(dst_conn, batch)
+            moved += len(batch)
+            after = (page[-1][2], page[-1][1])
+    src_conn.close()
+    dst_conn.close()
+    return moved
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--topics", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--segment-rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    from src.main import app_state
+    from src.snapshot import export_snapshot, import_snapshot
+
+    app_state["payload_compress_min_bytes"] = None
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source.db")
+        build_source(source, args.events, args.topics, args.batch_size)
+        db_bytes = os.path.getsize(source)
+
+        start = time.perf_counter()
+        manifest = export_snapshot([source], os.path.join(tmp, "snap"), args.segment_rows)
+        exported = time.perf_counter() - start
+        start = time.perf_counter()
+        total, inserted = import_snapshot(os.path.join(tmp, "snap"), [os.path.join(tmp, "imported.db")])
+        imported = time.perf_counter() - start
+        assert total == inserted == args.events
+
+        start = time.perf_counter()
+        assert republish(source, os.path.join(tmp, "republished.db"), args.batch_size) == args.events
+        republished = time.perf_counter() - start
+
+        size = sum(segment["bytes"] for segment in manifest["segments"])
+        print(f"{args.events} event, DB sumber {db_bytes / 1e6:.1f} MB, snapshot {size / 1e6:.1f} MB "
+              f"({len(manifest['segments'])} segmen)")
+        print(f"  snapshot export        : {exported:7.2f} s ({args.events / exported:10.0f} baris/s)")
+        print(f"  snapshot import        : {imported:7.2f} s ({args.events / imported:10.0f} baris/s)")
+        print(f"  /events + publish ulang: {republished:7.2f} s ({args.events / republished:10.0f} baris/s)")
+
+if __name__ == "__main__":
+    main()
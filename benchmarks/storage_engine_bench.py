@@ -0,0 +1,121 @@
+"""
+Benchmark dua storage engine (STORAGE_ENGINE=sqlite vs log) lewat
+antarmuka yang sama dengan yang dipakai consumer dan GET /events:
+insert-if-absent per batch (dengan duplikat), halaman scan topik, scan
+penuh satu topik, dan waktu buka ulang (startup). Untuk engine log,
+startup diukur dengan snapshot index dan dengan replay seluruh log.
+
+Jalankan dari root proyek:
+    python -m benchmarks.storage_engine_bench --events 200000
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+def make_batches(n: int, topics: int, batch_size: int, duplicate_ratio: float):
+    from src.records import QueuedEvent
+
+    payload = json.dumps({"level": "info", "msg": "x" * 100}).encode()
+    duplicates = int(batch_size * duplicate_ratio)
+    batches = []
+    previous = []
+    for start in range(0, n, batch_size - duplicates):
+        events = [
+            QueuedEvent(f"topic-{i % topics}", f"{i:09d}", f"2025-01-01T00:{(i // 60000) % 60:02d}:{(i // 1000) % 60:02d}Z",
+                        "bench", payload)
+            for i in range(start, min(start + batch_size - duplicates, n))
+        ]
+        batches.append(events + previous[:duplicates])
+        previous = events
+    return batches
+
+def directory_bytes(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+async def run_engine(storage, batches, topics: int, pages: int):
+    started = time.perf_counter()
+    for batch in batches:
+        await storage.insert_if_absent(batch)
+    inserted = time.perf_counter() - started
+
+    started = time.perf_counter()
+    after = None
+    for _ in range(pages):
+        page = await storage.scan_topic("topic-0", after, None, None, 100)
+        after = (page[-1][2], page[-1][1])
+    paged = (time.perf_counter() - started) / pages
+
+    started = time.perf_counter()
+    rows = 0
+    after = None
+    while True:
+        page = await storage.scan_topic("topic-1", after, None, None, 1000)
+        rows += len(page)
+        if len(page) < 1000:
+            break
+        after = (page[-1][2], page[-1][1])
+    scanned = time.perf_counter() - started
+    return inserted, paged, scanned, rows
+
+def open_engine(engine: str, path: str):
+    from src.main import open_storage
+
+    os.environ["STORAGE_ENGINE"] = engine
+    return open_storage(path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--topics", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--duplicates", type=float, default=0.2, help="porsi duplikat per batch")
+    parser.add_argument("--pages", type=int, default=200, help="halaman 100 event yang dibaca berurutan")
+    args = parser.parse_args()
+
+    from src.log_engine import SNAPSHOT_FILE
+    from src.main import app_state
+
+    app_state["payload_compress_min_bytes"] = None
+    batches = make_batches(args.events, args.topics, args.batch_size, args.duplicates)
+    total = sum(len(batch) for batch in batches)
+    os.environ.setdefault("LOG_ENGINE_SNAPSHOT_EVENTS", str(max(1, args.events // 4)))
+
+    print(f"{args.events} event unik, {total} event ditulis (batch {args.batch_size}, "
+          f"{args.duplicates:.0%} duplikat), {args.topics} topik")
+    with tempfile.TemporaryDirectory() as tmp:
+        for engine in ("sqlite", "log"):
+            path = os.path.join(tmp, f"{engine}.db")
+            storage = open_engine(engine, path)
+            inserted, paged, scanned, rows = asyncio.run(run_engine(storage, batches, args.topics, args.pages))
+            storage.close()
+
+            started = time.perf_counter()
+            storage = open_engine(engine, path)
+            counts = storage.topic_counts()
+            startup = time.perf_counter() - started
+            storage.close()
+            assert sum(counts.values()) == args.events
+
+            files = path if engine == "sqlite" else path + ".segments"
+            print(f"[{engine}] {directory_bytes(files) / 1e6:.1f} MB di disk")
+            print(f"  insert-if-absent      : {inserted:7.2f} s ({total / inserted:10.0f} event/s)")
+            print(f"  halaman 100 event     : {paged * 1000:7.3f} ms")
+            print(f"  scan penuh 1 topik    : {scanned * 1000:7.1f} ms ({rows} event)")
+            print(f"  startup               : {startup * 1000:7.1f} ms")
+
+            if engine == "log":
+                os.unlink(os.path.join(files, SNAPSHOT_FILE))
+                started = time.perf_counter()
+                storage = open_engine(engine, path)
+                replay = time.perf_counter() - started
+                storage._unsnapshotted = 0  # jangan tulis snapshot baru saat close
+                storage.close()
+                print(f"  startup tanpa snapshot: {replay * 1000:7.1f} ms (replay seluruh log)")
+
+if __name__ == "__main__":
+    main()
@@ -1,152 +1,317 @@
-import requests
-import uuid
-import time
-import random
+"""
+Load generator & benchmark harness untuk aggregator.
+
+Mengirim event ke `POST /publish` secara async (httpx, koneksi keep-alive
+di-pool) dengan concurrency yang bisa diatur, lalu mem-polling `/stats`
+sampai antrian terkuras dan semua event yang diterima sudah diproses.
+Hasilnya ditulis sebagai laporan JSON.
+
+Mode:
+    closed : N request bersamaan, request berikutnya dikirim begitu respons
+             sebelumnya diterima (mencari throughput maksimal).
+    open   : batch dijadwalkan pada laju tetap (`--rate` event/s) tanpa
+             menunggu respons. Latensi dihitung dari waktu TERJADWAL,
+             sehingga antrian di sisi klien ikut terukur (tanpa
+             coordinated omission).
+
+Contoh:
+    python publisher/publisher.py --events 200000 --concurrency 64 --batch-size 200
+    python publisher/publisher.py --mode open --rate 20000 --events 100000 --report open.json
+
+Semua opsi juga bisa diisi lewat env (AGGREGATOR_URL, LOADGEN_EVENTS, ...);
+default-nya sama dengan load test Docker Compose: 5.000 event, 20% duplikat.
+"""
+import argparse
+import asyncio
+import json
+import math
 import os
-import threading
+import random
+import time
+import uuid
+from collections import Counter
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
+import httpx
 
-# --- Konfigurasi Tes ---
-TOTAL_EVENTS = 5000
-DUPLICATE_PERCENTAGE = 0.20 # 20%
-BATCH_SIZE = 100
-BASE_URL = os.getenv("AGGREGATOR_URL", "http://localhost:8080")
+# --- Konfigurasi ---
 
-responsive_check_passed = None
+def env(name: str, default: str) -> str:
+    return os.getenv(f"LOADGEN_{name}", default)
 
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.getenv("AGGREGATOR_URL", "http://localhost:8080"))
+    parser.add_argument("--events", type=int, default=int(env("EVENTS", "5000")), help="total event yang dikirim")
+    parser.add_argument("--batch-size", type=int, default=int(env("BATCH_SIZE", "100")))
+    parser.add_argument("--concurrency", type=int, default=int(env("CONCURRENCY", "16")),
+                        help="maksimal request bersamaan (dan ukuran pool koneksi)")
+    parser.add_argument("--mode", choices=("closed", "open"), default=env("MODE", "closed"))
+    parser.add_argument("--rate", type=float, default=float(env("RATE", "10000")),
+                        help="target event/s untuk mode open")
+    parser.add_argument("--duplicate-ratio", type=float, default=float(env("DUPLICATE_RATIO", "0.2")))
+    parser.add_argument("--topics", type=int, default=int(env("TOPICS", "1")), help="jumlah topik berbeda")
+    parser.add_argument("--payload-bytes", type=int, default=int(env("PAYLOAD_BYTES", "64")),
+                        help="perkiraan ukuran payload JSON per event")
+    parser.add_argument("--max-retries", type=int, default=int(env("MAX_RETRIES", "20")),
+                        help="maksimal kirim ulang per batch saat 429 / diterima sebagian")
+    parser.add_argument("--drain-timeout", type=float, default=float(env("DRAIN_TIMEOUT_S", "120")),
+                        help="batas waktu menunggu /stats konsisten setelah pengiriman selesai")
+    parser.add_argument("--poll-interval", type=float, default=float(env("POLL_INTERVAL_S", "0.05")))
+    parser.add_argument("--report", default=env("REPORT", "loadgen_report.json"), help="path laporan JSON")
+    args = parser.parse_args(argv)
+    if not 0 <= args.duplicate_ratio < 1:
+        parser.error("--duplicate-ratio harus di rentang [0, 1)")
+    args.batch_size = max(1, args.batch_size)
+    args.concurrency = max(1, args.concurrency)
+    args.topics = max(1, args.topics)
+    return args
 
-def generate_event(topic, event_id):
-    """Membuat satu event dummy."""
-    return {
-        "topic": topic,
-        "event_id": str(event_id),
-        "timestamp": datetime.now().isoformat() + "Z",
-        "source": "docker-publisher-service",
-        "payload": {"run_id": str(uuid.uuid4())}
-    }
+# --- Pembuatan Event ---
 
-def check_responsiveness():
+def build_batches(args) -> Tuple[List[bytes], List[int], int]:
     """
-    Thread terpisah yang mengecek /stats saat load test berjalan.
+    Membuat seluruh batch (sudah di-encode JSON) SEBELUM pengukuran dimulai,
+    agar biaya serialisasi di klien tidak ikut membatasi throughput.
+    Duplikat memakai ulang (topic, event_id) event unik yang sudah ada.
+    Mengembalikan (body per batch, jumlah event per batch, jumlah event unik).
     """
-    global responsive_check_passed
-    try:
-        print("\n[Responsiveness Check] Mengecek GET /stats...")
-        start_time = time.time()
-        res = requests.get(f"{BASE_URL}/stats", timeout=2.0) # Timeout 2 detik
-        end_time = time.time()
-        
-        if res.status_code == 200:
-            print(f"[Responsiveness Check] BERHASIL! /stats merespons dalam {end_time - start_time:.2f} detik.")
-            responsive_check_passed = True
-        else:
-            print(f"[Responsiveness Check] GAGAL! /stats mengembalikan {res.status_code}")
-            responsive_check_passed = False
-    except requests.exceptions.Timeout:
-        print("[Responsiveness Check] GAGAL! /stats timeout (> 2 detik).")
-        responsive_check_passed = False
-    except Exception as e:
-        print(f"[Responsiveness Check] GAGAL! Error: {e}")
-        responsive_check_passed = False
-
-def run_load_test():
-    """Menjalankan load test utama."""
-    global responsive_check_passed
-    
-    print(f"--- Publisher Service Dimulai ---")
-    print(f"Target Aggregator: {BASE_URL}")
-    print(f"Mulai Load Test: {TOTAL_EVENTS} event, {DUPLICATE_PERCENTAGE*100}% duplikasi.")
-    
-    num_unique = int(TOTAL_EVENTS * (1 - DUPLICATE_PERCENTAGE))
-    num_duplicates = TOTAL_EVENTS - num_unique
-
-    print(f"Unik: {num_unique}, Duplikat: {num_duplicates}")
-    
-    # 1. Buat event unik
-    unique_events = [generate_event("loadtest", uuid.uuid4()) for _ in range(num_unique)]
-    
-    # 2. Ambil sampel acak dari event unik untuk dijadikan duplikat
-    duplicate_events = [random.choice(unique_events) for _ in range(num_duplicates)]
-    
-    # 3. Gabungkan dan kocok
-    all_events_to_send = unique_events + duplicate_events
-    random.shuffle(all_events_to_send)
-    
-    print(f"Total event yang akan dikirim: {len(all_events_to_send)}")
-    
-    # 4. Cek stats awal
-    try:
-        stats_before = requests.get(f"{BASE_URL}/stats").json()
-        print(f"Stats Aggregator Awal -> Unik: {stats_before['unique_processed']}, Duplikat: {stats_before['duplicate_dropped']}")
-    except Exception as e:
-        print(f"Gagal menghubungi aggregator di {BASE_URL}. Error: {e}")
-        return
-
-    # 5. Mulai mengirim
-    start_time = time.time()
-
-    threading.Timer(5.0, check_responsiveness).start()
-    threading.Timer(25.0, check_responsiveness).start()
-    threading.Timer(60.0, check_responsiveness).start()
-    
-    sent_count = 0
-    for i in range(0, len(all_events_to_send), BATCH_SIZE):
-        batch = all_events_to_send[i:i+BATCH_SIZE]
+    run_id = uuid.uuid4().hex[:12]
+    unique_count = args.events - int(args.events * args.duplicate_ratio)
+    padding = "x" * max(0, args.payload_bytes - 40)
+    timestamp = datetime.now().isoformat() + "Z"
+
+    unique = []
+    for i in range(unique_count):
+        unique.append(json.dumps({
+            "topic": f"loadtest-{i % args.topics}",
+            "event_id": f"{run_id}-{i}",
+            "timestamp": timestamp,
+            "source": "loadgen",
+            "payload": {"seq": i, "pad": padding},
+        }, separators=(",", ":")))
+    events = unique + [random.choice(unique) for _ in range(args.events - unique_count)]
+    random.shuffle(events)
+
+    bodies, sizes = [], []
+    for start in range(0, len(events), args.batch_size):
+        chunk = events[start:start + args.batch_size]
+        bodies.append(("[" + ",".join(chunk) + "]").encode())
+        sizes.append(len(chunk))
+    return bodies, sizes, unique_count
+
+# --- Pengiriman ---
+
+class Results:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.status = Counter()
+        self.accepted = 0
+        self.failed_events = 0
+        self.retries = 0
+        self.errors = Counter()
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile dari list yang sudah terurut."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+async def send_batch(client: httpx.AsyncClient, body: bytes, count: int, results: Results,
+                     max_retries: int, started: float):
+    """
+    Mengirim satu batch, menghormati 429 + Retry-After dan mengirim ulang
+    sisa batch yang hanya diterima sebagian. `started` adalah awal latensi
+    percobaan pertama (waktu terjadwal pada mode open).
+    """
+    events = None
+    for attempt in range(max_retries + 1):
+        if attempt:
+            results.retries += 1
         try:
-            res = requests.post(f"{BASE_URL}/publish", json=batch, timeout=5.0)
-            if res.status_code != 200:
-                print(f"Error mengirim batch: {res.status_code} - {res.text}")
-            sent_count += len(batch)
-            print(f"Mengirim event... {sent_count}/{TOTAL_EVENTS}", end="\r")
-        except Exception as e:
-            print(f"\nError koneksi saat mengirim: {e}")
-            time.sleep(1)
-
-    end_time = time.time()
-    print(f"\nSelesai mengirim {TOTAL_EVENTS} event dalam {end_time - start_time:.2f} detik.")
-    
-    print("Menunggu consumer memproses")
-    time.sleep(5) 
-
-    # 6. Dapatkan stats akhir
-    stats_after = requests.get(f"{BASE_URL}/stats").json()
-    print("\n--- Hasil Publisher ---")
-    
-    total_unique_processed = stats_after['unique_processed'] - stats_before['unique_processed']
-    total_duplicates_dropped = stats_after['duplicate_dropped'] - stats_before['duplicate_dropped']
-    
-    print(f"Total Unik Diproses (sesuai laporan aggregator): {total_unique_processed} (Diharapkan: {num_unique})")
-    print(f"Total Duplikat Dibuang (sesuai laporan aggregator): {total_duplicates_dropped} (Diharapkan: {num_duplicates})")
-    
-
-    if total_unique_processed == num_unique:
-        print("\nStatus Poin (D): BERHASIL! (Jumlah unik sesuai)")
-    else:
-        print(f"\nStatus Poin (D): GAGAL! (Jumlah unik {total_unique_processed}, diharapkan {num_unique})")
-    
-    if responsive_check_passed is None:
-        print("[Responsiveness Check] Pengecekan tidak sempat berjalan.")
-    elif responsive_check_passed:
-        print("[Responsiveness Check] Sistem TETAP RESPONSIF selama tes.")
-    else:
-        print("[Responsiveness Check] Sistem TIDAK RESPONSIF selama tes.")
-
-    print("--- Publisher Service Selesai ---")
+            res = await client.post("/publish", content=body, headers={"Content-Type": "application/json"})
+        except httpx.HTTPError as e:
+            results.errors[type(e).__name__] += 1
+            results.failed_events += count
+            return
+        results.latencies.append(time.perf_counter() - started)
+        results.status[res.status_code] += 1
 
-if __name__ == "__main__":
-    connected = False
-    for i in range(5):
+        if res.status_code == 429:
+            await asyncio.sleep(float(res.headers.get("Retry-After", "1")))
+        elif res.status_code == 200:
+            accepted = res.json().get("count", count)
+            results.accepted += accepted
+            if accepted >= count:
+                return
+            # Diterima sebagian (QUEUE_POLICY=partial): kirim ulang sisanya.
+            events = events or json.loads(body)
+            events = events[accepted:]
+            count = len(events)
+            body = json.dumps(events, separators=(",", ":")).encode()
+        else:
+            results.errors[f"HTTP {res.status_code}"] += 1
+            results.failed_events += count
+            return
+        started = time.perf_counter()
+    results.failed_events += count
+
+async def run_closed(client, bodies, sizes, args, results: Results):
+    batches = iter(zip(bodies, sizes))
+
+    async def worker():
+        for body, count in batches:
+            await send_batch(client, body, count, results, args.max_retries, time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+async def run_open(client, bodies, sizes, args, results: Results):
+    interval = args.batch_size / args.rate
+    in_flight = asyncio.Semaphore(args.concurrency)
+    tasks = []
+    start = time.perf_counter()
+
+    async def scheduled(body, count, due):
+        async with in_flight:
+            await send_batch(client, body, count, results, args.max_retries, due)
+
+    for index, (body, count) in enumerate(zip(bodies, sizes)):
+        due = start + index * interval
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(scheduled(body, count, due)))
+    await asyncio.gather(*tasks)
+
+# --- Monitoring /stats ---
+
+async def probe_stats(client: httpx.AsyncClient, samples: List[float], stop: asyncio.Event, interval: float):
+    """Mengukur latensi GET /stats selama beban berjalan (cek responsivitas)."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            await client.get("/stats")
+            samples.append(time.perf_counter() - started)
+        except httpx.HTTPError:
+            pass
         try:
-            requests.get(f"{BASE_URL}/stats", timeout=3.0)
-            print("Koneksi ke Aggregator berhasil.")
-            connected = True
-            break
-        except Exception:
-            print(f"Menunggu Aggregator... (upaya {i+1}/5)")
-            time.sleep(3)
-            
-    if connected:
-        run_load_test()
-    else:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+async def wait_consistent(client: httpx.AsyncClient, before: Dict, accepted: int, args) -> Tuple[Optional[float], Dict]:
+    """
+    Polling /stats sampai antrian kosong dan semua event yang diterima sudah
+    diputuskan (unik atau duplikat). Mengembalikan (detik sampai konsisten
+    atau None jika timeout, stats terakhir).
+    """
+    started = time.perf_counter()
+    deadline = started + args.drain_timeout
+    while True:
+        stats = (await client.get("/stats")).json()
+        decided = (stats["unique_processed"] - before["unique_processed"]
+                   + stats["duplicate_dropped"] - before["duplicate_dropped"])
+        if stats["queue_depth"] == 0 and decided >= accepted:
+            return time.perf_counter() - started, stats
+        if time.perf_counter() >= deadline:
+            return None, stats
+        await asyncio.sleep(args.poll_interval)
+
+# --- Laporan ---
+
+def latency_summary(samples: List[float]) -> Dict:
+    samples = sorted(samples)
+    summary = {"count": len(samples)}
+    for name, q in (("p50", 0.5), ("p99", 0.99), ("p999", 0.999)):
+        value = percentile(samples, q)
+        summary[f"{name}_ms"] = None if value is None else round(value * 1000, 3)
+    summary["max_ms"] = round(samples[-1] * 1000, 3) if samples else None
+    return summary
+
+async def run(args) -> Dict:
+    bodies, sizes, unique_count = build_batches(args)
+    print(f"Target {args.url}: {args.events} event ({unique_count} unik), {len(bodies)} batch, "
+          f"mode {args.mode}, concurrency {args.concurrency}.")
+
+    limits = httpx.Limits(max_connections=args.concurrency + 1, max_keepalive_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30.0) as client:
+        before = (await client.get("/stats")).json()
+
+        results = Results()
+        stats_latency: List[float] = []
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe_stats(client, stats_latency, stop, 1.0))
+
+        started = time.perf_counter()
+        if args.mode == "closed":
+            await run_closed(client, bodies, sizes, args, results)
+        else:
+            await run_open(client, bodies, sizes, args, results)
+        send_seconds = time.perf_counter() - started
+
+        stop.set()
+        await prober
+        consistency_seconds, after = await wait_consistent(client, before, results.accepted, args)
+
+    delta = {key: after[key] - before[key] for key in ("received", "unique_processed", "duplicate_dropped", "rejected")}
+    return {
+        "config": {key: value for key, value in vars(args).items() if key != "report"},
+        "events": {
+            "sent": args.events,
+            "expected_unique": unique_count,
+            "accepted": results.accepted,
+            "failed": results.failed_events,
+            "retries": results.retries,
+        },
+        "send_seconds": round(send_seconds, 3),
+        "ingest_throughput_eps": round(results.accepted / send_seconds, 1) if send_seconds else None,
+        "publish_latency": latency_summary(results.latencies),
+        "stats_latency": latency_summary(stats_latency),
+        "http_status": {str(code): count for code, count in sorted(results.status.items())},
+        "errors": dict(results.errors),
+        "time_to_consistency_s": None if consistency_seconds is None else round(consistency_seconds, 3),
+        "end_to_end_throughput_eps": (
+            round(results.accepted / (send_seconds + consistency_seconds), 1)
+            if consistency_seconds is not None else None
+        ),
+        "stats_delta": delta,
+        "unique_matches": delta["unique_processed"] == unique_count and results.failed_events == 0,
+    }
+
+async def wait_for_aggregator(url: str, attempts: int = 5) -> bool:
+    async with httpx.AsyncClient(base_url=url, timeout=3.0) as client:
+        for attempt in range(attempts):
+            try:
+                await client.get("/stats")
+                print("Koneksi ke Aggregator berhasil.")
+                return True
+            except httpx.HTTPError:
+                print(f"Menunggu Aggregator... (upaya {attempt + 1}/{attempts})")
+                await asyncio.sleep(3)
+    return False
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if not asyncio.run(wait_for_aggregator(args.url)):
         print("Tidak dapat terhubung ke Aggregator. Publisher exiting.")
+        return 1
+
+    report = asyncio.run(run(args))
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+    latency = report["publish_latency"]
+    print(f"Ingest: {report['ingest_throughput_eps']} event/s dalam {report['send_seconds']}s "
+          f"({report['events']['accepted']} diterima, {report['events']['retries']} retry)")
+    print(f"Latensi publish p50/p99/p999: {latency['p50_ms']} / {latency['p99_ms']} / {latency['p999_ms']} ms")
+    print(f"Time-to-consistency: {report['time_to_consistency_s']}s; "
+          f"/stats p99 selama beban: {report['stats_latency']['p99_ms']} ms")
+    print(f"Unik diproses: {report['stats_delta']['unique_processed']} (diharapkan {report['events']['expected_unique']}), "
+          f"duplikat dibuang: {report['stats_delta']['duplicate_dropped']}")
+    print(f"Status Poin (D): {'BERHASIL' if report['unique_matches'] else 'GAGAL'}. Laporan: {args.report}")
+    return 0 if report["unique_matches"] else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,46 @@
+import os
+import struct
+import zlib
+from typing import List
+
+from src.ipc import decode_batch, encode_batch
+from src.records import QueuedEvent
+
+# --- Checkpoint Queue Saat Shutdown ---
+
+# Header: magic, versi, panjang body, crc32 body. Body memakai encoding batch
+# biner yang sama dengan IPC (src/ipc.py): payload disimpan apa adanya.
+_MAGIC = b"AGCK"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBQI")
+
+class CheckpointError(Exception):
+    """File checkpoint rusak atau bukan checkpoint aggregator."""
+
+def write_checkpoint(path: str, events: List[QueuedEvent]):
+    """
+    Menulis event yang belum di-commit ke `path` secara atomik: file
+    sementara di-fsync lalu di-rename, sehingga crash di tengah penulisan
+    tidak meninggalkan checkpoint setengah jadi.
+    """
+    body = encode_batch(events)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(body), zlib.crc32(body)))
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def read_checkpoint(path: str) -> List[QueuedEvent]:
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise CheckpointError("header terpotong")
+        magic, version, length, crc = _HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION:
+            raise CheckpointError(f"format tidak dikenal (magic={magic!r}, versi={version})")
+        body = f.read(length)
+    if len(body) != length or zlib.crc32(body) != crc:
+        raise CheckpointError("body terpotong atau checksum tidak cocok")
+    return decode_batch(body)
@@ -0,0 +1,385 @@
+import argparse
+import asyncio
+import heapq
+import hmac
+import json
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import time
+from bisect import bisect_right
+from hashlib import blake2b
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from src.records import QueuedEvent
+
+# --- Mode Cluster: Consistent Hashing Key Dedup Antar Node ---
+#
+#   CLUSTER_NODES=http://10.0.0.1:8080,http://10.0.0.2:8080 CLUSTER_SELF=http://10.0.0.1:8080 CLUSTER_SECRET=...
+#
+# Setiap node memiliki rentang hash (topic, event_id) di ring (dengan
+# virtual node), sehingga dedup satu key selalu terjadi di node yang sama.
+# Node mana pun menerima /publish dan meneruskan sub-batch ke pemiliknya;
+# /stats, /events, dan /aggregate dijawab dengan fan-out ke semua node.
+# Request antar node membawa FORWARDED_HEADER berisi CLUSTER_SECRET dan
+# dijawab lokal saja; header dengan nilai lain ditolak (403), sehingga
+# klien luar tidak bisa melewati routing ring.
+
+FORWARDED_HEADER = "x-aggregator-forwarded"
+
+def _hash(data: bytes) -> int:
+    # crc32 (dipakai partition_index) terlalu tidak merata untuk titik ring
+    # yang namanya mirip ("node#0", "node#1", ...).
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), "little")
+
+class HashRing:
+    """
+    Ring consistent hashing. Menambah/menghapus satu node hanya memindahkan
+    sekitar 1/N key; `vnodes` titik per node meratakan pembagian rentang.
+    """
+
+    def __init__(self, nodes: List[str], vnodes: int = 256):
+        points = sorted(
+            (_hash(f"{node}#{replica}".encode()), index)
+            for index, node in enumerate(nodes)
+            for replica in range(vnodes)
+        )
+        self.hashes = [point for point, _ in points]
+        self.owners = [index for _, index in points]
+
+    def owner(self, topic: str, event_id: str) -> int:
+        """Index node pemilik key: titik ring pertama searah jarum jam."""
+        position = bisect_right(self.hashes, _hash(f"{topic}\x00{event_id}".encode()))
+        return self.owners[position % len(self.owners)]
+
+class NodeError(Exception):
+    """Node lain tidak bisa dihubungi atau menjawab dengan error."""
+
+    def __init__(self, node: str, status_code: int, detail: str, retry_after: Optional[str] = None):
+        super().__init__(f"{node}: {status_code} {detail}")
+        self.node = node
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class PeerForwarder:
+    """
+    Penerus /publish ke satu node lain. Sub-batch dari request yang berjalan
+    bersamaan digabung menjadi satu POST /publish (maksimal `max_events`
+    event), dengan paling banyak `max_inflight` request sekaligus: saat
+    beban rendah setiap sub-batch langsung dikirim, saat beban tinggi
+    sub-batch yang menunggu ikut request berikutnya (seperti group commit).
+
+    Untuk policy partial, jumlah yang diterima node tujuan adalah prefix
+    gabungan; setiap pemanggil mendapat bagian prefix miliknya.
+    """
+
+    def __init__(self, cluster: "Cluster", node: int, max_events: int, max_inflight: int):
+        self.cluster = cluster
+        self.node = node
+        self.max_events = max_events
+        self.max_inflight = max_inflight
+        self.pending = []  # (events, future)
+        self.tasks = set()
+
+    async def publish(self, events: List[QueuedEvent]) -> int:
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((events, future))
+        if len(self.tasks) < self.max_inflight:
+            task = asyncio.ensure_future(self._run())
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        return await future
+
+    def _take(self) -> list:
+        taken, count = [], 0
+        while self.pending and (not taken or count + len(self.pending[0][0]) <= self.max_events):
+            taken.append(self.pending.pop(0))
+            count += len(taken[-1][0])
+        return taken
+
+    async def _run(self):
+        while self.pending:
+            taken = self._take()
+            body = b"[" + b", ".join(event.to_json() for events, _ in taken for event in events) + b"]"
+            try:
+                res = await self.cluster.request(self.node, "POST", "/publish", content=body,
+                                                 headers={"Content-Type": "application/json"})
+                accepted = res.json()["count"]
+            except BaseException as e:
+                for _, future in taken:
+                    if not future.done():
+                        future.set_exception(e if isinstance(e, Exception) else self._closed_error())
+                if not isinstance(e, Exception):
+                    raise
+                continue
+            for events, future in taken:
+                if not future.done():
+                    future.set_result(min(len(events), max(0, accepted)))
+                accepted -= len(events)
+
+    def _closed_error(self) -> "NodeError":
+        url = self.cluster.nodes[self.node]
+        return NodeError(url, 503, f"Penerusan ke {url} dibatalkan (shutdown)", "1")
+
+    async def close(self):
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        for _, future in self.pending:
+            if not future.done():
+                future.set_exception(self._closed_error())
+        self.pending = []
+
+class Cluster:
+    """
+    Konfigurasi cluster statis + satu client httpx keep-alive per node lain
+    (pool koneksi sendiri, `base_url` node tersebut). `self_index` adalah
+    posisi node ini di `nodes`; `secret` dikirim di FORWARDED_HEADER.
+    """
+
+    def __init__(self, nodes: List[str], self_index: int, secret: str, vnodes: int = 256,
+                 max_connections: int = 64, timeout: float = 10.0, forward_batch: int = 5000,
+                 forward_inflight: int = 4):
+        self.nodes = nodes
+        self.self_index = self_index
+        self.secret = secret
+        self.ring = HashRing(nodes, vnodes)
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.forward_batch = forward_batch
+        self.forward_inflight = forward_inflight
+        self.clients = {}
+        self.forwarders = {}
+
+    async def start(self):
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        for node, url in enumerate(self.nodes):
+            if node == self.self_index:
+                continue
+            self.clients[node] = httpx.AsyncClient(
+                base_url=url, limits=limits, timeout=self.timeout, headers={FORWARDED_HEADER: self.secret},
+            )
+            self.forwarders[node] = PeerForwarder(self, node, self.forward_batch, self.forward_inflight)
+
+    async def close(self):
+        for forwarder in self.forwarders.values():
+            await forwarder.close()
+        for client in self.clients.values():
+            await client.aclose()
+        self.forwarders = {}
+        self.clients = {}
+
+    def trusts(self, header_value: str) -> bool:
+        """True jika nilai FORWARDED_HEADER berasal dari node cluster (secret cocok)."""
+        return hmac.compare_digest(header_value.encode(), self.secret.encode())
+
+    def split(self, events: List[QueuedEvent]) -> Dict[int, List[int]]:
+        """Index event per node pemilik (sub-batch), urutan di dalamnya dipertahankan."""
+        owner = self.ring.owner
+        groups = {}
+        for index, event in enumerate(events):
+            groups.setdefault(owner(event.topic, event.event_id), []).append(index)
+        return groups
+
+    async def request(self, node: int, method: str, path: str, **kwargs) -> httpx.Response:
+        """Request ke node lain; status selain 200 menjadi NodeError."""
+        url = self.nodes[node]
+        try:
+            res = await self.clients[node].request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            raise NodeError(url, 503, f"Node {url} tidak dapat dihubungi ({type(e).__name__})", "1")
+        if res.status_code != 200:
+            try:
+                detail = res.json().get("detail", res.text)
+            except ValueError:
+                detail = res.text
+            raise NodeError(url, res.status_code, detail, res.headers.get("retry-after"))
+        return res
+
+    async def publish(self, node: int, events: List[QueuedEvent]) -> int:
+        """Meneruskan sub-batch ke node pemilik; mengembalikan jumlah event yang diterima."""
+        return await self.forwarders[node].publish(events)
+
+def load_cluster() -> Optional[Cluster]:
+    """
+    Membaca konfigurasi cluster dari env (tanpa CLUSTER_NODES = node tunggal):
+        CLUSTER_NODES           : URL dasar semua node, dipisah koma, urutan sama di semua node
+        CLUSTER_SELF            : URL node ini (harus ada di CLUSTER_NODES)
+        CLUSTER_SECRET          : secret bersama semua node untuk FORWARDED_HEADER (wajib)
+        CLUSTER_VNODES          : titik ring per node (default 256)
+        CLUSTER_MAX_CONNECTIONS : maksimal koneksi keep-alive per node lain (default 64)
+        CLUSTER_TIMEOUT_S       : batas waktu request antar node (default 10)
+        CLUSTER_FORWARD_BATCH   : maksimal event per POST /publish gabungan ke satu node (default 5000)
+        CLUSTER_FORWARD_INFLIGHT: maksimal POST /publish bersamaan ke satu node (default 4)
+    Mengubah daftar node memindahkan kepemilikan sebagian key; key lama
+    tidak dimigrasi, jadi duplikat key yang pindah pemilik tidak terdeteksi.
+    """
+    raw = os.getenv("CLUSTER_NODES", "").strip()
+    if not raw:
+        return None
+    nodes = [node.strip().rstrip("/") for node in raw.split(",") if node.strip()]
+    if len(set(nodes)) != len(nodes):
+        raise ValueError("CLUSTER_NODES berisi URL ganda")
+    me = os.getenv("CLUSTER_SELF", "").strip().rstrip("/")
+    if me not in nodes:
+        raise ValueError(f"CLUSTER_SELF '{me}' harus salah satu dari CLUSTER_NODES")
+    secret = os.getenv("CLUSTER_SECRET", "")
+    if not secret:
+        raise ValueError("CLUSTER_SECRET wajib diisi di mode cluster (sama di semua node)")
+    return Cluster(
+        nodes,
+        nodes.index(me),
+        secret,
+        vnodes=max(1, int(os.getenv("CLUSTER_VNODES", "256"))),
+        max_connections=max(1, int(os.getenv("CLUSTER_MAX_CONNECTIONS", "64"))),
+        timeout=float(os.getenv("CLUSTER_TIMEOUT_S", "10")),
+        forward_batch=max(1, int(os.getenv("CLUSTER_FORWARD_BATCH", "5000"))),
+        forward_inflight=max(1, int(os.getenv("CLUSTER_FORWARD_INFLIGHT", "4"))),
+    )
+
+# --- Merge Hasil /events Antar Node ---
+
+# Satu baris hasil: (timestamp, event_id, JSON event ter-render)
+RenderedRow = Tuple[str, str, bytes]
+PageFetcher = Callable[[Optional[Tuple[str, str]], int], Awaitable[List[RenderedRow]]]
+
+def parse_ndjson_rows(body: bytes) -> List[RenderedRow]:
+    """Baris NDJSON /events node lain; JSON event diteruskan apa adanya."""
+    rows = []
+    for line in body.splitlines():
+        if line:
+            event = json.loads(line)
+            rows.append((event["timestamp"], event["event_id"], line))
+    return rows
+
+class EventMerge:
+    """
+    K-way merge event satu topik dari semua node, terurut (timestamp,
+    event_id) seperti GET /events node tunggal. Setiap node dibaca per
+    halaman keyset sesuai kebutuhan, jadi cursor `after` tetap berlaku
+    lintas node. `start()` mengambil halaman pertama semua node (error
+    node muncul di sini, sebelum respons streaming dimulai).
+    """
+
+    def __init__(self, fetchers: List[PageFetcher], after: Optional[Tuple[str, str]], page_size: int):
+        self.fetchers = fetchers
+        self.page_size = page_size
+        self.cursors = [after] * len(fetchers)
+        self.exhausted = [False] * len(fetchers)
+        self.buffers = [[] for _ in fetchers]
+        self.heap = []
+
+    async def _fetch(self, node: int):
+        page = await self.fetchers[node](self.cursors[node], self.page_size)
+        if len(page) < self.page_size:
+            self.exhausted[node] = True
+        if page:
+            self.cursors[node] = page[-1][:2]
+            page.reverse()  # pop() dari ujung = baris berikutnya
+        self.buffers[node] = page
+
+    def _push_next(self, node: int):
+        if self.buffers[node]:
+            timestamp, event_id, data = self.buffers[node].pop()
+            heapq.heappush(self.heap, (timestamp, event_id, node, data))
+
+    async def start(self):
+        await asyncio.gather(*(self._fetch(node) for node in range(len(self.fetchers))))
+        for node in range(len(self.fetchers)):
+            self._push_next(node)
+
+    async def take(self, count: Optional[int]) -> List[RenderedRow]:
+        """Maksimal `count` baris berikutnya (None = semua)."""
+        rows = []
+        while self.heap and (count is None or len(rows) < count):
+            timestamp, event_id, node, data = heapq.heappop(self.heap)
+            rows.append((timestamp, event_id, data))
+            if not self.buffers[node] and not self.exhausted[node]:
+                await self._fetch(node)
+            self._push_next(node)
+        return rows
+
+# --- Launcher Cluster Lokal ---
+#
+#   python -m src.cluster --nodes 3 --base-port 8081 --data-dir ./cluster-data
+#
+# Menjalankan N node uvicorn di 127.0.0.1 (port berurutan), masing-masing
+# dengan DATABASE_FILE sendiri; dipakai untuk tes dan benchmark. Tanpa
+# CLUSTER_SECRET di env, secret acak dibuat untuk cluster ini.
+
+def node_urls(count: int, base_port: int, host: str = "127.0.0.1") -> List[str]:
+    return [f"http://{host}:{base_port + index}" for index in range(count)]
+
+def start_nodes(count: int, base_port: int, data_dir: str, env: Dict[str, str] = None,
+                timeout: float = 30.0) -> List[subprocess.Popen]:
+    """Menjalankan node cluster lokal dan menunggu semua /health siap."""
+    os.makedirs(data_dir, exist_ok=True)
+    urls = node_urls(count, base_port)
+    secret = (env or {}).get("CLUSTER_SECRET") or os.getenv("CLUSTER_SECRET") or secrets.token_hex(16)
+    processes = []
+    for index, url in enumerate(urls):
+        node_env = dict(os.environ, **(env or {}))
+        node_env.update({
+            "CLUSTER_SECRET": secret,
+            "CLUSTER_NODES": ",".join(urls),
+            "CLUSTER_SELF": url,
+            "DATABASE_FILE": os.path.join(data_dir, f"node{index}.db"),
+        })
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1",
+             "--port", str(base_port + index), "--log-level", "warning"],
+            env=node_env, stdout=subprocess.DEVNULL,
+        ))
+
+    deadline = time.monotonic() + timeout
+    for url, process in zip(urls, processes):
+        while True:
+            try:
+                if httpx.get(url + "/health", timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if process.poll() is not None or time.monotonic() >= deadline:
+                stop_nodes(processes)
+                raise RuntimeError(f"Node {url} gagal start")
+            time.sleep(0.05)
+    return processes
+
+def stop_nodes(processes: List[subprocess.Popen], timeout: float = 30.0):
+    """SIGTERM ke semua node (graceful shutdown masing-masing), lalu kill jika macet."""
+    for process in processes:
+        if process.poll() is None:
+            process.send_signal(signal.SIGTERM)
+    for process in processes:
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            print(f"[CLUSTER] Node pid {process.pid} tidak berhenti tepat waktu; di-kill.")
+            process.kill()
+            process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Menjalankan cluster aggregator lokal (N proses uvicorn).")
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--base-port", type=int, default=8081)
+    parser.add_argument("--data-dir", default="cluster-data")
+    args = parser.parse_args()
+
+    processes = start_nodes(args.nodes, args.base_port, args.data_dir)
+    print(f"[CLUSTER] {args.nodes} node siap: {', '.join(node_urls(args.nodes, args.base_port))}")
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        while all(process.poll() is None for process in processes):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_nodes(processes)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+# --- Connection Manager (SQLite) ---
+
+class Database:
+    """
+    Mengelola koneksi SQLite jangka panjang yang dimiliki oleh lifespan aplikasi:
+    satu koneksi writer dan pool kecil koneksi read-only.
+
+    Semua koneksi memakai mode WAL sehingga pembaca (`GET /events`) tidak
+    memblokir writer (consumer), dan sebaliknya. Statement di-cache per
+    koneksi (`cached_statements`) sehingga query yang sama tidak di-compile ulang.
+
+    Tidak ada kerja SQLite yang berjalan di event loop:
+        - `write()` mengirim job ke satu thread writer khusus lewat queue,
+        - `read()` menjalankan job di thread pool berukuran DB_READ_POOL_SIZE.
+
+    Tuning lewat env:
+        DB_READ_POOL_SIZE : jumlah koneksi read-only (default 4)
+        DB_CACHE_SIZE_KB  : page cache per koneksi dalam KiB (default 65536)
+        DB_MMAP_SIZE      : ukuran memory-map dalam byte (default 268435456)
+
+    `synchronous` untuk koneksi writer: NORMAL (default) belum fsync saat
+    commit di mode WAL; FULL membuat setiap commit durable sebelum kembali
+    (dipakai mode durable-ack, karena ingest log dipotong setelah commit).
+    """
+
+    CACHED_STATEMENTS = 256
+
+    def __init__(self, path: str, read_pool_size: int = None, synchronous: str = "NORMAL"):
+        self.path = path
+        self.synchronous = synchronous
+        self.read_pool_size = read_pool_size or int(os.getenv("DB_READ_POOL_SIZE", "4"))
+        self.cache_size_kb = int(os.getenv("DB_CACHE_SIZE_KB", "65536"))
+        self.mmap_size = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+        self.writer = None
+        self._readers = queue.Queue()
+        self._write_jobs = queue.Queue()
+        self._writer_thread = None
+        self._read_executor = None
+
+    def _tune(self, conn: sqlite3.Connection):
+        conn.execute(f"PRAGMA cache_size = -{self.cache_size_kb}")
+        conn.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA busy_timeout = 5000")
+
+    def open_writer(self) -> sqlite3.Connection:
+        """
+        Membuka koneksi writer (membuat file DB jika belum ada) dan
+        mengaktifkan WAL (serta auto_vacuum incremental untuk file baru,
+        dipakai retensi). Dipanggil sebelum skema dibuat.
+        """
+        self.writer = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            cached_statements=self.CACHED_STATEMENTS,
+        )
+        # Hanya berlaku untuk file baru: harus diset sebelum WAL/tabel pertama.
+        self.writer.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.writer.execute("PRAGMA journal_mode = WAL")
+        self.writer.execute(f"PRAGMA synchronous = {self.synchronous}")
+        self._tune(self.writer)
+        return self.writer
+
+    def open_readers(self):
+        """
+        Membuka pool koneksi read-only. File DB (dan skemanya) harus sudah ada.
+        """
+        uri = Path(self.path).resolve().as_uri() + "?mode=ro"
+        for _ in range(self.read_pool_size):
+            conn = sqlite3.connect(
+                uri,
+                uri=True,
+                check_same_thread=False,
+                cached_statements=self.CACHED_STATEMENTS,
+            )
+            self._tune(conn)
+            conn.execute("PRAGMA query_only = 1")
+            self._readers.put(conn)
+
+    def start_workers(self, writer: bool = True):
+        """
+        Menjalankan thread writer dan thread pool reader. `writer=False` untuk
+        proses yang hanya membaca (worker HTTP pada mode multi-proses).
+        """
+        if writer:
+            self._writer_thread = threading.Thread(target=self._writer_loop, name="db-writer", daemon=True)
+            self._writer_thread.start()
+        self._read_executor = ThreadPoolExecutor(max_workers=self.read_pool_size, thread_name_prefix="db-reader")
+
+    def _writer_loop(self):
+        while True:
+            job = self._write_jobs.get()
+            if job is None:
+                break
+            loop, future, fn, args = job
+            try:
+                result = fn(self.writer, *args)
+            except BaseException as e:
+                loop.call_soon_threadsafe(_set_future_exception, future, e)
+            else:
+                loop.call_soon_threadsafe(_set_future_result, future, result)
+
+    def write(self, fn, *args) -> asyncio.Future:
+        """
+        Menjadwalkan `fn(writer_conn, *args)` di thread writer.
+        Mengembalikan future yang bisa di-await dari event loop.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._write_jobs.put((loop, future, fn, args))
+        return future
+
+    def read(self, fn, *args) -> asyncio.Future:
+        """
+        Menjalankan `fn(reader_conn, *args)` di thread pool reader.
+        """
+        return asyncio.get_running_loop().run_in_executor(self._read_executor, self._run_read, fn, args)
+
+    def _run_read(self, fn, args):
+        with self.reader() as conn:
+            return fn(conn, *args)
+
+    @contextmanager
+    def reader(self):
+        """
+        Meminjam satu koneksi read-only dari pool; dikembalikan setelah selesai.
+        """
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    def close(self):
+        if self._writer_thread is not None:
+            self._write_jobs.put(None)
+            self._writer_thread.join()
+            self._writer_thread = None
+        if self._read_executor is not None:
+            self._read_executor.shutdown(wait=True)
+            self._read_executor = None
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+def _set_future_result(future: asyncio.Future, result):
+    if not future.cancelled():
+        future.set_result(result)
+
+def _set_future_exception(future: asyncio.Future, exc: BaseException):
+    if not future.cancelled():
+        future.set_exception(exc)
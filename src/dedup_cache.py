@@ -0,0 +1,144 @@
+import math
+from array import array
+import os
+from collections import OrderedDict
+from typing import Hashable, Iterable
+
+# --- Dedup Front Cache (LRU + Bloom Filter) ---
+
+SEEN = "seen"     # Pasti sudah ada di tabel events -> duplikat, tanpa query DB
+NEW = "new"       # Pasti belum ada (Bloom negatif) -> insert tanpa probe
+MAYBE = "maybe"   # Bloom positif -> harus dikonfirmasi ke SQLite
+
+class LRUCache:
+    """
+    Himpunan terbatas berisi key yang baru-baru ini terlihat.
+    Key paling lama tidak dipakai dibuang saat kapasitas penuh.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items = OrderedDict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        if key in self._items:
+            self._items.move_to_end(key)
+            return True
+        return False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, key: Hashable):
+        if self.max_size <= 0:
+            return
+        self._items[key] = None
+        self._items.move_to_end(key)
+        if len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def discard(self, key: Hashable):
+        self._items.pop(key, None)
+
+# Mask 64-bit dengan 2 bit aktif untuk setiap nilai 12-bit (dua posisi 6-bit).
+_PAIR_MASKS = [(1 << (x & 63)) | (1 << (x >> 6)) for x in range(4096)]
+
+class BloomFilter:
+    """
+    Blocked Bloom filter: setiap key hanya menyentuh satu word 64-bit,
+    sehingga cek/tambah cukup satu operasi AND/OR (murah di Python).
+    Tidak pernah false negative; false positive ~`fp_rate` selama jumlah
+    key <= `capacity` (ukuran dilebihkan ~40% untuk menutup efek blocking).
+    """
+
+    WORD_BITS = 64
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.capacity = max(1, capacity)
+        self.fp_rate = fp_rate
+        ideal_bits = -self.capacity * math.log(fp_rate) / (math.log(2) ** 2)
+        self.num_words = max(1, int(ideal_bits * 1.4) // self.WORD_BITS + 1)
+        num_hashes = min(10, max(2, round(ideal_bits / self.capacity * math.log(2))))
+        # Bit diambil berpasangan dari tabel _PAIR_MASKS (12 bit hash per pasang)
+        self._shifts = tuple(range(0, 12 * ((num_hashes + 1) // 2), 12))
+        self.num_hashes = 2 * len(self._shifts)
+        self.words = array("Q", bytes(8 * self.num_words))
+        self.count = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self.num_words * 8
+
+    def _slot(self, key: Hashable):
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        g = (h * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        mask = 0
+        for shift in self._shifts:
+            mask |= _PAIR_MASKS[(g >> shift) & 4095]
+        return h % self.num_words, mask
+
+    def add(self, key: Hashable):
+        index, mask = self._slot(key)
+        self.words[index] |= mask
+        self.count += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        index, mask = self._slot(key)
+        return self.words[index] & mask == mask
+
+class DedupIndex:
+    """
+    Index dedup dua tingkat di depan tabel `events`:
+        1. LRU berisi key (topic, event_id) yang baru saja terlihat -> SEEN.
+        2. Bloom filter semua key di tabel events -> NEW jika negatif, MAYBE jika positif.
+
+    Index ini hanya boleh disentuh dari thread writer, dan key hanya
+    ditambahkan SETELAH transaksi commit. Hasil MAYBE selalu dikonfirmasi
+    ke SQLite, jadi cache tidak pernah menyebabkan event baru terbuang.
+
+    Konfigurasi lewat env:
+        DEDUP_LRU_SIZE        : jumlah key di LRU (default 100000, 0 = nonaktif)
+        DEDUP_BLOOM_CAPACITY  : kapasitas key Bloom filter (default 1000000, 0 = nonaktif)
+        DEDUP_BLOOM_FP_RATE   : target false positive rate (default 0.01)
+    """
+
+    def __init__(self, lru_size: int = None, bloom_capacity: int = None, fp_rate: float = None):
+        lru_size = int(os.getenv("DEDUP_LRU_SIZE", "100000")) if lru_size is None else lru_size
+        bloom_capacity = int(os.getenv("DEDUP_BLOOM_CAPACITY", "1000000")) if bloom_capacity is None else bloom_capacity
+        fp_rate = float(os.getenv("DEDUP_BLOOM_FP_RATE", "0.01")) if fp_rate is None else fp_rate
+
+        self.lru = LRUCache(lru_size)
+        self.bloom = BloomFilter(bloom_capacity, fp_rate) if bloom_capacity > 0 else None
+
+    def lookup(self, key: Hashable) -> str:
+        if key in self.lru:
+            return SEEN
+        if self.bloom is not None and key not in self.bloom:
+            return NEW
+        return MAYBE
+
+    def add(self, key: Hashable):
+        """Key baru saja di-commit ke tabel events."""
+        self.lru.add(key)
+        if self.bloom is not None:
+            self.bloom.add(key)
+
+    def remember(self, key: Hashable):
+        """Key sudah terkonfirmasi ada di tabel events (hasil probe)."""
+        self.lru.add(key)
+
+    def forget(self, key: Hashable):
+        """
+        Key dihapus dari tabel events (retensi). Bloom filter tidak bisa
+        menghapus key; sisanya hanya jadi MAYBE yang dikonfirmasi ke SQLite.
+        """
+        self.lru.discard(key)
+
+    def load(self, keys: Iterable[Hashable]):
+        """Mengisi Bloom filter dari semua key yang sudah ada di tabel events."""
+        if self.bloom is None:
+            return
+        for key in keys:
+            self.bloom.add(key)
+        if self.bloom.count > self.bloom.capacity:
+            print(f"[DEDUP] {self.bloom.count} key melebihi DEDUP_BLOOM_CAPACITY={self.bloom.capacity}; false positive akan naik.")
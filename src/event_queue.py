@@ -0,0 +1,197 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+
+# --- Bounded Event Queue (Backpressure & Admission Control) ---
+
+POLICIES = ("block", "reject", "partial")
+
+class QueueFull(Exception):
+    """Batch tidak bisa diterima sekarang; coba lagi setelah `retry_after` detik."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"queue penuh, coba lagi dalam {retry_after}s")
+        self.retry_after = retry_after
+
+class BatchTooLarge(Exception):
+    """Batch lebih besar dari kapasitas queue sehingga tidak akan pernah muat."""
+
+class QueueClosed(Exception):
+    """Queue sudah ditutup (shutdown); event tidak diterima lagi."""
+
+class BoundedEventQueue:
+    """
+    Queue event dengan batas kedalaman dalam jumlah event DAN estimasi byte.
+    Antarmuka `get`/`get_nowait`/`task_done`/`qsize` sama dengan asyncio.Queue
+    sehingga consumer tidak perlu tahu soal batas ini.
+
+    Penerimaan batch mengikuti policy:
+        block   : tunggu sampai batch muat, maksimal `block_timeout` detik, lalu QueueFull
+        reject  : tolak seluruh batch (QueueFull) jika tidak muat
+        partial : terima sebanyak yang muat (`room_for`), sisanya ditolak
+
+    Event yang diterima langsung dipesan (`reserve`, atau `admit_all` untuk
+    block/reject) dan dihitung sebagai isi queue sampai di-put dengan
+    `put_nowait(..., reserved=True)`, jadi admission yang berjalan
+    bersamaan tidak bisa melewati batas.
+
+    Konfigurasi lewat env:
+        QUEUE_MAX_EVENTS      : maksimal event di queue (default 100000)
+        QUEUE_MAX_BYTES       : maksimal estimasi byte di queue (default 268435456)
+        QUEUE_POLICY          : block | reject | partial (default block)
+        QUEUE_BLOCK_TIMEOUT_S : batas tunggu policy block (default 5)
+    """
+
+    def __init__(self, max_events: int = None, max_bytes: int = None, policy: str = None, block_timeout: float = None):
+        self.max_events = int(os.getenv("QUEUE_MAX_EVENTS", "100000")) if max_events is None else max_events
+        self.max_bytes = int(os.getenv("QUEUE_MAX_BYTES", str(256 * 1024 * 1024))) if max_bytes is None else max_bytes
+        self.policy = (policy or os.getenv("QUEUE_POLICY", "block")).lower()
+        self.block_timeout = float(os.getenv("QUEUE_BLOCK_TIMEOUT_S", "5")) if block_timeout is None else block_timeout
+        if self.policy not in POLICIES:
+            raise ValueError(f"QUEUE_POLICY harus salah satu dari {POLICIES}, bukan '{self.policy}'")
+
+        self._queue = asyncio.Queue()
+        self._enqueued_at = deque()  # time.monotonic() tiap item, urutan FIFO yang sama dengan _queue
+        self._space_freed = asyncio.Event()
+        self.size_bytes = 0
+        self.reserved_events = 0
+        self.reserved_bytes = 0.0
+        self.closed = False
+
+        # Laju drain (event/detik), dihitung per jendela ~1 detik (EWMA)
+        self.drain_rate = 0.0
+        self._drained = 0
+        self._window_start = time.monotonic()
+
+    # --- Antarmuka mirip asyncio.Queue ---
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def empty(self) -> bool:
+        return self._queue.empty()
+
+    def oldest_enqueued_at(self) -> Optional[float]:
+        """time.monotonic() saat item paling lama (belum diambil consumer) masuk, atau None."""
+        return self._enqueued_at[0] if self._enqueued_at else None
+
+    def put_nowait(self, item, size: float = 0, reserved: bool = False):
+        """`reserved=True` memakai tempat yang sudah dipesan lewat `reserve`/`admit_all`."""
+        if reserved:
+            self.reserved_events -= 1
+            self.reserved_bytes -= size
+        self._queue.put_nowait((item, size))
+        self._enqueued_at.append(time.monotonic())
+        self.size_bytes += size
+
+    async def get(self):
+        return self._release(await self._queue.get())
+
+    def get_nowait(self):
+        return self._release(self._queue.get_nowait())
+
+    def task_done(self):
+        self._queue.task_done()
+
+    async def join(self):
+        await self._queue.join()
+
+    def drain_nowait(self) -> list:
+        """Mengambil semua item yang tersisa (dipakai saat shutdown)."""
+        items = []
+        while not self._queue.empty():
+            items.append(self.get_nowait())
+            self.task_done()
+        return items
+
+    def close(self):
+        """Menolak batch baru; admit_all yang sedang menunggu (policy block) ikut dibangunkan."""
+        self.closed = True
+        self._space_freed.set()
+
+    def _release(self, entry):
+        item, size = entry
+        self._enqueued_at.popleft()
+        self.size_bytes -= size
+        self._note_drained()
+        if not self._space_freed.is_set():
+            self._space_freed.set()
+        return item
+
+    def _note_drained(self):
+        self._drained += 1
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            rate = self._drained / elapsed
+            self.drain_rate = rate if self.drain_rate == 0 else 0.5 * self.drain_rate + 0.5 * rate
+            self._drained = 0
+            self._window_start = now
+
+    # --- Admission control ---
+
+    def room_for(self, count: int, size_per_event: float) -> int:
+        """Jumlah event (maksimal `count`) yang muat saat ini, setelah dikurangi pesanan."""
+        room = self.max_events - self.qsize() - self.reserved_events
+        if size_per_event > 0:
+            room = min(room, int((self.max_bytes - self.size_bytes - self.reserved_bytes) // size_per_event))
+        return max(0, min(count, room))
+
+    def reserve(self, count: int, size_per_event: float):
+        self.reserved_events += count
+        self.reserved_bytes += count * size_per_event
+
+    def unreserve(self, count: int, size_per_event: float):
+        """Mengembalikan pesanan yang batal di-put."""
+        self.reserved_events -= count
+        self.reserved_bytes -= count * size_per_event
+        if not self._space_freed.is_set():
+            self._space_freed.set()
+
+    def retry_after(self, count: int, size_per_event: float) -> int:
+        """
+        Estimasi detik sampai `count` event muat, dihitung dari laju drain saat ini.
+        """
+        excess = count - self.room_for(count, size_per_event)
+        if self.drain_rate <= 0:
+            return 1
+        return max(1, min(60, math.ceil(excess / self.drain_rate)))
+
+async def admit_all(demands: List[Tuple[BoundedEventQueue, int]], size_per_event: float):
+    """
+    Admission semua-atau-tidak-sama-sekali (policy block/reject) untuk
+    beberapa queue sekaligus, misalnya satu batch yang tersebar ke beberapa
+    partisi. Pengecekan ruang dan pemesanan di SEMUA queue terjadi tanpa
+    `await` di antaranya; selama menunggu tidak ada pesanan yang ditahan,
+    sehingga dua batch tidak bisa saling mengunci. Policy dan batas waktu
+    diambil dari queue pertama (semua partisi dikonfigurasi sama).
+    """
+    first = demands[0][0]
+    for queue, count in demands:
+        if queue.closed:
+            raise QueueClosed()
+        if count > queue.max_events or count * size_per_event > queue.max_bytes:
+            raise BatchTooLarge(f"batch {count} event melebihi kapasitas queue")
+
+    deadline = time.monotonic() + (first.block_timeout if first.policy == "block" else 0)
+    while True:
+        short = next(((queue, count) for queue, count in demands
+                      if queue.room_for(count, size_per_event) < count), None)
+        if short is None:
+            for queue, count in demands:
+                queue.reserve(count, size_per_event)
+            return
+        queue, count = short
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise QueueFull(queue.retry_after(count, size_per_event))
+        queue._space_freed.clear()
+        try:
+            await asyncio.wait_for(queue._space_freed.wait(), timeout=remaining)
+        except asyncio.TimeoutError:
+            pass
+        if any(queue.closed for queue, _ in demands):
+            raise QueueClosed()
@@ -0,0 +1,188 @@
+import asyncio
+import os
+import struct
+import zlib
+from typing import Iterator, List, Tuple
+
+# --- Durable Ingest Log (append-only, segmented, group fsync) ---
+
+# Header setiap record: offset (u64), panjang data (u32), crc32 data (u32)
+RECORD_HEADER = struct.Struct("<QII")
+SEGMENT_SUFFIX = ".log"
+
+class IngestLog:
+    """
+    Log append-only bersegmen untuk mode durable-ack.
+
+    Setiap batch yang diterima `/publish` ditulis sebagai satu record dengan
+    offset berurutan. Penulisan (`append`) hanya masuk buffer; `sync(offset)`
+    menunggu sampai record tersebut di-fsync. Banyak request yang menunggu
+    bersamaan berbagi SATU fsync (group fsync), sehingga durabilitas tidak
+    memangkas throughput.
+
+    Segmen diberi nama berdasarkan offset record pertamanya
+    (`00000000000000000042.log`) dan dihapus setelah seluruh isinya
+    di-commit consumer (`truncate_before`).
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.next_offset = 0
+        self.durable_offset = 0  # semua record < durable_offset sudah di-fsync
+        self._segments = []      # base offset setiap segmen, terurut
+        self._file = None
+        self._to_close = []      # segmen lama yang belum di-fsync + ditutup
+        self._sync_task = None
+
+    # --- Buka / tutup ---
+
+    def open(self, min_next_offset: int = 0):
+        """
+        Memindai segmen yang ada, memotong record terakhir yang rusak/terpotong
+        (crash di tengah penulisan), lalu membuka segmen terakhir untuk append.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self._segments = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+
+        self.next_offset = min_next_offset
+        if self._segments:
+            last_path = self._segment_path(self._segments[-1])
+            valid_end, last_offset = _scan_segment(last_path)
+            if valid_end < os.path.getsize(last_path):
+                print(f"[INGEST LOG] Memotong record rusak di ujung {last_path} (byte {valid_end}).")
+                with open(last_path, "r+b") as f:
+                    f.truncate(valid_end)
+            if last_offset is not None:
+                self.next_offset = max(self.next_offset, last_offset + 1)
+            else:
+                self.next_offset = max(self.next_offset, self._segments[-1])
+
+        self.durable_offset = self.next_offset
+        if self._segments:
+            self._file = open(self._segment_path(self._segments[-1]), "ab")
+        else:
+            self._new_segment()
+
+    def close(self):
+        for f in self._to_close:
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        self._to_close = []
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def _segment_path(self, base_offset: int) -> str:
+        return os.path.join(self.directory, f"{base_offset:020d}{SEGMENT_SUFFIX}")
+
+    def _new_segment(self):
+        if self._file is not None:
+            self._to_close.append(self._file)
+        self._segments.append(self.next_offset)
+        self._file = open(self._segment_path(self.next_offset), "ab")
+
+    # --- Tulis ---
+
+    def append(self, data: bytes) -> int:
+        """
+        Menambahkan satu record (buffered, belum durable). Mengembalikan offset-nya.
+        """
+        if self._file.tell() >= self.segment_bytes:
+            self._new_segment()
+        offset = self.next_offset
+        self._file.write(RECORD_HEADER.pack(offset, len(data), zlib.crc32(data)))
+        self._file.write(data)
+        self.next_offset += 1
+        return offset
+
+    async def sync(self, offset: int):
+        """
+        Menunggu sampai record `offset` durable. Pemanggil yang datang saat
+        fsync sedang berjalan akan ikut fsync berikutnya (group fsync).
+        """
+        while self.durable_offset <= offset:
+            if self._sync_task is None or self._sync_task.done():
+                self._sync_task = asyncio.ensure_future(self._sync_once())
+            await asyncio.shield(self._sync_task)
+
+    async def _sync_once(self):
+        target = self.next_offset
+        files = self._to_close + [self._file]
+        self._to_close = []
+        for f in files:
+            f.flush()
+
+        loop = asyncio.get_running_loop()
+        for f in files:
+            await loop.run_in_executor(None, os.fsync, f.fileno())
+        for f in files[:-1]:
+            f.close()
+        self.durable_offset = max(self.durable_offset, target)
+
+    # --- Baca & bersihkan ---
+
+    def read_from(self, offset: int) -> Iterator[Tuple[int, bytes]]:
+        """
+        Membaca semua record dengan offset >= `offset`, berurutan.
+        """
+        if self._file is not None:
+            self._file.flush()
+        for i, base in enumerate(self._segments):
+            next_base = self._segments[i + 1] if i + 1 < len(self._segments) else None
+            if next_base is not None and next_base <= offset:
+                continue
+            for record_offset, data, _ in _iter_segment(self._segment_path(base)):
+                if record_offset >= offset:
+                    yield record_offset, data
+
+    async def truncate_before(self, offset: int):
+        """
+        Menghapus segmen yang seluruh record-nya < `offset` (sudah di-commit).
+        Segmen aktif tidak pernah dihapus. Segmen dilepas dari daftar di
+        event loop; unlink file-nya berjalan di thread executor.
+        """
+        paths = []
+        while len(self._segments) > 1 and self._segments[1] <= offset:
+            paths.append(self._segment_path(self._segments.pop(0)))
+        if paths:
+            await asyncio.get_running_loop().run_in_executor(None, _remove_segments, paths)
+
+def _remove_segments(paths: List[str]):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[INGEST LOG] Gagal menghapus segmen {path}: {e}")
+
+def _iter_segment(path: str) -> Iterator[Tuple[int, bytes, int]]:
+    """
+    Membaca record valid satu per satu: (offset, data, posisi byte akhir record).
+    Berhenti di record pertama yang terpotong atau checksum-nya salah.
+    """
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            offset, length, crc = RECORD_HEADER.unpack(header)
+            data = f.read(length)
+            if len(data) < length or zlib.crc32(data) != crc:
+                return
+            yield offset, data, f.tell()
+
+def _scan_segment(path: str):
+    """Mengembalikan (posisi byte akhir record valid terakhir, offset record terakhir)."""
+    valid_end, last_offset = 0, None
+    for offset, _, end in _iter_segment(path):
+        valid_end, last_offset = end, offset
+    return valid_end, last_offset
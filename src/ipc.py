@@ -0,0 +1,204 @@
+import asyncio
+import itertools
+import os
+import struct
+from typing import Awaitable, Callable, Dict, List
+
+from src.event_queue import BatchTooLarge, QueueClosed, QueueFull
+from src.records import QueuedEvent
+
+# --- IPC Worker HTTP -> Proses Writer (Unix socket) ---
+
+# Batch: jumlah event, lalu per event panjang 5 field + byte-nya. Payload
+# dikirim sebagai byte JSON yang sudah ada, jadi tidak di-encode ulang.
+_COUNT = struct.Struct("<I")
+_FIELDS = struct.Struct("<IIIII")
+
+# Request: panjang body, id request, estimasi byte per event (untuk batas queue)
+_REQUEST = struct.Struct("<IId")
+# Response: id request, status, nilai (jumlah diterima / retry_after)
+_RESPONSE = struct.Struct("<IBI")
+
+STATUS_OK = 0
+STATUS_QUEUE_FULL = 1
+STATUS_TOO_LARGE = 2
+STATUS_ERROR = 3
+STATUS_CLOSED = 4
+
+def encode_batch(events: List[QueuedEvent]) -> bytes:
+    parts = [_COUNT.pack(len(events))]
+    for event in events:
+        topic = event.topic.encode()
+        event_id = event.event_id.encode()
+        timestamp = event.timestamp.encode()
+        source = event.source.encode()
+        parts.append(_FIELDS.pack(len(topic), len(event_id), len(timestamp), len(source), len(event.payload)))
+        parts.extend((topic, event_id, timestamp, source, event.payload))
+    return b"".join(parts)
+
+def decode_batch(data: bytes) -> List[QueuedEvent]:
+    view = memoryview(data)
+    (count,) = _COUNT.unpack_from(view, 0)
+    pos = _COUNT.size
+    events = []
+    for _ in range(count):
+        topic_len, id_len, ts_len, source_len, payload_len = _FIELDS.unpack_from(view, pos)
+        pos += _FIELDS.size
+        topic = str(view[pos:pos + topic_len], "utf-8")
+        pos += topic_len
+        event_id = str(view[pos:pos + id_len], "utf-8")
+        pos += id_len
+        timestamp = str(view[pos:pos + ts_len], "utf-8")
+        pos += ts_len
+        source = str(view[pos:pos + source_len], "utf-8")
+        pos += source_len
+        payload = bytes(view[pos:pos + payload_len])
+        pos += payload_len
+        events.append(QueuedEvent(topic, event_id, timestamp, source, payload))
+    return events
+
+class IngestServer:
+    """
+    Server di proses writer. Setiap batch dari worker diteruskan ke `handler`
+    (jalur ingest biasa: admission control, ingest log, enqueue) sebagai task
+    terpisah, sehingga satu koneksi bisa membawa banyak request bersamaan.
+    """
+
+    def __init__(self, path: str, handler: Callable[[List[QueuedEvent], float], Awaitable[int]]):
+        self.path = path
+        self.handler = handler
+        self._server = None
+        self._connections = set()
+        self._tasks = set()
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            # Koneksi worker ditutup dulu: _serve selesai normal (EOF) dan
+            # wait_closed tidak menunggu koneksi yang masih terbuka.
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        for task in list(self._tasks):
+            task.cancel()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                length, request_id, size_per_event = _REQUEST.unpack(await reader.readexactly(_REQUEST.size))
+                body = await reader.readexactly(length)
+                task = asyncio.create_task(self._handle(writer, request_id, body, size_per_event))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _handle(self, writer: asyncio.StreamWriter, request_id: int, body: bytes, size_per_event: float):
+        try:
+            status, value = STATUS_OK, await self.handler(decode_batch(body), size_per_event)
+        except QueueFull as e:
+            status, value = STATUS_QUEUE_FULL, e.retry_after
+        except BatchTooLarge:
+            status, value = STATUS_TOO_LARGE, 0
+        except QueueClosed:
+            status, value = STATUS_CLOSED, 0
+        except Exception as e:
+            print(f"[IPC] Error memproses batch dari worker: {e}")
+            status, value = STATUS_ERROR, 0
+        if not writer.is_closing():
+            writer.write(_RESPONSE.pack(request_id, status, value))
+
+class IngestClient:
+    """
+    Klien di worker HTTP. Satu koneksi per worker dipakai bersama oleh semua
+    request; respons dicocokkan lewat id request. Koneksi dibuka ulang
+    otomatis jika terputus.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer = None
+        self._reader_task = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._lock = asyncio.Lock()
+
+    async def connect(self, timeout: float = 30.0):
+        """Menunggu proses writer siap (socket ada) maksimal `timeout` detik."""
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.path)
+                break
+            except (FileNotFoundError, ConnectionError):
+                if asyncio.get_running_loop().time() >= deadline:
+                    raise
+                await asyncio.sleep(0.1)
+        self._reader_task = asyncio.create_task(self._read_responses(reader))
+
+    async def _read_responses(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                request_id, status, value = _RESPONSE.unpack(await reader.readexactly(_RESPONSE.size))
+                future = self._pending.pop(request_id, None)
+                if future is not None and not future.done():
+                    future.set_result((status, value))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("koneksi ke proses writer terputus"))
+            self._pending.clear()
+
+    async def submit(self, events: List[QueuedEvent], size_per_event: float) -> int:
+        """
+        Mengirim batch ke writer. Mengembalikan jumlah event yang diterima;
+        raise QueueFull / BatchTooLarge / QueueClosed seperti jalur ingest lokal, atau
+        ConnectionError jika writer tidak bisa dihubungi.
+        """
+        async with self._lock:
+            if self._writer is None:
+                await self.connect(timeout=1.0)
+        writer = self._writer
+        if writer is None:
+            raise ConnectionError("koneksi ke proses writer terputus")
+        body = encode_batch(events)
+        request_id = next(self._ids) & 0xFFFFFFFF
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        writer.write(_REQUEST.pack(len(body), request_id, size_per_event) + body)
+
+        status, value = await future
+        if status == STATUS_OK:
+            return value
+        if status == STATUS_QUEUE_FULL:
+            raise QueueFull(value)
+        if status == STATUS_TOO_LARGE:
+            raise BatchTooLarge("batch melebihi kapasitas queue writer")
+        if status == STATUS_CLOSED:
+            raise QueueClosed()
+        raise RuntimeError("proses writer gagal memproses batch")
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,97 @@
+import asyncio
+import os
+from collections import deque
+from typing import Dict, Iterable, Set
+
+# --- Live Tail (fan-out in-memory) ---
+
+SLOW_POLICIES = ("disconnect", "drop_oldest")
+
+class Subscriber:
+    """
+    Satu koneksi live tail. Event yang sudah di-render ditampung di buffer
+    terbatas; jika penuh, policy menentukan nasibnya:
+        disconnect  : subscriber ditandai `overflowed` dan stream ditutup;
+                      klien menyambung lagi dengan cursor (Last-Event-ID)
+                      sehingga sisa event diambil dari SQLite (tanpa kehilangan)
+        drop_oldest : event paling lama dibuang dan dihitung di `dropped`
+    """
+
+    def __init__(self, topics: Iterable[str], buffer_size: int, policy: str):
+        self.topics = set(topics)
+        self.buffer_size = buffer_size
+        self.policy = policy
+        self.buffer = deque()
+        self.dropped = 0
+        self.overflowed = False
+        self._wakeup = asyncio.Event()
+
+    def push(self, item):
+        if self.overflowed:
+            return
+        if len(self.buffer) >= self.buffer_size:
+            if self.policy == "disconnect":
+                self.overflowed = True
+                self.buffer.clear()
+                self._wakeup.set()
+                return
+            self.buffer.popleft()
+            self.dropped += 1
+        self.buffer.append(item)
+        self._wakeup.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """Menunggu sampai ada item (atau overflow). False jika timeout."""
+        if self.buffer or self.overflowed:
+            return True
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+class Broadcaster:
+    """
+    Fan-out event yang baru di-commit ke subscriber per topik. Dipanggil
+    consumer di event loop setelah commit; setiap event di-render sekali
+    (lewat `render`) lalu item yang sama dibagikan ke semua subscriber topiknya.
+
+    Konfigurasi lewat env:
+        LIVE_TAIL_BUFFER : maksimal event tertunda per subscriber (default 1000)
+        LIVE_TAIL_POLICY : disconnect | drop_oldest (default disconnect)
+    """
+
+    def __init__(self, buffer_size: int = None, policy: str = None):
+        self.buffer_size = max(1, int(os.getenv("LIVE_TAIL_BUFFER", "1000"))) if buffer_size is None else buffer_size
+        self.policy = (policy or os.getenv("LIVE_TAIL_POLICY", "disconnect")).lower()
+        if self.policy not in SLOW_POLICIES:
+            raise ValueError(f"LIVE_TAIL_POLICY harus salah satu dari {SLOW_POLICIES}, bukan '{self.policy}'")
+        self.by_topic: Dict[str, Set[Subscriber]] = {}
+
+    def subscribe(self, topics: Iterable[str]) -> Subscriber:
+        subscriber = Subscriber(topics, self.buffer_size, self.policy)
+        for topic in subscriber.topics:
+            self.by_topic.setdefault(topic, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        for topic in subscriber.topics:
+            subscribers = self.by_topic.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self.by_topic[topic]
+
+    def publish(self, topic: str, item_factory):
+        """
+        Membagikan satu event ke subscriber `topic`. `item_factory()` hanya
+        dipanggil jika ada subscriber, sehingga tanpa subscriber biayanya
+        hanya satu lookup dict.
+        """
+        subscribers = self.by_topic.get(topic)
+        if not subscribers:
+            return
+        item = item_factory()
+        for subscriber in list(subscribers):
+            subscriber.push(item)
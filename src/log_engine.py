@@ -0,0 +1,499 @@
+import asyncio
+import math
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate, repeat
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.records import QueuedEvent
+from src.storage import EventRow, StorageEngine
+
+# --- Storage Engine: Segment Log Append-Only + Hash Index In-Memory ---
+
+# Record (satu per batch): panjang body, crc32 body, posisi ingest log
+# (offset -1 = tidak ada). Body berisi entri event berurutan: panjang 5 field
+# lalu byte-nya (topic, event_id, timestamp, source, payload).
+_RECORD = struct.Struct("<IIqI")
+_EVENT = struct.Struct("<IIIII")
+SEGMENT_SUFFIX = ".seg"
+
+# Snapshot index: magic, versi, segmen & byte yang sudah tercakup, posisi
+# ingest log, jumlah topik, panjang body, crc32 body (zlib). Body per topik
+# disimpan per kolom agar bisa dimuat tanpa loop per entri: header (panjang
+# nama, jumlah entri, panjang teks timestamp, panjang teks event_id), nama,
+# array panjang timestamp & event_id (dalam karakter), array lokasi, lalu
+# teks timestamp & event_id yang digabung.
+SNAPSHOT_FILE = "index.snapshot"
+_SNAP_MAGIC = b"AGLI"
+_SNAP_VERSION = 1
+_SNAP_HEADER = struct.Struct("<4sBIQqIIQI")
+_SNAP_TOPIC = struct.Struct("<HIII")
+
+# Lokasi entri dikemas dalam satu int: segmen | offset byte (32 bit) | panjang (24 bit).
+_LENGTH_BITS = 24
+_OFFSET_BITS = 32
+MAX_ENTRY_BYTES = (1 << _LENGTH_BITS) - 1
+MAX_SEGMENT_BYTES = 1 << _OFFSET_BITS
+
+def pack_location(segment: int, offset: int, length: int) -> int:
+    return (segment << (_OFFSET_BITS + _LENGTH_BITS)) | (offset << _LENGTH_BITS) | length
+
+def unpack_location(location: int) -> Tuple[int, int, int]:
+    return (location >> (_OFFSET_BITS + _LENGTH_BITS),
+            (location >> _LENGTH_BITS) & (MAX_SEGMENT_BYTES - 1),
+            location & MAX_ENTRY_BYTES)
+
+def encode_entry(event: QueuedEvent) -> bytes:
+    topic = event.topic.encode()
+    event_id = event.event_id.encode()
+    timestamp = event.timestamp.encode()
+    source = event.source.encode()
+    return b"".join((
+        _EVENT.pack(len(topic), len(event_id), len(timestamp), len(source), len(event.payload)),
+        topic, event_id, timestamp, source, event.payload,
+    ))
+
+def decode_entry(data: bytes) -> EventRow:
+    topic_len, id_len, ts_len, source_len, payload_len = _EVENT.unpack_from(data, 0)
+    pos = _EVENT.size
+    topic = data[pos:pos + topic_len].decode()
+    pos += topic_len
+    event_id = data[pos:pos + id_len].decode()
+    pos += id_len
+    timestamp = data[pos:pos + ts_len].decode()
+    pos += ts_len
+    source = data[pos:pos + source_len].decode()
+    pos += source_len
+    return topic, event_id, timestamp, source, data[pos:pos + payload_len]
+
+def _iter_records(path: str, start: int = 0) -> Iterator[Tuple[int, bytes, Tuple[int, int], int]]:
+    """
+    Record valid mulai byte `start`, satu per satu: (posisi byte awal body,
+    body, posisi ingest log, posisi byte akhir). Berhenti di record
+    terpotong/checksum salah.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        while True:
+            header = f.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                return
+            length, crc, log_offset, log_index = _RECORD.unpack(header)
+            start = f.tell()
+            body = f.read(length)
+            if len(body) < length or zlib.crc32(body) != crc:
+                return
+            yield start, body, (log_offset, log_index), f.tell()
+
+def _to_le(column: array) -> array:
+    """Array disimpan little-endian apa pun urutan byte mesinnya (di tempat)."""
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+def _split(text: str, lengths: array) -> List[str]:
+    """Memotong teks gabungan menjadi string sesuai panjang masing-masing."""
+    offsets = list(accumulate(lengths, initial=0))
+    return list(map(text.__getitem__, map(slice, offsets, offsets[1:])))
+
+def _iter_entries(body: bytes) -> Iterator[Tuple[int, int, str, str, str]]:
+    """(posisi entri di body, panjang entri, topic, event_id, timestamp) tanpa decode payload."""
+    pos = 0
+    end = len(body)
+    while pos < end:
+        topic_len, id_len, ts_len, source_len, payload_len = _EVENT.unpack_from(body, pos)
+        start = pos
+        pos += _EVENT.size
+        topic = body[pos:pos + topic_len].decode()
+        pos += topic_len
+        event_id = body[pos:pos + id_len].decode()
+        pos += id_len
+        timestamp = body[pos:pos + ts_len].decode()
+        pos += ts_len + source_len + payload_len
+        yield start, pos - start, topic, event_id, timestamp
+
+class _TopicIndex:
+    """
+    Entri (timestamp, event_id, lokasi) satu topik. `log` hanya ditambah di
+    ujung sehingga snapshot cukup mencatat panjangnya; `entries` adalah
+    salinan terurut yang digabung malas dari `log` saat dibaca.
+    """
+
+    __slots__ = ("log", "entries", "tail_sorted")
+
+    def __init__(self):
+        self.log = []
+        self.entries = []
+        self.tail_sorted = True  # log[len(entries):] berurutan dan tidak lebih kecil dari entries[-1]
+
+    def add(self, entry: Tuple[str, str, int]):
+        if self.tail_sorted:
+            last = self.log[-1] if len(self.log) > len(self.entries) else (self.entries[-1] if self.entries else None)
+            if last is not None and entry < last:
+                self.tail_sorted = False
+        self.log.append(entry)
+
+    def ensure_sorted(self):
+        if len(self.log) > len(self.entries):
+            self.entries.extend(self.log[len(self.entries):])
+            if not self.tail_sorted:
+                self.entries.sort()
+                self.tail_sorted = True
+
+class LogEngine(StorageEngine):
+    """
+    Engine untuk beban tulis append-only: setiap batch ditulis sebagai satu
+    record ber-checksum di ujung segmen log (`00000000.seg`, ...), tanpa
+    B-tree. Dedup memakai hash set (topic, event_id) di memori, dan scan
+    topik memakai daftar (timestamp, event_id, lokasi) per topik; payload
+    dibaca dari file dengan `os.pread`.
+
+    Index dibangun ulang saat startup dari snapshot terakhir (`index.snapshot`,
+    ditulis di background setiap `snapshot_events` event baru dan saat
+    close) ditambah replay record setelah posisi snapshot, sehingga startup
+    tidak perlu membaca seluruh log. Record terakhir yang terpotong (crash
+    di tengah penulisan) dibuang.
+
+    Durabilitas setara SQLite WAL + synchronous=NORMAL: record di-flush ke
+    OS setiap batch, fsync saat pindah segmen, snapshot, dan close. Dengan
+    `sync_batches=True` (mode durable-ack) setiap batch di-fsync sebelum
+    selesai, setara synchronous=FULL. Event tidak pernah dihapus (tanpa retensi).
+    """
+
+    name = "log"
+    sql_features = False
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, snapshot_events: int = 100000,
+                 read_pool_size: int = 4, sync_batches: bool = False):
+        self.directory = directory
+        self.sync_batches = sync_batches
+        self.segment_bytes = min(segment_bytes, MAX_SEGMENT_BYTES - 1)
+        self.snapshot_events = snapshot_events
+        self._keys = set()
+        self._topics: Dict[str, _TopicIndex] = {}
+        self._lock = threading.Lock()
+        self._log_position = None
+        self._segment = 0
+        self._file = None
+        self._read_fds = {}
+        self._unsnapshotted = 0
+        self._snapshot_thread = None
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-writer")
+        self._readers = ThreadPoolExecutor(max_workers=read_pool_size, thread_name_prefix="log-reader")
+        self._open()
+
+    # --- Buka / tutup ---
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:08d}{SEGMENT_SUFFIX}")
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        segments = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX)
+        )
+        started = time.perf_counter()
+        start_segment, start_offset = self._load_snapshot()
+        loaded = len(self._keys)
+
+        for segment in segments:
+            if segment < start_segment:
+                continue
+            path = self._segment_path(segment)
+            valid_end = start_offset if segment == start_segment else 0
+            for body_start, body, log_position, end in _iter_records(path, valid_end):
+                self._index_body(segment, body_start, body, log_position)
+                valid_end = end
+            if valid_end < os.path.getsize(path):
+                print(f"[LOG ENGINE] Memotong record rusak di ujung {path} (byte {valid_end}).")
+                with open(path, "r+b") as f:
+                    f.truncate(valid_end)
+        self._unsnapshotted = len(self._keys) - loaded
+
+        self._segment = segments[-1] if segments else 0
+        self._file = open(self._segment_path(self._segment), "ab")
+        print(f"[LOG ENGINE] {self.directory}: {len(self._keys)} key ({loaded} dari snapshot, "
+              f"{len(self._keys) - loaded} dari replay log) dalam {time.perf_counter() - started:.2f}s.")
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if self._unsnapshotted:
+                self._write_snapshot(*self._snapshot_state())
+            self._file.close()
+            self._file = None
+        for fd in self._read_fds.values():
+            os.close(fd)
+        self._read_fds = {}
+
+    # --- Index ---
+
+    def _index_body(self, segment: int, body_start: int, body: bytes, log_position: Tuple[int, int]):
+        for start, length, topic, event_id, timestamp in _iter_entries(body):
+            self._keys.add((topic, event_id))
+            index = self._topics.get(topic)
+            if index is None:
+                index = self._topics[topic] = _TopicIndex()
+            index.add((timestamp, event_id, pack_location(segment, body_start + start, length)))
+        if log_position[0] >= 0:
+            self._log_position = log_position
+
+    # --- Tulis (thread writer) ---
+
+    def insert_if_absent(self, events: List[QueuedEvent], dedup=None,
+                         log_position: Optional[Tuple[int, int]] = None) -> asyncio.Future:
+        # `dedup` (Bloom/LRU) tidak dipakai: hash set engine ini sudah pasti.
+        return asyncio.get_running_loop().run_in_executor(self._writer, self._write_batch, events, log_position)
+
+    def _write_batch(self, events: List[QueuedEvent], log_position: Optional[Tuple[int, int]]) -> List[bool]:
+        results = [False] * len(events)
+        fresh = []
+        entries = []
+        seen_in_batch = set()
+        for i, event in enumerate(events):
+            key = (event.topic, event.event_id)
+            if key in self._keys or key in seen_in_batch:
+                continue
+            seen_in_batch.add(key)
+            entry = encode_entry(event)
+            if len(entry) > MAX_ENTRY_BYTES:
+                raise ValueError(f"event {event.topic}/{event.event_id} terlalu besar untuk log engine ({len(entry)} byte)")
+            results[i] = True
+            fresh.append(event)
+            entries.append(entry)
+        if not fresh and log_position is None:
+            return results
+
+        if self._file is None:
+            self._open_next_segment()
+        elif self._file.tell() >= self.segment_bytes:
+            self._roll_segment()
+        body = b"".join(entries)
+        log_offset, log_index = log_position if log_position is not None else (-1, 0)
+        record_start = self._file.tell()
+        body_start = record_start + _RECORD.size
+        try:
+            self._file.write(_RECORD.pack(len(body), zlib.crc32(body), log_offset, log_index))
+            self._file.write(body)
+            self._file.flush()
+            if self.sync_batches:
+                os.fsync(self._file.fileno())
+        except BaseException:
+            self._discard_partial_record(record_start)
+            raise
+
+        with self._lock:
+            pos = body_start
+            for event, entry in zip(fresh, entries):
+                self._keys.add((event.topic, event.event_id))
+                index = self._topics.get(event.topic)
+                if index is None:
+                    index = self._topics[event.topic] = _TopicIndex()
+                index.add((event.timestamp, event.event_id, pack_location(self._segment, pos, len(entry))))
+                pos += len(entry)
+            if log_position is not None:
+                self._log_position = log_position
+
+        self._unsnapshotted += len(fresh)
+        if self._unsnapshotted >= self.snapshot_events and (self._snapshot_thread is None or not self._snapshot_thread.is_alive()):
+            self._start_snapshot()
+        return results
+
+    def _roll_segment(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._open_next_segment()
+
+    def _open_next_segment(self):
+        self._segment += 1
+        self._file = open(self._segment_path(self._segment), "ab")
+
+    def _discard_partial_record(self, record_start: int):
+        """
+        Membuang record yang gagal ditulis sebagian (mis. ENOSPC di antara
+        header dan body) sebelum batch diulang consumer. Tanpa ini record
+        berikutnya ditulis di belakang byte rusak, dan startup memotong
+        segmen di byte rusak itu beserta semua record setelahnya. Jika
+        pemotongan gagal, batch berikutnya ditulis di segmen baru: byte
+        rusak di ujung segmen lama dipotong saat startup tanpa menyentuh
+        segmen setelahnya.
+        """
+        path = self._segment_path(self._segment)
+        try:
+            self._file.close()  # buffer yang gagal di-flush ikut dibuang; fd tetap ditutup
+        except OSError:
+            pass
+        self._file = None
+        try:
+            os.truncate(path, record_start)
+            self._file = open(path, "ab")
+        except OSError as e:
+            print(f"[LOG ENGINE] Gagal memotong {path} ke byte {record_start} ({e}); batch berikutnya ke segmen baru.")
+            self._open_next_segment()
+
+    # --- Snapshot index ---
+
+    def _snapshot_state(self):
+        """
+        Panjang `log` tiap topik + posisi log yang tercakup (dipanggil di
+        thread writer). O(jumlah topik): entri disalin thread snapshot.
+        """
+        with self._lock:
+            topics = [(topic, index.log, len(index.log)) for topic, index in self._topics.items()]
+            return topics, self._segment, self._file.tell(), self._log_position
+
+    def _start_snapshot(self):
+        self._file.flush()
+        state = self._snapshot_state()
+        self._unsnapshotted = 0
+        self._snapshot_thread = threading.Thread(target=self._write_snapshot, args=state, name="log-snapshot", daemon=True)
+        self._snapshot_thread.start()
+
+    def _write_snapshot(self, topics, segment: int, offset: int, log_position: Optional[Tuple[int, int]]):
+        # Record yang dirujuk snapshot harus sudah di disk sebelum snapshot-nya.
+        fd = os.open(self._segment_path(segment), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        parts = []
+        for topic, log, count in topics:
+            entries = log[:count]  # `log` hanya ditambah di ujung: prefiks ini tetap
+            name = topic.encode()
+            timestamps, event_ids, locations = zip(*entries) if entries else ((), (), ())
+            ts_text = "".join(timestamps).encode()
+            id_text = "".join(event_ids).encode()
+            parts.append(_SNAP_TOPIC.pack(len(name), len(entries), len(ts_text), len(id_text)))
+            parts.append(name)
+            parts.append(_to_le(array("I", map(len, timestamps))))
+            parts.append(_to_le(array("I", map(len, event_ids))))
+            parts.append(_to_le(array("Q", locations)))
+            parts.append(ts_text)
+            parts.append(id_text)
+        body = zlib.compress(b"".join(parts), 1)
+        log_offset, log_index = log_position if log_position is not None else (-1, 0)
+
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        with open(path + ".tmp", "wb") as f:
+            f.write(_SNAP_HEADER.pack(_SNAP_MAGIC, _SNAP_VERSION, segment, offset, log_offset, log_index,
+                                      len(topics), len(body), zlib.crc32(body)))
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def _load_snapshot(self) -> Tuple[int, int]:
+        """Memuat snapshot jika valid; mengembalikan (segmen, byte) awal replay."""
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if not os.path.exists(path):
+            return 0, 0
+        with open(path, "rb") as f:
+            header = f.read(_SNAP_HEADER.size)
+            body = f.read()
+        if len(header) < _SNAP_HEADER.size:
+            print(f"[LOG ENGINE] Snapshot {path} terpotong; index dibangun dari seluruh log.")
+            return 0, 0
+        magic, version, segment, offset, log_offset, log_index, topic_count, length, crc = _SNAP_HEADER.unpack(header)
+        if magic != _SNAP_MAGIC or version != _SNAP_VERSION or len(body) != length or zlib.crc32(body) != crc:
+            print(f"[LOG ENGINE] Snapshot {path} rusak; index dibangun dari seluruh log.")
+            return 0, 0
+
+        data = memoryview(zlib.decompress(body))
+        pos = 0
+        for _ in range(topic_count):
+            name_len, count, ts_bytes, id_bytes = _SNAP_TOPIC.unpack_from(data, pos)
+            pos += _SNAP_TOPIC.size
+            topic = bytes(data[pos:pos + name_len]).decode()
+            pos += name_len
+            columns = []
+            for typecode in ("I", "I", "Q"):
+                column = array(typecode)
+                column.frombytes(data[pos:pos + count * column.itemsize])
+                pos += count * column.itemsize
+                columns.append(_to_le(column))
+            ts_lengths, id_lengths, locations = columns
+            timestamps = _split(bytes(data[pos:pos + ts_bytes]).decode(), ts_lengths)
+            pos += ts_bytes
+            event_ids = _split(bytes(data[pos:pos + id_bytes]).decode(), id_lengths)
+            pos += id_bytes
+
+            index = self._topics[topic] = _TopicIndex()
+            index.log = list(zip(timestamps, event_ids, locations))
+            index.tail_sorted = False
+            self._keys.update(zip(repeat(topic), event_ids))
+        if log_offset >= 0:
+            self._log_position = (log_offset, log_index)
+        return segment, offset
+
+    # --- Baca (thread pool reader) ---
+
+    def _segment_fd(self, segment: int) -> int:
+        fd = self._read_fds.get(segment)
+        if fd is None:
+            with self._lock:
+                fd = self._read_fds.get(segment)
+                if fd is None:
+                    fd = self._read_fds[segment] = os.open(self._segment_path(segment), os.O_RDONLY)
+        return fd
+
+    def _read_entry(self, location: int) -> EventRow:
+        segment, offset, length = unpack_location(location)
+        return decode_entry(os.pread(self._segment_fd(segment), length, offset))
+
+    def _scan(self, topic: str, after, since, until, limit) -> List[EventRow]:
+        with self._lock:
+            index = self._topics.get(topic)
+            if index is None:
+                return []
+            index.ensure_sorted()
+            entries = index.entries
+            start = 0
+            if after is not None:
+                start = bisect_right(entries, (after[0], after[1], math.inf))
+            if since is not None:
+                start = max(start, bisect_left(entries, (since,)))
+            end = len(entries) if limit is None else min(len(entries), start + limit)
+            selected = entries[start:end]
+        if until is not None:
+            selected = selected[:bisect_left(selected, (until,))]
+        return [self._read_entry(location) for _, _, location in selected]
+
+    def scan_topic(self, topic: str, after: Optional[Tuple[str, str]] = None, since: Optional[str] = None,
+                   until: Optional[str] = None, limit: Optional[int] = None) -> asyncio.Future:
+        return asyncio.get_running_loop().run_in_executor(self._readers, self._scan, topic, after, since, until, limit)
+
+    def _tail(self, topic: str) -> Tuple[str, str]:
+        with self._lock:
+            index = self._topics.get(topic)
+            if index is None or not index.log:
+                return ("", "")
+            index.ensure_sorted()
+            timestamp, event_id, _ = index.entries[-1]
+            return (timestamp, event_id)
+
+    def topic_tail(self, topic: str) -> asyncio.Future:
+        return asyncio.get_running_loop().run_in_executor(self._readers, self._tail, topic)
+
+    def topic_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {topic: len(index.log) for topic, index in self._topics.items()}
+
+    def log_position(self) -> Optional[Tuple[int, int]]:
+        return self._log_position
+
+    def __len__(self) -> int:
+        return len(self._keys)
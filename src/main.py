@@ -1,12 +1,48 @@
 import asyncio
+import logging
 import sqlite3
 import json
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from contextlib import asynccontextmanager
 from datetime import datetime
 import os
+import time
+import zlib
+import base64
+from collections import Counter
+
+from src.db import Database
+from src.dedup_cache import DedupIndex, MAYBE, NEW
+from src.checkpoint import CheckpointError, read_checkpoint, write_checkpoint
+from src.cluster import FORWARDED_HEADER, Cluster, EventMerge, NodeError, load_cluster, parse_ndjson_rows
+from src.event_queue import BatchTooLarge, BoundedEventQueue, QueueClosed, QueueFull, admit_all
+from src.ingest_log import IngestLog
+from src.ipc import IngestClient, IngestServer
+from src.live_tail import Broadcaster
+from src.log_engine import LogEngine
+from src.metrics import Callback, CounterVec, Histogram, Registry
+from src.payload_index import (
+    FieldNotIndexed, IndexNotReady, add_index_rows, backfill_index_field, check_filters, create_payload_index,
+    filtered_events_sql, index_rows, load_indexed_fields, parse_filters, sync_index_fields,
+)
+from src.records import EventValidationError, QueuedEvent, parse_event_batch
+from src.retention import (
+    RetentionPolicy, age_cutoff, auto_vacuum_mode, delete_events_before, delete_events_older_than,
+    ensure_event_age_index, ensure_key_expiry_index, events_cutoff, expire_keys, incremental_vacuum, list_topics,
+    load_retention_policies, policy_for,
+)
+from src.rollups import (
+    GRANULARITIES, apply_rollups, create_event_rollups, create_rollups_index, format_bucket, parse_timestamp, query_rollups
+)
+from src.shared_stats import STAT_FIELDS, SharedStats
+from src.storage import STORAGE_ENGINES, StorageEngine
+from src.stream_ingest import RecordError, StreamTooLarge, UnsupportedStream, iter_records
+
+logger = logging.getLogger(__name__)
 
 # --- Model Data (Pydantic) ---
 class Event(BaseModel):
@@ -16,169 +52,1105 @@ class Event(BaseModel):
     source: str
     payload: Dict[str, Any]
 
+# Di dalam service, event yang diterima disimpan sebagai QueuedEvent (src/records.py);
+# model Pydantic di atas hanya dipakai sebagai skema API.
+
 # --- State Aplikasi ---
 app_state = {
-    "event_queue": None,
+    "mode": "standalone",
+    "partitions": [],
+    "ingest_log": None,
+    "ingest_server": None,
+    "ingest_client": None,
+    "shared_stats": None,
+    "cluster": None,
+    "live_tail": None,
+    "payload_compress_min_bytes": None,
+    "indexed_fields": {},
     "stats": {
         "received": 0,
         "unique_processed": 0,
         "duplicate_dropped": 0,
+        "rejected": 0,
+        "expired_events": 0,
+        "expired_keys": 0,
         "topics": set()
     },
     "start_time": datetime.now()
 }
 
+# --- Metrics ---
+# Histogram & counter dicatat per thread tanpa lock (lihat src/metrics.py);
+# gauge dibaca dari state yang sudah ada saat /metrics di-scrape.
+
+metrics = Registry()
+PUBLISH_SECONDS = metrics.register(Histogram(
+    "aggregator_publish_duration_seconds", "Waktu penanganan POST /publish."))
+COMMIT_LAG_SECONDS = metrics.register(Histogram(
+    "aggregator_enqueue_to_commit_seconds", "Waktu dari event masuk queue sampai batch-nya di-commit."))
+SQLITE_TXN_SECONDS = metrics.register(Histogram(
+    "aggregator_sqlite_transaction_seconds", "Durasi transaksi batch consumer di SQLite."))
+UNIQUE_EVENTS = metrics.register(CounterVec(
+    "aggregator_events_unique_total", "Event unik yang diproses per topik sejak startup.", "topic"))
+DUPLICATE_EVENTS = metrics.register(CounterVec(
+    "aggregator_events_duplicate_total", "Event duplikat yang dibuang per topik sejak startup.", "topic"))
+
+def _queue_oldest_age(partition) -> float:
+    enqueued_at = partition.queue.oldest_enqueued_at()
+    return time.monotonic() - enqueued_at if enqueued_at is not None else 0.0
+
+metrics.register(Callback(
+    "aggregator_event_queue_depth", "Jumlah event di queue partisi.",
+    lambda: [(p.index, p.queue.qsize()) for p in app_state["partitions"]], label="partition"))
+metrics.register(Callback(
+    "aggregator_event_queue_bytes", "Estimasi byte event di queue partisi.",
+    lambda: [(p.index, p.queue.size_bytes) for p in app_state["partitions"]], label="partition"))
+metrics.register(Callback(
+    "aggregator_event_queue_oldest_age_seconds", "Umur event paling lama yang masih menunggu di queue partisi.",
+    lambda: [(p.index, _queue_oldest_age(p)) for p in app_state["partitions"]], label="partition"))
+metrics.register(Callback(
+    "aggregator_events_received_total", "Event yang diterima ke queue sejak startup.",
+    lambda: app_state["stats"]["received"], kind="counter"))
+metrics.register(Callback(
+    "aggregator_events_rejected_total", "Event yang ditolak admission control sejak startup.",
+    lambda: app_state["stats"]["rejected"], kind="counter"))
+
 # --- Fungsi Database (SQLite) ---
 
-def init_db():
+EVENTS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS events (
+    topic TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    timestamp TEXT,
+    source TEXT,
+    payload,
+    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (topic, event_id)
+) WITHOUT ROWID
+"""
+
+def table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+def init_db(conn: sqlite3.Connection):
     """
-    Menginisialisasi database SQLite dan membuat tabel jika belum ada.
+    Membuat tabel jika belum ada pada koneksi writer.
     Ini adalah kunci untuk persistensi (tahan restart).
+
+    Tabel `events` (WITHOUT ROWID, key (topic, event_id)) sekaligus menjadi
+    dedup store dan penyimpanan event: satu insert per event unik. Baris
+    dengan timestamp/source/payload NULL adalah key saja (event-nya sudah
+    dihapus retensi, tetapi key masih dipakai untuk dedup).
     """
-    DATABASE_FILE = os.getenv("DATABASE_FILE", "aggregator.db")
+    cursor = conn.cursor()
     
-    print(f"Menggunakan database file: {DATABASE_FILE}")
-    with sqlite3.connect(DATABASE_FILE) as conn:
-        cursor = conn.cursor()
-        
+    if table_exists(conn, "dedup_store"):
+        migrate_split_tables(conn)
+    
+    cursor.execute(EVENTS_TABLE_SQL)
+    
+    # Index untuk pembacaan per topik terurut waktu (keyset pagination & filter since/until)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_events_topic_time
+    ON events (topic, timestamp, event_id)
+    """)
+    
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS ingest_offsets (
+        name TEXT PRIMARY KEY,
+        log_offset INTEGER NOT NULL,
+        log_index INTEGER NOT NULL
+    )
+    """)
+    conn.commit()
+    
+    if not table_exists(conn, "topic_stats"):
+        create_topic_stats(conn)
+    if not table_exists(conn, "event_rollups"):
+        create_event_rollups(conn)
+    create_rollups_index(conn)
+    create_payload_index(conn)
+
+def migrate_split_tables(conn: sqlite3.Connection):
+    """
+    Migrasi sekali jalan dari layout lama (dedup_store + processed_events)
+    ke tabel `events`, dalam satu transaksi. Key tanpa baris processed_events
+    menjadi baris key saja. Tabel lama di-drop; halaman yang kosong dipakai
+    ulang SQLite (dan dikembalikan ke OS oleh incremental vacuum retensi).
+    """
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.execute(EVENTS_TABLE_SQL)
+        has_events = table_exists(conn, "processed_events")
+        if has_events:
+            cursor.execute("""
+            INSERT OR IGNORE INTO events (topic, event_id, timestamp, source, payload, processed_at)
+            SELECT d.topic, d.event_id, p.timestamp, p.source, p.payload, d.processed_at
+            FROM dedup_store d LEFT JOIN processed_events p ON p.topic = d.topic AND p.event_id = d.event_id
+            ORDER BY d.topic, d.event_id
+            """)
+        else:
+            cursor.execute("""
+            INSERT OR IGNORE INTO events (topic, event_id, processed_at)
+            SELECT topic, event_id, processed_at FROM dedup_store ORDER BY topic, event_id
+            """)
+        migrated = cursor.rowcount
+        cursor.execute("DROP TABLE dedup_store")
+        if has_events:
+            cursor.execute("DROP TABLE processed_events")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    print(f"Migrasi dedup_store + processed_events -> events: {migrated} key dipindahkan.")
+
+def create_topic_stats(conn: sqlite3.Connection):
+    """
+    Membuat tabel topic_stats (katalog topik + counter event unik per topik)
+    dan mengisinya sekali dari tabel events yang sudah ada, dalam satu
+    transaksi. Setelah itu tabel ini diperbarui consumer di transaksi yang
+    sama dengan insert, sehingga startup tidak perlu memindai events.
+    """
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
         cursor.execute("""
-        CREATE TABLE IF NOT EXISTS dedup_store (
-            topic TEXT,
-            event_id TEXT,
-            processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            PRIMARY KEY (topic, event_id)
+        CREATE TABLE topic_stats (
+            topic TEXT PRIMARY KEY,
+            unique_count INTEGER NOT NULL,
+            first_seen TIMESTAMP,
+            last_seen TIMESTAMP
         )
         """)
-        
         cursor.execute("""
-        CREATE TABLE IF NOT EXISTS processed_events (
-            topic TEXT,
-            event_id TEXT,
-            timestamp TEXT,
-            source TEXT,
-            payload TEXT,
-            UNIQUE(topic, event_id)
-        )
+        INSERT INTO topic_stats (topic, unique_count, first_seen, last_seen)
+        SELECT topic, COUNT(*), MIN(processed_at), MAX(processed_at)
+        FROM events GROUP BY topic
         """)
+        if cursor.rowcount > 0:
+            print(f"Backfill topic_stats: {cursor.rowcount} topik dari events.")
         conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
 
-def load_initial_stats():
+def open_database(path: str = None, read_only: bool = False, durable: bool = False) -> Database:
     """
-    Memuat statistik persisten (event unik & topik) dari DB saat startup.
-    Fungsi ini HANYA memuat stats persisten.
+    Membuka Database (writer + pool reader) untuk `path` (default DATABASE_FILE)
+    dan memastikan skema sudah ada. `read_only=True` hanya membuka pool reader
+    (worker HTTP mode multi-proses); skema harus sudah dibuat proses writer.
+    `durable=True` membuat setiap commit writer di-fsync (synchronous=FULL).
     """
-    DATABASE_FILE = os.getenv("DATABASE_FILE", "aggregator.db")
+    DATABASE_FILE = path or os.getenv("DATABASE_FILE", "aggregator.db")
     
+    print(f"Menggunakan database file: {DATABASE_FILE}")
+    db = Database(DATABASE_FILE, synchronous="FULL" if durable else "NORMAL")
+    if not read_only:
+        init_db(db.open_writer())
+    db.open_readers()
+    db.start_workers(writer=not read_only)
+    return db
+
+def load_initial_stats(partitions: List["Partition"]):
+    """
+    Memuat statistik persisten (event unik & topik) dari semua shard DB saat startup.
+    Fungsi ini HANYA memuat stats persisten, dan hanya membaca counter per
+    topik milik storage engine (tabel topic_stats), bukan memindai event.
+    """
     app_state["stats"]["unique_processed"] = 0
     app_state["stats"]["topics"] = set()
 
-    if not os.path.exists(DATABASE_FILE):
-        return
-
-    try:
-        with sqlite3.connect(DATABASE_FILE) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT COUNT(*) FROM dedup_store")
-            unique_count = cursor.fetchone()[0]
-            app_state["stats"]["unique_processed"] = unique_count
+    for partition in partitions:
+        try:
+            topics = partition.storage.topic_counts()
             
-            cursor.execute("SELECT DISTINCT topic FROM dedup_store")
-            topics = cursor.fetchall()
-            app_state["stats"]["topics"] = {row[0] for row in topics}
+            unique_count = sum(topics.values())
+            app_state["stats"]["unique_processed"] += unique_count
+            app_state["stats"]["topics"].update(topics)
             
-            print(f"Loaded {unique_count} unique events and {len(topics)} topics from DB.")
-    except sqlite3.OperationalError as e:
-        print(f"Error memuat stats (DB mungkin terkunci atau belum siap): {e}")
+            print(f"Loaded {unique_count} unique events and {len(topics)} topics from {partition.db_path}.")
+        except sqlite3.OperationalError as e:
+            print(f"Error memuat stats (DB mungkin terkunci atau belum siap): {e}")
+
+def load_dedup_index(conn: sqlite3.Connection) -> DedupIndex:
+    """
+    Membangun ulang DedupIndex (Bloom filter) dari semua key di tabel events.
+    Dijalankan di background lewat `Database.read()` karena memindai semua
+    key; lihat `install_dedup_index`. Scan lewat index topic/time (yang juga
+    memuat event_id) agar payload tidak ikut dibaca.
+    """
+    dedup = DedupIndex()
+    dedup.load(conn.execute("SELECT topic, event_id FROM events INDEXED BY idx_events_topic_time"))
+    return dedup
+
+# --- Penyimpanan Payload ---
+
+def encode_payload_for_storage(raw: bytes):
+    """
+    Payload disimpan apa adanya sebagai TEXT JSON ringkas, atau sebagai BLOB
+    terkompresi zlib jika PAYLOAD_COMPRESSION=zlib dan ukurannya melewati
+    PAYLOAD_COMPRESSION_MIN_BYTES. Tipe kolom (TEXT vs BLOB) menandai formatnya.
+    """
+    min_bytes = app_state["payload_compress_min_bytes"]
+    if min_bytes is not None and len(raw) >= min_bytes:
+        return zlib.compress(raw, 1)
+    return raw.decode()
+
+def decode_stored_payload(stored) -> bytes:
+    """Mengembalikan byte JSON payload tanpa mem-parse-nya."""
+    if isinstance(stored, bytes):
+        return zlib.decompress(stored)
+    return stored.encode()
 
-def process_event_in_db(event: Event) -> bool:
+def configure_payload_storage():
     """
-    Mencoba memproses dan menyimpan event.
+    Membaca konfigurasi kompresi payload dari env:
+        PAYLOAD_COMPRESSION           : none | zlib (default none)
+        PAYLOAD_COMPRESSION_MIN_BYTES : ukuran minimal payload yang dikompresi (default 1024)
+    """
+    if os.getenv("PAYLOAD_COMPRESSION", "none").lower() == "zlib":
+        app_state["payload_compress_min_bytes"] = int(os.getenv("PAYLOAD_COMPRESSION_MIN_BYTES", "1024"))
+    else:
+        app_state["payload_compress_min_bytes"] = None
+
+class _DedupCacheMismatch(Exception):
+    """Bloom filter menyatakan key baru, tetapi SQLite menolaknya."""
+
+def _write_batch(conn: sqlite3.Connection, events: List[QueuedEvent], fresh: List[int], probe: List[int], results: List[bool], log_position: Optional[Tuple[int, int]]):
+    """
+    Menulis event pada indeks `fresh` (pasti baru, tanpa probe) dengan
+    `executemany`, dan event pada indeks `probe` satu per satu dengan
+    `INSERT OR IGNORE` + cek `changes()`. Satu insert ke tabel `events`
+    per event, key dan isi event sekaligus. Semua dalam satu transaksi,
+    bersama counter topic_stats, rollup agregat, index field payload, dan
+    posisi ingest log yang sudah selesai diproses (jika ada).
+    """
+    with conn:
+        cursor = conn.cursor()
+
+        if log_position is not None:
+            cursor.execute(
+                "INSERT INTO ingest_offsets (name, log_offset, log_index) VALUES ('ingest', ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET log_offset = excluded.log_offset, log_index = excluded.log_index",
+                log_position
+            )
+
+        if fresh:
+            cursor.executemany(
+                "INSERT OR IGNORE INTO events (topic, event_id, timestamp, source, payload) VALUES (?, ?, ?, ?, ?)",
+                [(events[i].topic, events[i].event_id, events[i].timestamp, events[i].source, encode_payload_for_storage(events[i].payload)) for i in fresh]
+            )
+            if cursor.rowcount != len(fresh):
+                raise _DedupCacheMismatch()
+            for i in fresh:
+                results[i] = True
+
+        for i in probe:
+            event = events[i]
+            cursor.execute(
+                "INSERT OR IGNORE INTO events (topic, event_id, timestamp, source, payload) VALUES (?, ?, ?, ?, ?)",
+                (event.topic, event.event_id, event.timestamp, event.source, encode_payload_for_storage(event.payload))
+            )
+            if cursor.rowcount:
+                results[i] = True
+
+        new_per_topic = Counter(events[i].topic for i in fresh + probe if results[i])
+        if new_per_topic:
+            cursor.executemany(
+                "INSERT INTO topic_stats (topic, unique_count, first_seen, last_seen) "
+                "VALUES (?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP) "
+                "ON CONFLICT(topic) DO UPDATE SET unique_count = unique_count + excluded.unique_count, "
+                "last_seen = excluded.last_seen",
+                new_per_topic.items()
+            )
+            apply_rollups(cursor, [(events[i].topic, events[i].source, events[i].timestamp)
+                                   for i in fresh + probe if results[i]])
+            if app_state["indexed_fields"]:
+                add_index_rows(cursor, index_rows(
+                    ((events[i].topic, events[i].event_id, events[i].timestamp, events[i].payload)
+                     for i in fresh + probe if results[i]),
+                    app_state["indexed_fields"]
+                ))
+
+def process_batch_in_db(conn: sqlite3.Connection, events: List[QueuedEvent], dedup: DedupIndex = None, log_position: Optional[Tuple[int, int]] = None) -> List[bool]:
+    """
+    Memproses satu batch event dalam SATU transaksi (group commit).
+    Deduplikasi dilakukan dengan `INSERT OR IGNORE` + cek `changes()`
+    (lewat `cursor.rowcount`), sehingga duplikat di dalam batch yang sama
+    maupun duplikat terhadap data lama terdeteksi per event.
+
+    Jika `dedup` (DedupIndex) diberikan, key yang ada di LRU langsung
+    dianggap duplikat tanpa menyentuh DB, dan key yang negatif di Bloom
+    filter ditulis sekaligus tanpa probe. Hanya hasil "maybe" yang
+    dikonfirmasi ke SQLite per event.
+
+    `log_position` (offset, indeks) adalah posisi ingest log berikutnya yang
+    belum diproses; disimpan di transaksi yang sama (mode durable-ack).
+
+    Mengembalikan:
+        List[bool] sepanjang `events`: True jika event baru, False jika duplikat.
+    """
+    results = [False] * len(events)
+    fresh, probe = [], []
+    seen_in_batch = set()
+
+    for i, event in enumerate(events):
+        key = (event.topic, event.event_id)
+        if key in seen_in_batch:
+            continue
+        seen_in_batch.add(key)
+
+        verdict = dedup.lookup(key) if dedup is not None else MAYBE
+        if verdict == NEW:
+            fresh.append(i)
+        elif verdict == MAYBE:
+            probe.append(i)
+
+    started = time.perf_counter()
+    try:
+        _write_batch(conn, events, fresh, probe, results, log_position)
+    except _DedupCacheMismatch:
+        # Seharusnya tidak terjadi; ulangi batch tanpa mempercayai cache.
+        print("[DEDUP] Bloom filter tidak konsisten dengan tabel events, batch diulang dengan probe penuh.")
+        results = [False] * len(events)
+        probe = sorted(fresh + probe)
+        fresh = []
+        _write_batch(conn, events, fresh, probe, results, log_position)
+    SQLITE_TXN_SECONDS.observe(time.perf_counter() - started)
+
+    if dedup is not None:
+        for i in fresh + probe:
+            key = (events[i].topic, events[i].event_id)
+            if results[i]:
+                dedup.add(key)
+            else:
+                dedup.remember(key)
+
+    return results
+
+def process_event_in_db(conn: sqlite3.Connection, event: QueuedEvent) -> bool:
+    """
+    Mencoba memproses dan menyimpan satu event.
     Ini adalah inti dari logika idempotency dan deduplication.
     
     Mengembalikan:
         True: Jika event baru dan berhasil diproses.
         False: Jika event adalah duplikat.
     """
-    DATABASE_FILE = os.getenv("DATABASE_FILE", "aggregator.db")
-    
     try:
-        with sqlite3.connect(DATABASE_FILE) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "INSERT INTO dedup_store (topic, event_id) VALUES (?, ?)",
-                (event.topic, event.event_id)
-            )
-            
-            cursor.execute(
-                "INSERT INTO processed_events (topic, event_id, timestamp, source, payload) VALUES (?, ?, ?, ?, ?)",
-                (event.topic, event.event_id, event.timestamp, event.source, json.dumps(event.payload))
-            )
-            
-            conn.commit()
-            return True
-            
-    except sqlite3.IntegrityError:
-        return False
+        return process_batch_in_db(conn, [event])[0]
     except Exception as e:
         print(f"Error saat memproses event di DB: {e}")
         return False
 
+class SQLiteEngine(StorageEngine):
+    """
+    Engine default: satu shard SQLite (Database) per partisi. Mendukung
+    semua fitur berbasis SQL; `db` tetap diekspos untuk fitur tersebut.
+    """
+
+    name = "sqlite"
+    sql_features = True
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    def insert_if_absent(self, events: List[QueuedEvent], dedup: DedupIndex = None,
+                         log_position: Optional[Tuple[int, int]] = None) -> asyncio.Future:
+        return self.db.write(process_batch_in_db, events, dedup, log_position)
+
+    def scan_topic(self, topic: str, after: Optional[Tuple[str, str]] = None, since: Optional[str] = None,
+                   until: Optional[str] = None, limit: Optional[int] = None,
+                   where: Optional[List[Tuple[str, str]]] = None) -> asyncio.Future:
+        return self.db.read(fetch_events, topic, after, since, until, limit, where)
+
+    def topic_tail(self, topic: str) -> asyncio.Future:
+        return self.db.read(topic_tail, topic)
+
+    def topic_counts(self) -> Dict[str, int]:
+        with self.db.reader() as conn:
+            return dict(conn.execute("SELECT topic, unique_count FROM topic_stats").fetchall())
+
+    def log_position(self) -> Optional[Tuple[int, int]]:
+        with self.db.reader() as conn:
+            row = conn.execute("SELECT log_offset, log_index FROM ingest_offsets WHERE name = 'ingest'").fetchone()
+        return tuple(row) if row else None
+
+    def close(self):
+        self.db.close()
+
+def open_storage(path: str, read_only: bool = False) -> StorageEngine:
+    """
+    Membuka storage engine satu partisi sesuai env:
+        STORAGE_ENGINE             : sqlite | log (default sqlite)
+        LOG_ENGINE_SEGMENT_BYTES   : ukuran maksimal satu segmen log (default 64 MiB)
+        LOG_ENGINE_SNAPSHOT_EVENTS : event baru di antara dua snapshot index (default 100000)
+    Engine `log` menyimpan segmennya di folder `<shard>.segments`.
+
+    Pada mode durable-ack, setiap batch di-fsync sebelum consumer memotong
+    ingest log (SQLite synchronous=FULL, log engine fsync per batch);
+    tanpa itu event yang sudah di-ack bisa hilang saat listrik padam.
+    """
+    durable = durable_ack_enabled()
+    engine = os.getenv("STORAGE_ENGINE", "sqlite").lower()
+    if engine not in STORAGE_ENGINES:
+        raise ValueError(f"STORAGE_ENGINE harus salah satu dari {STORAGE_ENGINES}, bukan '{engine}'")
+    if engine == "log":
+        print(f"Menggunakan log engine: {path}.segments")
+        return LogEngine(
+            path + ".segments",
+            segment_bytes=int(os.getenv("LOG_ENGINE_SEGMENT_BYTES", str(64 * 1024 * 1024))),
+            snapshot_events=max(1, int(os.getenv("LOG_ENGINE_SNAPSHOT_EVENTS", "100000"))),
+            sync_batches=durable,
+        )
+    return SQLiteEngine(open_database(path, read_only, durable))
+
+# --- Partisi Consumer ---
+
+class Partition:
+    """
+    Satu partisi ingest: queue, storage engine (shard SQLite secara default),
+    dedup index, dan task consumer sendiri. Event dirutekan ke partisi
+    berdasarkan hash topik, sehingga urutan per topik tetap terjaga.
+    """
+
+    def __init__(self, index: int, db_path: str):
+        self.index = index
+        self.db_path = db_path
+        self.queue = BoundedEventQueue()
+        self.storage = None
+        self.db = None       # Database shard jika engine-nya SQLite (fitur berbasis SQL)
+        self.dedup = None
+        self.dedup_loader = None  # future load_dedup_index yang sedang berjalan
+        self.dedup_backlog = []   # key baru yang di-commit selama dedup index dimuat
+        self.consumer_task = None
+        self.retention_task = None
+        self.index_task = None
+        self.pending = 0     # event yang sudah di-enqueue tetapi belum di-commit
+        self.inflight = None # batch yang sudah diambil dari queue tetapi belum dikirim ke writer
+        self.draining = False
+        self.log_offset = 0  # offset ingest log yang sudah di-commit partisi ini
+
+    def enqueue(self, event: QueuedEvent, size: float = 0, reserved: bool = False):
+        event.enqueued_at = time.monotonic()
+        self.queue.put_nowait(event, size, reserved)
+        self.pending += 1
+
+def install_dedup_index(partition: Partition):
+    """
+    Dipanggil consumer di antara batch, atau oleh retensi saat partisi idle
+    (pending == 0); di kedua titik tidak ada batch partisi ini yang sedang ditulis. Jika Bloom filter hasil scan background sudah selesai,
+    key yang di-commit selama scan digabungkan lalu index mulai dipakai.
+    Sebelum itu batch diproses dengan probe penuh ke SQLite.
+    """
+    loader = partition.dedup_loader
+    if loader is None or not loader.done():
+        return
+    partition.dedup_loader = None
+    
+    try:
+        dedup = loader.result()
+    except Exception as e:
+        print(f"[DEDUP] Gagal memuat Bloom filter partisi {partition.index}, hanya LRU yang dipakai: {e}")
+        dedup = DedupIndex(bloom_capacity=0)
+    
+    for key in partition.dedup_backlog:
+        dedup.add(key)
+    partition.dedup_backlog = []
+    partition.dedup = dedup
+    print(f"[DEDUP] Dedup index partisi {partition.index} siap.")
+
+def shard_path(database_file: str, index: int, count: int) -> str:
+    """
+    Lokasi file shard untuk partisi `index`. Dengan satu partisi, DATABASE_FILE
+    dipakai apa adanya; selain itu `aggregator.db` -> `aggregator.p0.db`, dst.
+    """
+    if count == 1:
+        return database_file
+    root, ext = os.path.splitext(database_file)
+    return f"{root}.p{index}{ext}"
+
+def partition_index(topic: str, count: int) -> int:
+    """Hash topik yang stabil antar restart (bukan hash() Python yang diacak)."""
+    return zlib.crc32(topic.encode()) % count
+
+def partition_for(topic: str) -> Partition:
+    partitions = app_state["partitions"]
+    return partitions[partition_index(topic, len(partitions))]
+
+def open_partitions(read_only: bool = False) -> List[Partition]:
+    """
+    Membuka semua partisi sesuai env CONSUMER_PARTITIONS (default 1).
+    Mengubah jumlah partisi memetakan ulang topik ke shard lain, jadi
+    nilai ini harus tetap untuk satu set data (termasuk antara proses
+    writer dan worker HTTP).
+    """
+    DATABASE_FILE = os.getenv("DATABASE_FILE", "aggregator.db")
+    count = max(1, int(os.getenv("CONSUMER_PARTITIONS", "1")))
+    
+    partitions = []
+    for index in range(count):
+        partition = Partition(index, shard_path(DATABASE_FILE, index, count))
+        partition.storage = open_storage(partition.db_path, read_only)
+        partition.db = getattr(partition.storage, "db", None)
+        partitions.append(partition)
+    return partitions
+
 # --- Consumer (Background Task) ---
 
-async def consumer():
+async def collect_batch(queue: asyncio.Queue, max_size: int, max_wait: float,
+                        batch: List[QueuedEvent] = None) -> List[QueuedEvent]:
+    """
+    Mengambil event dari queue sampai `max_size` event terkumpul ATAU
+    `max_wait` detik berlalu sejak event pertama, mana yang lebih dulu.
+    Menunggu (tanpa batas) sampai minimal satu event tersedia.
+    Jika `batch` diberikan, event ditambahkan langsung ke list tersebut,
+    sehingga tetap terlihat pemanggil walau task dibatalkan di tengah jalan.
+    """
+    batch = [] if batch is None else batch
+    batch.append(await queue.get())
+    deadline = asyncio.get_running_loop().time() + max_wait
+
+    while len(batch) < max_size:
+        try:
+            batch.append(queue.get_nowait())
+            continue
+        except asyncio.QueueEmpty:
+            pass
+
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+        except asyncio.TimeoutError:
+            break
+
+    return batch
+
+async def write_batch(partition: "Partition", batch: List[QueuedEvent],
+                      log_position: Optional[Tuple[int, int]], max_delay: float) -> List[bool]:
+    """
+    Menulis satu batch ke storage engine partisi. Jika gagal, batch yang
+    SAMA diulang dengan backoff eksponensial (maksimal `max_delay` detik)
+    sampai berhasil: event tidak pernah dibuang atau dihitung duplikat,
+    dan `pending` / posisi ingest log tidak maju sebelum batch tersimpan.
+    Selama menunggu, batch dicatat sebagai `inflight` sehingga ikut
+    di-checkpoint jika shutdown terjadi. Transaksi yang gagal di-rollback
+    seluruhnya, dan dedup index hanya diperbarui setelah commit.
+    """
+    delay = 0.05
+    while True:
+        # Setelah job masuk antrian writer, batch pasti dikerjakan (close()
+        # storage engine menunggu semua batch), jadi tidak perlu di-checkpoint.
+        written = partition.storage.insert_if_absent(batch, partition.dedup, log_position)
+        partition.inflight = None
+        try:
+            return await written
+        except Exception:
+            logger.exception("Gagal menulis batch %d event di partisi %d; diulang dalam %.2fs",
+                             len(batch), partition.index, delay)
+        partition.inflight = batch
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+async def consumer(partition: "Partition"):
     """
-    Task background yang berjalan terus-menerus.
-    Mengambil event dari queue dan memprosesnya.
+    Task background yang berjalan terus-menerus untuk satu partisi.
+    Mengambil event dari queue partisi per batch (group commit) dan
+    memprosesnya di shard SQLite milik partisi tersebut.
+
+    Ukuran batch diatur lewat env:
+        CONSUMER_BATCH_SIZE       : maksimal event per transaksi (default 500)
+        CONSUMER_BATCH_WAIT_MS    : maksimal waktu tunggu mengisi batch (default 5 ms)
+        SHUTDOWN_DRAIN_BATCH_SIZE : ukuran batch saat menguras queue ketika
+                                    shutdown, tanpa waktu tunggu (default 5000)
+        CONSUMER_RETRY_MAX_S      : batas backoff saat batch gagal ditulis (default 5)
     """
-    print("Consumer task dimulai...")
+    batch_size = max(1, int(os.getenv("CONSUMER_BATCH_SIZE", "500")))
+    batch_wait = float(os.getenv("CONSUMER_BATCH_WAIT_MS", "5")) / 1000.0
+    drain_batch_size = max(batch_size, int(os.getenv("SHUTDOWN_DRAIN_BATCH_SIZE", "5000")))
+    retry_max = float(os.getenv("CONSUMER_RETRY_MAX_S", "5"))
+    print(f"Consumer partisi {partition.index} dimulai (batch_size={batch_size}, batch_wait={batch_wait * 1000:.0f}ms)...")
     
+    queue = partition.queue
     while True:
         try:
-            if app_state["event_queue"] is None:
-                await asyncio.sleep(0.1)
-                continue
-                
-            queue = app_state["event_queue"]
-            event = await queue.get()
+            partition.inflight = []
+            if partition.draining:
+                batch = await collect_batch(queue, drain_batch_size, 0, partition.inflight)
+            else:
+                batch = await collect_batch(queue, batch_size, batch_wait, partition.inflight)
+            install_dedup_index(partition)
             
-            is_new = process_event_in_db(event)
+            # Queue FIFO & urutan append log sama, jadi event terakhir batch
+            # menentukan posisi log yang sudah selesai diproses partisi ini.
+            last = batch[-1]
+            log_position = None
+            if last.log_offset is not None:
+                log_position = (last.log_offset, last.log_index + 1)
             
-            if is_new:
-                app_state["stats"]["unique_processed"] += 1
-                app_state["stats"]["topics"].add(event.topic)
-            else:
-                app_state["stats"]["duplicate_dropped"] += 1
-                print(f"[DUPLICATE] Event duplikat terdeteksi dan dibuang: {event.topic}/{event.event_id}")
+            results = await write_batch(partition, batch, log_position, retry_max)
+            if log_position is not None:
+                partition.log_offset = log_position[0]
             
-            queue.task_done()
+            partition.pending -= len(batch)
+            if log_position is not None:
+                # Aman: commit di atas sudah durable (lihat open_storage), jadi
+                # record yang dipotong tidak lagi dibutuhkan untuk replay.
+                await app_state["ingest_log"].truncate_before(ingest_log_low_watermark())
             
-        except Exception as e:
-            print(f"Error di consumer: {e}")
+            committed_at = time.monotonic()
+            for event, is_new in zip(batch, results):
+                COMMIT_LAG_SECONDS.observe(committed_at - event.enqueued_at)
+                if is_new:
+                    app_state["stats"]["unique_processed"] += 1
+                    app_state["stats"]["topics"].add(event.topic)
+                    UNIQUE_EVENTS.inc(event.topic)
+                    if partition.dedup_loader is not None:
+                        partition.dedup_backlog.append((event.topic, event.event_id))
+                else:
+                    app_state["stats"]["duplicate_dropped"] += 1
+                    DUPLICATE_EVENTS.inc(event.topic)
+                    print(f"[DUPLICATE] Event duplikat terdeteksi dan dibuang: {event.topic}/{event.event_id}")
+                queue.task_done()
+            stats_changed()
+            
+            broadcaster = app_state["live_tail"]
+            if broadcaster.by_topic:
+                for event, is_new in zip(batch, results):
+                    if is_new:
+                        broadcaster.publish(event.topic, lambda e=event: (
+                            e.topic, (e.timestamp, e.event_id),
+                            render_event((e.topic, e.event_id, e.timestamp, e.source, e.payload))
+                        ))
+            
+        except Exception:
+            logger.exception("Error di consumer partisi %d", partition.index)
             await asyncio.sleep(1)
 
+# --- Retensi (Background Task) ---
+
+async def apply_retention(partition: Partition, policies: Dict[str, RetentionPolicy], batch_size: int,
+                          vacuum_pages: int, vacuum: bool) -> int:
+    """
+    Satu putaran retensi untuk satu partisi. Batas penghapusan dihitung di
+    thread reader; penghapusan dikirim ke thread writer per `batch_size`
+    baris, sehingga batch consumer tetap bisa diselang-seling di antaranya.
+    Mengembalikan jumlah baris (event + key) yang dihapus.
+    """
+    db = partition.db
+    stats = app_state["stats"]
+    deleted = 0
+    if partition.pending == 0:
+        install_dedup_index(partition)
+    
+    for topic in await db.read(list_topics):
+        policy = policy_for(policies, topic)
+        if policy is None:
+            continue
+        
+        if policy.max_age_s is not None:
+            cutoff = age_cutoff(policy.max_age_s)
+            while True:
+                count = await db.write(delete_events_older_than, topic, cutoff, batch_size)
+                stats["expired_events"] += count
+                deleted += count
+                if count < batch_size:
+                    break
+        
+        if policy.max_events is not None:
+            cutoff = await db.read(events_cutoff, topic, policy.max_events)
+            while cutoff is not None:
+                count = await db.write(delete_events_before, topic, cutoff, batch_size)
+                stats["expired_events"] += count
+                deleted += count
+                if count < batch_size:
+                    break
+        
+        # Key hanya dihapus setelah dedup index partisi terpasang, agar LRU
+        # yang dibangun dari backlog tidak menyimpan key yang sudah dihapus.
+        if policy.dedup_window_s is not None and partition.dedup_loader is None:
+            while True:
+                keys, events, remaining = await db.write(expire_keys, topic, policy.dedup_window_s, batch_size, partition.dedup)
+                stats["expired_keys"] += keys
+                stats["expired_events"] += events
+                stats["unique_processed"] -= keys
+                deleted += keys + events
+                if remaining == 0:
+                    stats["topics"].discard(topic)
+                if keys < batch_size:
+                    break
+    
+    if deleted:
+        stats_changed()
+        if vacuum:
+            await db.write(incremental_vacuum, vacuum_pages)
+    return deleted
+
+async def retention_worker(partition: Partition, policies: Dict[str, RetentionPolicy]):
+    """
+    Task background yang menjalankan retensi setiap RETENTION_INTERVAL_S detik.
+
+    Konfigurasi lewat env:
+        RETENTION_INTERVAL_S   : jeda antar putaran (default 60)
+        RETENTION_BATCH_SIZE   : maksimal baris per transaksi hapus (default 1000)
+        RETENTION_VACUUM_PAGES : maksimal halaman per incremental vacuum (default 1000)
+    """
+    interval = float(os.getenv("RETENTION_INTERVAL_S", "60"))
+    batch_size = max(1, int(os.getenv("RETENTION_BATCH_SIZE", "1000")))
+    vacuum_pages = max(1, int(os.getenv("RETENTION_VACUUM_PAGES", "1000")))
+    
+    if any(policy.dedup_window_s is not None for policy in policies.values()):
+        await partition.db.write(ensure_key_expiry_index)
+    if any(policy.max_age_s is not None for policy in policies.values()):
+        await partition.db.write(ensure_event_age_index)
+    vacuum = await partition.db.read(auto_vacuum_mode) == 2
+    if not vacuum:
+        print(f"[RETENTION] {partition.db.path} dibuat tanpa auto_vacuum=INCREMENTAL; "
+              "ruang kosong dipakai ulang tetapi tidak dikembalikan ke OS sampai VACUUM dijalankan.")
+    
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            deleted = await apply_retention(partition, policies, batch_size, vacuum_pages, vacuum)
+            if deleted:
+                print(f"[RETENTION] Partisi {partition.index}: {deleted} baris kedaluwarsa dihapus.")
+        except Exception as e:
+            print(f"Error di retensi partisi {partition.index}: {e}")
+
+# --- Index Field Payload (Background Task) ---
+
+async def sync_payload_index(partition: Partition, fields_by_topic: Dict[str, Tuple[str, ...]]) -> List[Tuple[str, str]]:
+    """
+    Menyamakan katalog index dengan INDEXED_FIELDS untuk topik milik
+    partisi ini (sebelum traffic dilayani). Mengembalikan field yang perlu
+    di-backfill.
+    """
+    topics = [topic for topic in fields_by_topic if partition_for(topic) is partition]
+    return await partition.db.write(sync_index_fields, fields_by_topic, topics)
+
+async def payload_index_worker(partition: Partition, pending: List[Tuple[str, str]]):
+    """
+    Mengisi index field yang baru dideklarasikan dari event lama per
+    PAYLOAD_INDEX_BACKFILL_BATCH (default 1000) event per transaksi writer.
+    Event baru sudah di-index consumer sejak startup; filter pada field
+    yang belum selesai di-backfill ditolak (503).
+    """
+    batch_size = max(1, int(os.getenv("PAYLOAD_INDEX_BACKFILL_BATCH", "1000")))
+    try:
+        for topic, field in pending:
+            after = None
+            while True:
+                after = await partition.db.write(backfill_index_field, topic, field, after,
+                                                 batch_size, decode_stored_payload)
+                if after is None:
+                    break
+            print(f"[INDEX] Index field '{field}' topik '{topic}' siap.")
+    except Exception as e:
+        print(f"Error membangun index payload partisi {partition.index}: {e}")
+
+# --- Durable Ingest Log ---
+
+def durable_ack_enabled() -> bool:
+    return os.getenv("DURABLE_ACK", "0") == "1"
+
+def encode_log_record(events: List[QueuedEvent]) -> bytes:
+    return b"[" + b", ".join(event.to_json() for event in events) + b"]"
+
+def ingest_log_low_watermark() -> int:
+    """
+    Offset terkecil yang masih dibutuhkan partisi mana pun. Partisi tanpa
+    event tertunda sudah menyelesaikan semua record yang ada di log.
+    """
+    log = app_state["ingest_log"]
+    return min(
+        partition.log_offset if partition.pending else log.next_offset
+        for partition in app_state["partitions"]
+    )
+
+def open_ingest_log(partitions: List[Partition]) -> Optional[IngestLog]:
+    """
+    Jika DURABLE_ACK=1, membuka ingest log dan me-replay semua event yang
+    sudah di-ack tetapi belum di-commit consumer ke queue partisinya.
+    Setiap shard menyimpan posisinya sendiri di storage engine-nya
+    (tabel ingest_offsets untuk SQLite), di-commit bersama batch.
+
+    Konfigurasi lewat env:
+        DURABLE_ACK              : 1 untuk mengaktifkan (default 0)
+        INGEST_LOG_DIR           : folder segmen log (default <DATABASE_FILE>.ingest)
+        INGEST_LOG_SEGMENT_BYTES : ukuran maksimal satu segmen (default 64 MiB)
+    """
+    if not durable_ack_enabled():
+        return None
+    
+    DATABASE_FILE = os.getenv("DATABASE_FILE", "aggregator.db")
+    log_dir = os.getenv("INGEST_LOG_DIR", DATABASE_FILE + ".ingest")
+    segment_bytes = int(os.getenv("INGEST_LOG_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+    
+    positions = []
+    for partition in partitions:
+        positions.append(partition.storage.log_position() or (0, 0))
+        partition.log_offset = positions[-1][0]
+    
+    log = IngestLog(log_dir, segment_bytes)
+    log.open(min_next_offset=max(offset for offset, _ in positions))
+    
+    start_offset = min(offset for offset, _ in positions)
+    replayed = 0
+    for offset, data in log.read_from(start_offset):
+        for index, raw_event in enumerate(json.loads(data)):
+            event = QueuedEvent.from_dict(raw_event)
+            partition = partitions[partition_index(event.topic, len(partitions))]
+            if (offset, index) < positions[partition.index]:
+                continue
+            event.log_offset = offset
+            event.log_index = index
+            partition.enqueue(event)
+            app_state["stats"]["received"] += 1
+            replayed += 1
+    
+    print(f"Ingest log durable aktif di {log_dir} (replay {replayed} event dari offset {start_offset}).")
+    return log
+
+# --- Shutdown: Drain & Checkpoint ---
+
+def checkpoint_path() -> str:
+    return os.getenv("SHUTDOWN_CHECKPOINT_FILE") or os.getenv("DATABASE_FILE", "aggregator.db") + ".checkpoint"
+
+async def restore_checkpoint(partitions: List[Partition]):
+    """
+    Memuat event yang di-checkpoint saat shutdown sebelumnya ke queue
+    partisinya dan menunggu semuanya di-commit SEBELUM aplikasi melayani
+    traffic. File baru dihapus setelah itu; jika proses mati di tengah
+    jalan, checkpoint dimuat ulang dan dedup membuang yang sudah masuk.
+    """
+    path = checkpoint_path()
+    if not os.path.exists(path):
+        return
+    try:
+        events = read_checkpoint(path)
+    except (CheckpointError, OSError) as e:
+        print(f"[CHECKPOINT] {path} tidak bisa dibaca ({e}); disimpan sebagai {path}.corrupt")
+        os.replace(path, path + ".corrupt")
+        return
+    
+    for event in events:
+        partitions[partition_index(event.topic, len(partitions))].enqueue(event)
+        app_state["stats"]["received"] += 1
+    await asyncio.gather(*(partition.queue.join() for partition in partitions))
+    os.unlink(path)
+    print(f"[CHECKPOINT] {len(events)} event dari shutdown sebelumnya dimuat ulang dan di-commit.")
+
+async def drain_partitions(partitions: List[Partition]) -> List[QueuedEvent]:
+    """
+    Menutup penerimaan (publish -> 503), lalu membiarkan consumer menguras
+    queue dengan batch besar sampai kosong atau SHUTDOWN_DRAIN_TIMEOUT_S
+    (default 5, di bawah batas `docker stop` 10 detik) habis. Consumer kemudian dihentikan; event yang belum
+    sempat dikirim ke writer dikembalikan untuk di-checkpoint.
+    """
+    timeout = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT_S", "5"))
+    for partition in partitions:
+        partition.queue.close()
+        partition.draining = True
+    
+    pending = sum(partition.queue.qsize() for partition in partitions)
+    started = time.monotonic()
+    try:
+        await asyncio.wait_for(asyncio.gather(*(partition.queue.join() for partition in partitions)), timeout)
+    except asyncio.TimeoutError:
+        pass
+    
+    leftovers = []
+    for partition in partitions:
+        partition.consumer_task.cancel()
+        try:
+            await partition.consumer_task
+        except asyncio.CancelledError:
+            pass
+        leftovers.extend(partition.inflight or [])
+        leftovers.extend(partition.queue.drain_nowait())
+    if pending:
+        print(f"[SHUTDOWN] {pending - len(leftovers)} dari {pending} event di queue di-commit "
+              f"dalam {time.monotonic() - started:.2f}s; {len(leftovers)} tersisa.")
+    return leftovers
+
+# --- Mode Multi-Proses ---
+# standalone : satu proses (default).
+# writer     : pemilik SQLite; menerima batch dari worker lewat Unix socket
+#              dan menerbitkan /stats ke shared memory.
+# worker     : proses HTTP (uvicorn --workers N); validasi & parsing di sini,
+#              batch diteruskan ke writer, baca langsung dari SQLite (read-only).
+INGEST_MODES = ("standalone", "writer", "worker")
+
+def ingest_socket_path() -> str:
+    return os.getenv("INGEST_SOCKET") or os.getenv("DATABASE_FILE", "aggregator.db") + ".sock"
+
+def shared_stats_name() -> str:
+    """Default diturunkan dari path DB agar writer & worker sepakat tanpa konfigurasi."""
+    path = os.path.abspath(os.getenv("DATABASE_FILE", "aggregator.db"))
+    return os.getenv("SHARED_STATS_NAME") or f"aggregator-{zlib.crc32(path.encode()):08x}"
+
+def write_shared_stats():
+    shared = app_state["shared_stats"]
+    shared.pending = False
+    stats = app_state["stats"]
+    counters = [stats[name] for name in STAT_FIELDS[:-1]]
+    counters.append(sum(partition.queue.qsize() for partition in app_state["partitions"]))
+    # Daftar topik hanya di-serialize ulang jika jumlahnya berubah.
+    topics = None
+    if len(stats["topics"]) != shared.topic_count:
+        shared.topic_count = len(stats["topics"])
+        topics = sorted(stats["topics"])
+    shared.write(counters, app_state["start_time"].timestamp(), topics)
+
+def stats_changed():
+    """
+    Menandai statistik berubah (mode writer). Penulisan ke shared memory
+    digabung: paling banyak sekali per iterasi event loop.
+    """
+    shared = app_state["shared_stats"]
+    if shared is None or shared.pending:
+        return
+    shared.pending = True
+    asyncio.get_running_loop().call_soon(write_shared_stats)
+
+async def ingest_from_worker(events: List[QueuedEvent], size_per_event: float) -> int:
+    accepted, _ = await ingest_events(events, size_per_event)
+    return accepted
+
+async def start_worker_mode():
+    """
+    Worker HTTP: menunggu proses writer (socket IPC), lalu membuka shared
+    stats dan pool reader. Tanpa consumer, retensi, maupun ingest log.
+    """
+    client = IngestClient(ingest_socket_path())
+    await client.connect(timeout=float(os.getenv("INGEST_CONNECT_TIMEOUT_S", "30")))
+    app_state["ingest_client"] = client
+    app_state["shared_stats"] = SharedStats.attach(shared_stats_name())
+    app_state["partitions"] = open_partitions(read_only=True)
+
+async def stop_worker_mode():
+    await app_state["ingest_client"].close()
+    app_state["ingest_client"] = None
+    app_state["shared_stats"].close()
+    app_state["shared_stats"] = None
+    for partition in app_state["partitions"]:
+        partition.storage.close()
+
 # --- FastAPI Lifecycle (Startup & Shutdown) ---
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("Aplikasi startup...")
+    mode = os.getenv("INGEST_MODE", "standalone").lower()
+    if mode not in INGEST_MODES:
+        raise ValueError(f"INGEST_MODE harus salah satu dari {INGEST_MODES}, bukan '{mode}'")
+    app_state["mode"] = mode
+    print(f"Aplikasi startup (mode {mode})...")
+    sql_engine = os.getenv("STORAGE_ENGINE", "sqlite").lower() == "sqlite"
+    if not sql_engine and mode != "standalone":
+        raise ValueError("Mode multi-proses (INGEST_MODE writer/worker) hanya didukung STORAGE_ENGINE=sqlite")
+    cluster = load_cluster()
+    if cluster is not None and mode != "standalone":
+        raise ValueError("Mode cluster (CLUSTER_NODES) hanya didukung INGEST_MODE=standalone")
+    
+    if mode == "worker":
+        await start_worker_mode()
+        yield
+        print("Aplikasi shutdown...")
+        await stop_worker_mode()
+        return
     
     print("Me-reset statistik in-memory...")
     app_state["stats"]["received"] = 0
     app_state["stats"]["duplicate_dropped"] = 0
+    app_state["stats"]["rejected"] = 0
+    app_state["stats"]["expired_events"] = 0
+    app_state["stats"]["expired_keys"] = 0
     app_state["start_time"] = datetime.now()
-    app_state["event_queue"] = asyncio.Queue()
     
-    init_db()
+    configure_payload_storage()
+    retention_policies = load_retention_policies()
+    app_state["indexed_fields"] = load_indexed_fields()
+    if not sql_engine and (retention_policies or app_state["indexed_fields"]):
+        raise ValueError("RETENTION_POLICIES dan INDEXED_FIELDS hanya didukung STORAGE_ENGINE=sqlite")
+    app_state["live_tail"] = Broadcaster()
+    partitions = open_partitions()
+    app_state["partitions"] = partitions
+    
+    load_initial_stats(partitions)
+    
+    # Scan key untuk Bloom filter berjalan di background agar startup
+    # tidak bergantung pada jumlah histori; consumer memasangnya saat siap.
+    # Engine log tidak butuh Bloom filter: hash index-nya sudah di memori.
+    for partition in partitions:
+        if partition.db is not None:
+            partition.dedup_loader = partition.db.read(load_dedup_index)
+    
+    app_state["ingest_log"] = open_ingest_log(partitions)
+    
+    for partition in partitions:
+        partition.consumer_task = asyncio.create_task(consumer(partition))
+    
+    await restore_checkpoint(partitions)
+    
+    for partition in partitions:
+        if partition.db is None:
+            continue
+        pending = await sync_payload_index(partition, app_state["indexed_fields"])
+        if pending:
+            partition.index_task = asyncio.create_task(payload_index_worker(partition, pending))
+    
+    if retention_policies:
+        for partition in partitions:
+            partition.retention_task = asyncio.create_task(retention_worker(partition, retention_policies))
     
-    load_initial_stats()
+    if cluster is not None:
+        await cluster.start()
+        app_state["cluster"] = cluster
+        print(f"Mode cluster: node {cluster.self_index + 1} dari {len(cluster.nodes)} ({cluster.nodes[cluster.self_index]})")
     
-    asyncio.create_task(consumer())
+    if mode == "writer":
+        app_state["shared_stats"] = SharedStats.create(shared_stats_name())
+        write_shared_stats()
+        app_state["ingest_server"] = IngestServer(ingest_socket_path(), ingest_from_worker)
+        await app_state["ingest_server"].start()
+        print(f"Menerima batch dari worker di {ingest_socket_path()}")
     
     yield
     
     print("Aplikasi shutdown...")
+    if app_state["ingest_server"] is not None:
+        await app_state["ingest_server"].close()
+        app_state["ingest_server"] = None
+    for partition in partitions:
+        for task in (partition.retention_task, partition.index_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+    
+    leftovers = await drain_partitions(partitions)
+    if app_state["cluster"] is not None:
+        await app_state["cluster"].close()
+        app_state["cluster"] = None
+    for partition in partitions:
+        if partition.dedup_loader is not None:
+            partition.dedup_loader.cancel()
+    if app_state["ingest_log"] is not None:
+        # Mode durable: sisa event sudah ada di ingest log dan di-replay saat startup.
+        app_state["ingest_log"].close()
+    elif leftovers:
+        write_checkpoint(checkpoint_path(), leftovers)
+        print(f"[CHECKPOINT] {len(leftovers)} event disimpan ke {checkpoint_path()}.")
+    for partition in partitions:
+        partition.storage.close()
+    if app_state["shared_stats"] is not None:
+        app_state["shared_stats"].close()
+        app_state["shared_stats"] = None
 
 # --- Inisialisasi Aplikasi FastAPI ---
 app = FastAPI(lifespan=lifespan)
@@ -189,72 +1161,884 @@ app = FastAPI(lifespan=lifespan)
 def health_check():
     return {"status": "ok"}
 
-@app.post("/publish")
-async def publish_events(events: List[Event], request: Request):
+async def admit_batch(targets: List[Partition], size_per_event: float) -> int:
     """
-    Menerima satu atau batch event dan memasukkannya ke antrian internal.
+    Admission control lintas partisi: setiap sub-batch harus diterima queue
+    partisinya, dan tempatnya dipesan di semua partisi sekaligus (lihat
+    admit_all) sehingga publisher yang berjalan bersamaan tidak bisa
+    melewati QUEUE_MAX_EVENTS / QUEUE_MAX_BYTES. Event yang diterima harus
+    di-enqueue dengan `reserved=True`. Untuk policy partial, yang diterima
+    adalah prefix terpanjang batch yang masih muat, supaya publisher cukup
+    mengirim ulang sisanya.
     """
-    queue = app_state["event_queue"]
+    counts = Counter(partition.index for partition in targets)
+    partitions = app_state["partitions"]
+    if partitions[0].queue.closed:
+        raise QueueClosed()
     
-    if not events:
-        raise HTTPException(status_code=400, detail="Event list tidak boleh kosong")
+    if partitions[0].queue.policy == "partial":
+        room = {index: partitions[index].queue.room_for(count, size_per_event) for index, count in counts.items()}
+        accepted = 0
+        for partition in targets:
+            if room[partition.index] == 0:
+                break
+            room[partition.index] -= 1
+            accepted += 1
+        if accepted == 0:
+            raise QueueFull(targets[0].queue.retry_after(counts[targets[0].index], size_per_event))
+        for index, count in Counter(partition.index for partition in targets[:accepted]).items():
+            partitions[index].queue.reserve(count, size_per_event)
+        return accepted
+    
+    await admit_all([(partitions[index].queue, count) for index, count in counts.items()], size_per_event)
+    return len(targets)
+
+async def ingest_events(events: List[QueuedEvent], size_per_event: float, record: Optional[bytes] = None,
+                        sync: bool = True) -> Tuple[int, Optional[int]]:
+    """
+    Jalur ingest bersama untuk /publish dan /publish/stream: admission control,
+    append ke ingest log (mode durable), lalu enqueue ke partisi masing-masing.
+    `record` adalah byte batch yang sudah ter-encode (misalnya body request)
+    agar tidak perlu di-encode ulang untuk log.
+    
+    Mengembalikan (jumlah event diterima, offset log atau None).
+    Raise QueueFull / BatchTooLarge jika tidak ada yang diterima, atau
+    QueueClosed jika aplikasi sedang shutdown. Di mode
+    worker batch diteruskan ke proses writer (ConnectionError jika writer
+    tidak bisa dihubungi).
+    """
+    if app_state["ingest_client"] is not None:
+        return await app_state["ingest_client"].submit(events, size_per_event), None
+    
+    targets = [partition_for(event.topic) for event in events]
+    
+    try:
+        accepted = await admit_batch(targets, size_per_event)
+    except (BatchTooLarge, QueueFull, QueueClosed):
+        app_state["stats"]["rejected"] += len(events)
+        stats_changed()
+        raise
+    
+    log = app_state["ingest_log"]
+    log_offset = None
+    if log is not None:
+        if record is None or accepted < len(events):
+            record = encode_log_record(events[:accepted])
+        try:
+            log_offset = log.append(record)
+        except Exception:
+            for partition, count in Counter(targets[:accepted]).items():
+                partition.queue.unreserve(count, size_per_event)
+            raise
         
-    for event in events:
-        await queue.put(event)
+    for index in range(accepted):
+        event = events[index]
+        event.log_offset = log_offset
+        event.log_index = index
+        targets[index].enqueue(event, size_per_event, reserved=True)
         app_state["stats"]["received"] += 1
+    
+    app_state["stats"]["rejected"] += len(events) - accepted
+    stats_changed()
+    
+    if sync and log_offset is not None:
+        await log.sync(log_offset)
+    
+    return accepted, log_offset
+
+# --- Mode Cluster: Routing /publish ---
+
+def local_only(request: Request) -> Optional[Cluster]:
+    """
+    Cluster untuk fan-out/routing, atau None jika request sudah diteruskan
+    node lain. FORWARDED_HEADER hanya dipercaya jika berisi CLUSTER_SECRET;
+    nilai lain ditolak 403 agar klien luar tidak bisa melewati routing ring.
+    """
+    cluster = app_state["cluster"]
+    forwarded = request.headers.get(FORWARDED_HEADER)
+    if cluster is None or forwarded is None:
+        return cluster
+    if not cluster.trusts(forwarded):
+        raise HTTPException(status_code=403, detail=f"Header {FORWARDED_HEADER} tidak valid")
+    return None
+
+def ingest_error(e: Exception) -> HTTPException:
+    """Memetakan penolakan ingest (lokal atau node lain) ke respons HTTP."""
+    if isinstance(e, BatchTooLarge):
+        return HTTPException(status_code=413, detail=f"Batch terlalu besar: {e}")
+    if isinstance(e, QueueFull):
+        return HTTPException(
+            status_code=429,
+            detail="Antrian penuh, coba lagi nanti",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    if isinstance(e, QueueClosed):
+        return HTTPException(
+            status_code=503,
+            detail="Server sedang shutdown, kirim ulang ke instance lain atau coba lagi",
+            headers={"Retry-After": "1"}
+        )
+    if isinstance(e, NodeError):
+        headers = {"Retry-After": e.retry_after} if e.retry_after else None
+        return HTTPException(status_code=e.status_code, detail=e.detail, headers=headers)
+    if isinstance(e, ConnectionError):
+        return HTTPException(status_code=503, detail="Proses writer tidak tersedia")
+    raise e
+
+async def ingest_cluster(cluster: Cluster, events: List[QueuedEvent], size_per_event: float) -> Tuple[List[bool], Optional[Exception]]:
+    """
+    Membagi batch per node pemilik key (consistent hashing) lalu mengirim
+    sub-batch secara paralel: milik node ini lewat ingest_events, sisanya
+    lewat POST /publish ke node pemilik (koneksi keep-alive).
+
+    Mengembalikan flag diterima per event dan penolakan pertama (jika ada).
+    Sub-batch yang diterima tidak membentuk prefix batch, jadi publisher
+    perlu mengirim ulang seluruh batch; event yang sudah masuk dibuang
+    sebagai duplikat oleh pemiliknya.
+    """
+    if app_state["partitions"][0].queue.closed:
+        raise QueueClosed()
+    
+    groups = cluster.split(events)
+    
+    async def send(node: int, indexes: List[int]) -> int:
+        batch = [events[index] for index in indexes]
+        if node == cluster.self_index:
+            accepted, _ = await ingest_events(batch, size_per_event)
+            return accepted
+        return await cluster.publish(node, batch)
+    
+    nodes = list(groups)
+    results = await asyncio.gather(*(send(node, groups[node]) for node in nodes), return_exceptions=True)
+    
+    accepted = [False] * len(events)
+    error = None
+    for node, result in zip(nodes, results):
+        if isinstance(result, Exception):
+            if not isinstance(result, (BatchTooLarge, QueueFull, QueueClosed, NodeError, ConnectionError)):
+                raise result
+            error = error or result
+            continue
+        for index in groups[node][:result]:
+            accepted[index] = True
+    return accepted, error
+
+PUBLISH_BODY_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": {"type": "array", "items": Event.model_json_schema()}}},
+    }
+}
+
+@app.post("/publish", openapi_extra=PUBLISH_BODY_SCHEMA)
+async def publish_events(request: Request):
+    """
+    Menerima satu atau batch event dan memasukkannya ke antrian partisi
+    masing-masing (berdasarkan hash topik).
+    
+    Antrian dibatasi (jumlah event & estimasi byte). Jika penuh, respons
+    mengikuti QUEUE_POLICY: menunggu, menolak seluruh batch dengan 429 +
+    `Retry-After`, atau menerima sebagian batch.
+    
+    Pada mode durable-ack, batch yang diterima ditulis ke ingest log dan
+    respons baru dikirim setelah log di-fsync.
+    
+    Body divalidasi langsung menjadi QueuedEvent (lihat `parse_event_batch`),
+    tanpa membangun model Pydantic per event.
+    """
+    started = time.perf_counter()
+    try:
+        return await handle_publish(request)
+    finally:
+        PUBLISH_SECONDS.observe(time.perf_counter() - started)
+
+async def handle_publish(request: Request):
+    body = await request.body()
+    try:
+        events = parse_event_batch(body)
+    except EventValidationError as e:
+        raise RequestValidationError(e.errors)
+    
+    if not events:
+        raise HTTPException(status_code=400, detail="Event list tidak boleh kosong")
+    
+    cluster = local_only(request)
+    if cluster is not None:
+        try:
+            flags, error = await ingest_cluster(cluster, events, len(body) / len(events))
+        except QueueClosed as e:
+            raise ingest_error(e)
+        if error is None and all(flags):
+            return {"status": "events queued", "count": len(events)}
+        if error is None:
+            error = QueueFull(1)
+        failure = ingest_error(error)
+        failure.detail = f"{failure.detail} ({sum(flags)} dari {len(events)} event sudah diterima; kirim ulang seluruh batch)"
+        raise failure
+    
+    try:
+        accepted, _ = await ingest_events(events, len(body) / len(events), record=body)
+    except (BatchTooLarge, QueueFull, QueueClosed, ConnectionError) as e:
+        raise ingest_error(e)
+    
+    if accepted < len(events):
+        return {"status": "events partially queued", "count": accepted, "rejected": len(events) - accepted}
         
     return {"status": "events queued", "count": len(events)}
 
-@app.get("/events")
-async def get_events(topic: str):
+STREAM_MAX_ERRORS = 100
+
+@app.post("/publish/stream")
+async def publish_stream(request: Request):
     """
-    Mengembalikan daftar event unik yang telah diproses untuk topik tertentu.
-    Data diambil dari DB persisten.
+    Ingest streaming untuk upload besar / berumur panjang.
+    
+    Body berupa NDJSON (satu event per baris, default) atau msgpack
+    (`Content-Type: application/msgpack`), opsional dengan
+    `Content-Encoding: gzip` atau `zstd`. Record di-parse dan divalidasi
+    selagi body mengalir, lalu dimasukkan ke antrian per sub-batch
+    (STREAM_INGEST_BATCH, default 500). Saat antrian penuh, pembacaan body
+    ikut tertahan (backpressure ke publisher).
+    
+    Respons melaporkan jumlah diterima/ditolak dan error per baris
+    (maksimal 100 pertama). Jika stream dihentikan di tengah (413 untuk
+    baris/body terlalu besar, 415 untuk format rusak), `detail` respons
+    error berisi laporan yang sama: event yang sudah diterima tetap
+    diproses, dan publisher tahu berapa yang perlu dikirim ulang.
     """
-    DATABASE_FILE = os.getenv("DATABASE_FILE", "aggregator.db")
+    batch_size = max(1, int(os.getenv("STREAM_INGEST_BATCH", "500")))
+    max_line_bytes = int(os.getenv("STREAM_MAX_LINE_BYTES", str(1024 * 1024)))
+    max_body_bytes = int(os.getenv("STREAM_MAX_BODY_BYTES", str(1024 * 1024 * 1024)))
+    cluster = local_only(request)
+    
+    accepted = 0
+    errors = []
+    error_count = 0
+    last_offset = None
+    pending, pending_lines, pending_bytes = [], [], 0
+    
+    def report(line_no: int, message: str):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < STREAM_MAX_ERRORS:
+            errors.append({"line": line_no, "error": message})
+    
+    async def flush():
+        nonlocal accepted, last_offset, pending, pending_lines, pending_bytes
+        if not pending:
+            return
+        batch, lines, size = pending, pending_lines, pending_bytes
+        pending, pending_lines, pending_bytes = [], [], 0
+        if cluster is not None:
+            try:
+                flags, error = await ingest_cluster(cluster, batch, size / len(batch))
+            except QueueClosed as e:
+                flags, error = [False] * len(batch), e
+            accepted += sum(flags)
+            if error is not None:
+                reason = ingest_error(error).detail
+            else:
+                reason = "Antrian penuh (diterima sebagian)"
+            for line_no, ok in zip(lines, flags):
+                if not ok:
+                    report(line_no, reason)
+            return
+        try:
+            count, offset = await ingest_events(batch, size / len(batch), sync=False)
+        except ConnectionError:
+            raise HTTPException(status_code=503, detail="Proses writer tidak tersedia")
+        except QueueClosed:
+            count, offset = 0, None
+            reason = "Server sedang shutdown"
+        except (BatchTooLarge, QueueFull) as e:
+            count, offset = 0, None
+            reason = f"Antrian penuh: {e}"
+        else:
+            reason = "Antrian penuh (diterima sebagian)"
+        accepted += count
+        if offset is not None:
+            last_offset = offset
+        for line_no in lines[count:]:
+            report(line_no, reason)
+    
+    def summary() -> dict:
+        return {
+            "accepted": accepted,
+            "rejected": error_count,
+            "errors": errors,
+            "errors_truncated": error_count > len(errors),
+        }
     
     try:
-        with sqlite3.connect(DATABASE_FILE) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "SELECT * FROM processed_events WHERE topic = ?",
-                (topic,)
+        records = iter_records(
+            request.stream(),
+            request.headers.get("content-type"),
+            request.headers.get("content-encoding"),
+            max_line_bytes,
+            max_body_bytes,
+        )
+        async for line_no, record, size in records:
+            if isinstance(record, RecordError):
+                report(line_no, record.message)
+                continue
+            try:
+                event = QueuedEvent.from_dict(record)
+            except EventValidationError as e:
+                report(line_no, str(e))
+                continue
+            pending.append(event)
+            pending_lines.append(line_no)
+            pending_bytes += size
+            if len(pending) >= batch_size:
+                await flush()
+        await flush()
+    except (UnsupportedStream, StreamTooLarge) as e:
+        if last_offset is not None:
+            await app_state["ingest_log"].sync(last_offset)
+        status_code = 415 if isinstance(e, UnsupportedStream) else 413
+        raise HTTPException(status_code=status_code, detail={"message": str(e), **summary()})
+    
+    if last_offset is not None:
+        await app_state["ingest_log"].sync(last_offset)
+    
+    return {"status": "stream processed", **summary()}
+
+EVENTS_PAGE_SIZE = 1000
+
+def encode_cursor(timestamp: str, event_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([timestamp, event_id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        timestamp, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(timestamp), str(event_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor 'after' tidak valid")
+
+def fetch_events(conn: sqlite3.Connection, topic: str, after: Optional[Tuple[str, str]] = None,
+                 since: Optional[str] = None, until: Optional[str] = None,
+                 limit: Optional[int] = None, where: Optional[List[Tuple[str, str]]] = None) -> List[tuple]:
+    """
+    Membaca event unik satu topik terurut (timestamp, event_id) lewat index
+    (topic, timestamp, event_id). Dijalankan di thread reader.
+
+    `after` adalah posisi keyset (timestamp, event_id) terakhir yang sudah
+    dibaca; `since` (inklusif) dan `until` (eksklusif) membatasi rentang
+    timestamp (dibandingkan sebagai string ISO-8601). `where` berisi filter
+    (field, value) pada field payload ter-index; dijawab lewat tabel
+    payload_index dengan urutan yang sama, sehingga cursor tetap berlaku
+    (field harus sudah dicek dengan `check_filters`).
+
+    Mengembalikan tuple (topic, event_id, timestamp, source, payload_bytes);
+    payload TIDAK di-parse, hanya didekompresi jika perlu.
+    """
+    if where:
+        sql, params = filtered_events_sql(topic, where)
+        col = "i."
+    else:
+        # timestamp NULL = baris key saja (event sudah dihapus retensi)
+        sql = "SELECT topic, event_id, timestamp, source, payload FROM events WHERE topic = ? AND timestamp IS NOT NULL"
+        params = [topic]
+        col = ""
+    if after is not None:
+        sql += f" AND ({col}timestamp, {col}event_id) > (?, ?)"
+        params.extend(after)
+    if since is not None:
+        sql += f" AND {col}timestamp >= ?"
+        params.append(since)
+    if until is not None:
+        sql += f" AND {col}timestamp < ?"
+        params.append(until)
+    sql += f" ORDER BY {col}timestamp, {col}event_id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    
+    return [
+        (row_topic, event_id, timestamp, source, decode_stored_payload(payload))
+        for row_topic, event_id, timestamp, source, payload in conn.execute(sql, params)
+    ]
+
+def render_event(row: tuple) -> bytes:
+    """
+    Menyusun JSON satu event dengan menyisipkan byte payload yang tersimpan
+    langsung (tanpa json.loads + encode ulang).
+    """
+    topic, event_id, timestamp, source, payload = row
+    head = json.dumps({"topic": topic, "event_id": event_id, "timestamp": timestamp, "source": source})
+    return head[:-1].encode() + b', "payload": ' + payload + b"}"
+
+async def stream_events_ndjson(storage: StorageEngine, topic: str, after: Optional[Tuple[str, str]],
+                               since: Optional[str], until: Optional[str], limit: Optional[int],
+                               where: Optional[List[Tuple[str, str]]] = None):
+    """
+    Menghasilkan event sebagai NDJSON per halaman keyset, sehingga seluruh
+    topik tidak pernah dimuat ke memori sekaligus dan tidak ada koneksi
+    reader yang ditahan selama klien membaca.
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        page_size = EVENTS_PAGE_SIZE if remaining is None else min(EVENTS_PAGE_SIZE, remaining)
+        if where:
+            page = await storage.scan_topic(topic, after, since, until, page_size, where)
+        else:
+            page = await storage.scan_topic(topic, after, since, until, page_size)
+        if not page:
+            return
+        yield b"".join(render_event(row) + b"\n" for row in page)
+        if len(page) < page_size:
+            return
+        after = (page[-1][2], page[-1][1])
+        if remaining is not None:
+            remaining -= len(page)
+
+async def cluster_events(cluster: Cluster, storage: StorageEngine, topic: str, cursor: Optional[Tuple[str, str]],
+                         since: Optional[str], until: Optional[str], limit: Optional[int],
+                         filters: Optional[List[Tuple[str, str]]], where: Optional[List[str]], format: str):
+    """
+    GET /events di mode cluster: event satu topik tersebar di semua node
+    (kepemilikan per key), jadi halaman dari shard lokal dan dari setiap
+    node lain (NDJSON, diteruskan apa adanya) di-merge berurutan
+    (timestamp, event_id).
+    """
+    async def local_page(after, page_size):
+        if filters:
+            rows = await storage.scan_topic(topic, after, since, until, page_size, filters)
+        else:
+            rows = await storage.scan_topic(topic, after, since, until, page_size)
+        return [(row[2], row[1], render_event(row)) for row in rows]
+    
+    def remote_page(node: int):
+        async def fetch(after, page_size):
+            params = {"topic": topic, "limit": page_size, "format": "ndjson", "since": since, "until": until, "where": where}
+            if after is not None:
+                params["after"] = encode_cursor(*after)
+            res = await cluster.request(node, "GET", "/events", params={k: v for k, v in params.items() if v is not None})
+            return parse_ndjson_rows(res.content)
+        return fetch
+    
+    fetchers = [local_page if node == cluster.self_index else remote_page(node) for node in range(len(cluster.nodes))]
+    merge = EventMerge(fetchers, cursor, EVENTS_PAGE_SIZE if limit is None else min(limit, EVENTS_PAGE_SIZE))
+    try:
+        await merge.start()
+    except NodeError as e:
+        raise ingest_error(e)
+    
+    if format == "ndjson":
+        async def stream():
+            remaining = limit
+            while remaining is None or remaining > 0:
+                rows = await merge.take(EVENTS_PAGE_SIZE if remaining is None else min(EVENTS_PAGE_SIZE, remaining))
+                if not rows:
+                    return
+                yield b"".join(data + b"\n" for _, _, data in rows)
+                if remaining is not None:
+                    remaining -= len(rows)
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+    
+    try:
+        rows = await merge.take(limit)
+    except NodeError as e:
+        raise ingest_error(e)
+    next_cursor = None
+    if limit is not None and len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1][0], rows[-1][1])
+    body = b"".join((
+        b'{"topic": ', json.dumps(topic).encode(),
+        b', "events": [', b", ".join(data for _, _, data in rows),
+        b'], "next_cursor": ', json.dumps(next_cursor).encode(), b"}",
+    ))
+    return Response(content=body, media_type="application/json")
+
+@app.get("/events")
+async def get_events(
+    request: Request,
+    topic: str,
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    after: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    where: Optional[List[str]] = Query(None, max_length=16),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """
+    Mengembalikan event unik yang telah diproses untuk topik tertentu,
+    terurut (timestamp, event_id).
+    Data diambil langsung dari shard partisi topik tersebut lewat thread pool
+    reader, sehingga event loop tetap bebas melayani request lain. Payload
+    yang tersimpan disisipkan langsung ke respons tanpa decode/encode ulang.
+    
+    - `limit` + `after`: keyset pagination; `next_cursor` di respons dipakai
+      sebagai `after` untuk halaman berikutnya (null jika sudah habis).
+    - `since` / `until`: filter rentang timestamp.
+    - `where=field:value` (boleh berulang, AND): filter field payload yang
+      dideklarasikan di INDEXED_FIELDS untuk topik ini, dijawab lewat index.
+      Angka/boolean ditulis dalam bentuk JSON (`where=code:500`).
+    - `format=ndjson`: respons streaming satu event per baris.
+    
+    Di mode cluster, hasil semua node di-merge dengan urutan dan cursor yang sama.
+    """
+    cursor = decode_cursor(after) if after else None
+    partition = partition_for(topic)
+    storage, db = partition.storage, partition.db
+    
+    filters = None
+    if where:
+        if db is None:
+            raise HTTPException(status_code=400, detail="Filter 'where' hanya didukung STORAGE_ENGINE=sqlite")
+        try:
+            filters = parse_filters(where)
+            await db.read(check_filters, topic, filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except FieldNotIndexed as e:
+            raise HTTPException(status_code=400, detail=f"Field '{e}' tidak di-index untuk topik '{topic}' (lihat INDEXED_FIELDS)")
+        except IndexNotReady as e:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Index field '{e}' masih dibangun dari event lama",
+                headers={"Retry-After": "5"}
             )
-            rows = cursor.fetchall()
-            
-            events_list = []
-            for row in rows:
-                event_data = dict(row)
-                event_data["payload"] = json.loads(event_data["payload"])
-                events_list.append(event_data)
-                
-            return {"topic": topic, "events": events_list}
-            
+    
+    cluster = local_only(request)
+    if cluster is not None:
+        return await cluster_events(cluster, storage, topic, cursor, since, until, limit, filters, where, format)
+    
+    if format == "ndjson":
+        return StreamingResponse(
+            stream_events_ndjson(storage, topic, cursor, since, until, limit, filters),
+            media_type="application/x-ndjson"
+        )
+    
+    try:
+        if filters:
+            rows = await storage.scan_topic(topic, cursor, since, until, limit, filters)
+        else:
+            rows = await storage.scan_topic(topic, cursor, since, until, limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error mengambil data: {e}")
+    
+    next_cursor = None
+    if limit is not None and len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1][2], rows[-1][1])
+    
+    body = b"".join((
+        b'{"topic": ', json.dumps(topic).encode(),
+        b', "events": [', b", ".join(render_event(row) for row in rows),
+        b'], "next_cursor": ', json.dumps(next_cursor).encode(), b"}",
+    ))
+    return Response(content=body, media_type="application/json")
+
+# --- Agregat (Rollup) ---
+
+AGGREGATE_MAX_BUCKETS = 10000
+
+async def cluster_aggregate(cluster: Cluster, local: dict, params: dict, limit: int) -> dict:
+    """
+    Menjumlahkan bucket /aggregate semua node. Setiap node mengembalikan
+    `limit` bucket pertamanya; bucket yang masuk `limit` pertama gabungan
+    pasti ada di `limit` pertama setiap node yang memilikinya, jadi hasil
+    tetap tepat walau tiap node terpotong.
+    """
+    try:
+        remote = await asyncio.gather(*(
+            cluster.request(node, "GET", "/aggregate", params=params)
+            for node in range(len(cluster.nodes)) if node != cluster.self_index
+        ))
+    except NodeError as e:
+        raise ingest_error(e)
+    
+    counts = Counter()
+    truncated = local["truncated"]
+    for result in [local] + [res.json() for res in remote]:
+        truncated = truncated or result["truncated"]
+        for bucket in result["buckets"]:
+            counts[(bucket["bucket"], bucket["topic"], bucket["source"])] += bucket["count"]
+    keys = sorted(counts)
+    return {
+        "granularity": local["granularity"],
+        "buckets": [
+            {"bucket": bucket, "topic": name, "source": event_source, "count": counts[(bucket, name, event_source)]}
+            for bucket, name, event_source in keys[:limit]
+        ],
+        "truncated": truncated or len(keys) > limit,
+    }
+
+@app.get("/aggregate")
+async def get_aggregate(
+    request: Request,
+    topic: Optional[List[str]] = Query(None, max_length=256),
+    granularity: str = Query("1m", pattern="^(1s|1m|1h)$"),
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    source: Optional[str] = None,
+    limit: int = Query(AGGREGATE_MAX_BUCKETS, ge=1, le=AGGREGATE_MAX_BUCKETS),
+):
+    """
+    Jumlah event unik per (bucket waktu, topic, source), dibaca dari tabel
+    rollup yang diperbarui consumer di transaksi yang sama dengan insert,
+    sehingga biayanya sebanding jumlah bucket, bukan jumlah event.
+
+    - `granularity`: lebar bucket 1s | 1m | 1h (menurut `timestamp` event, UTC).
+    - `since` / `until`: rentang ISO-8601; bucket yang mulai di [since, until)
+      (bucket yang memuat `since` ikut dihitung).
+    - `topic` (boleh berulang) dan `source`: filter opsional; tanpa `topic`
+      semua topik di semua partisi.
+    - `limit`: maksimal bucket dikembalikan; `truncated` true jika terpotong.
+    
+    Di mode cluster, bucket dari semua node dijumlahkan.
+    """
+    if not app_state["partitions"][0].storage.sql_features:
+        raise HTTPException(status_code=501, detail="/aggregate hanya tersedia dengan STORAGE_ENGINE=sqlite")
+    bounds = {}
+    for name, value in (("since", since), ("until", until)):
+        if value is not None:
+            bounds[name] = parse_timestamp(value)
+            if bounds[name] is None:
+                raise HTTPException(status_code=400, detail=f"'{name}' bukan timestamp ISO-8601 yang valid")
+    
+    width = GRANULARITIES[granularity]
+    topics = list(dict.fromkeys(topic)) if topic else None
+    if topics is None:
+        targets = [(partition, None) for partition in app_state["partitions"]]
+    else:
+        by_partition = {}
+        for name in topics:
+            by_partition.setdefault(partition_for(name).index, []).append(name)
+        targets = [(app_state["partitions"][index], names) for index, names in by_partition.items()]
+    
+    results = await asyncio.gather(*(
+        partition.db.read(query_rollups, width, names, source, bounds.get("since"), bounds.get("until"), limit + 1)
+        for partition, names in targets
+    ))
+    rows = sorted(row for rows in results for row in rows)
+    
+    result = {
+        "granularity": granularity,
+        "buckets": [
+            {"bucket": format_bucket(bucket), "topic": name, "source": event_source, "count": count}
+            for bucket, name, event_source, count in rows[:limit]
+        ],
+        "truncated": len(rows) > limit,
+    }
+    cluster = local_only(request)
+    if cluster is not None:
+        params = {"topic": topics, "granularity": granularity, "since": since, "until": until, "source": source, "limit": limit}
+        return await cluster_aggregate(cluster, result, {k: v for k, v in params.items() if v is not None}, limit)
+    return result
+
+# --- Live Tail (Server-Sent Events) ---
+
+def encode_tail_cursor(positions: Dict[str, Tuple[str, str]]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(positions, separators=(",", ":")).encode()).decode()
+
+def decode_tail_cursor(cursor: str) -> Dict[str, Tuple[str, str]]:
+    try:
+        positions = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return {str(topic): (str(position[0]), str(position[1])) for topic, position in positions.items()}
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor live tail tidak valid")
+
+def topic_tail(conn: sqlite3.Connection, topic: str) -> Tuple[str, str]:
+    """Posisi (timestamp, event_id) event terakhir topik, atau ("", "") jika kosong."""
+    row = conn.execute(
+        "SELECT timestamp, event_id FROM events WHERE topic = ? AND timestamp IS NOT NULL "
+        "ORDER BY timestamp DESC, event_id DESC LIMIT 1",
+        (topic,)
+    ).fetchone()
+    return tuple(row) if row else ("", "")
+
+def sse_frame(positions: Dict[str, Tuple[str, str]], topic: str, position: Tuple[str, str], data: bytes) -> bytes:
+    """Frame SSE satu event; `id` memuat posisi semua topik (dipakai ulang sebagai Last-Event-ID)."""
+    if position > positions.get(topic, ("", "")):
+        positions[topic] = position
+    return b"id: " + encode_tail_cursor(positions).encode() + b"\nevent: event\ndata: " + data + b"\n\n"
+
+async def live_tail_stream(topics: List[str], positions: Dict[str, Tuple[str, str]],
+                           limit: Optional[int], heartbeat: float):
+    """
+    Backfill dari storage lalu live tail untuk beberapa topik.
+
+    Urutan serah-terima agar tidak ada event yang hilang di antara keduanya:
+        1. backfill per topik dari cursor sampai halaman terakhir,
+        2. subscribe ke broadcaster (event baru mulai ditampung),
+        3. baca sekali lagi dari posisi terakhir untuk event yang di-commit
+           sebelum subscribe tetapi setelah halaman terakhir dibaca,
+        4. kirim event live; key yang sudah terkirim di halaman terakhir /
+           bacaan ulang (disimpan di `recent`) dilewati.
+
+    Posisi di cursor mengikuti urutan (timestamp, event_id) seperti
+    GET /events; event yang datang terlambat dengan timestamp lebih lama dari
+    cursor tidak di-replay saat resume.
+    """
+    broadcaster = app_state["live_tail"]
+    subscriber = None
+    remaining = limit
+    recent = set()
+    
+    async def backfill(topic: str, keep_all: bool):
+        # Sebelum subscribe, hanya halaman terakhir yang mungkin juga datang
+        # lewat broadcaster; setelah subscribe, semua yang dibaca mungkin.
+        nonlocal remaining
+        storage = partition_for(topic).storage
+        page_keys = set()
+        while remaining is None or remaining > 0:
+            page = await storage.scan_topic(topic, positions[topic], None, None, EVENTS_PAGE_SIZE)
+            if not keep_all:
+                page_keys = set()
+            chunk = []
+            for row in page[:remaining]:
+                position = (row[2], row[1])
+                page_keys.add((topic, position))
+                chunk.append(sse_frame(positions, topic, position, render_event(row)))
+            if chunk:
+                yield b"".join(chunk)
+                if remaining is not None:
+                    remaining -= len(chunk)
+            if len(page) < EVENTS_PAGE_SIZE:
+                break
+        recent.update(page_keys)
+    
+    try:
+        for topic in topics:
+            async for chunk in backfill(topic, keep_all=False):
+                yield chunk
+        
+        subscriber = broadcaster.subscribe(topics)
+        for topic in topics:
+            async for chunk in backfill(topic, keep_all=True):
+                yield chunk
+        
+        reported_drops = 0
+        while remaining is None or remaining > 0:
+            if not await subscriber.wait(heartbeat):
+                yield b": ping\n\n"
+                continue
+            if subscriber.overflowed:
+                yield b'event: overflow\ndata: {"reconnect": true}\n\n'
+                return
+            if subscriber.dropped > reported_drops:
+                yield b'event: dropped\ndata: {"count": ' + str(subscriber.dropped - reported_drops).encode() + b"}\n\n"
+                reported_drops = subscriber.dropped
+            
+            chunk = []
+            while subscriber.buffer and (remaining is None or len(chunk) < remaining):
+                topic, position, data = subscriber.buffer.popleft()
+                if (topic, position) in recent:
+                    recent.discard((topic, position))
+                    continue
+                chunk.append(sse_frame(positions, topic, position, data))
+            if chunk:
+                yield b"".join(chunk)
+                if remaining is not None:
+                    remaining -= len(chunk)
+    finally:
+        if subscriber is not None:
+            broadcaster.unsubscribe(subscriber)
+
+@app.get("/events/stream")
+async def stream_live_events(
+    request: Request,
+    topic: List[str] = Query(..., max_length=256),
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+):
+    """
+    Live tail event unik yang baru di-commit untuk satu atau beberapa topik
+    (`?topic=a&topic=b`) sebagai Server-Sent Events.
+
+    - Setiap event dikirim dengan `id` berupa cursor; sambung ulang dengan
+      header `Last-Event-ID` (otomatis oleh EventSource) atau `after=` untuk
+      melanjutkan: event yang terlewat diambil dulu dari storage.
+    - Tanpa cursor, stream mulai dari event terbaru saat ini.
+    - Subscriber yang lambat: lihat LIVE_TAIL_POLICY (event `overflow` atau `dropped`).
+    - `limit`: tutup stream setelah sekian event.
+
+    Konfigurasi lewat env:
+        LIVE_TAIL_HEARTBEAT_S : interval komentar keep-alive (default 15)
+
+    Hanya tersedia di mode standalone: commit terjadi di proses writer,
+    sehingga worker HTTP tidak menerima notifikasi event baru. Belum
+    tersedia di mode cluster (event satu topik di-commit di banyak node).
+    """
+    if app_state["mode"] == "worker":
+        raise HTTPException(status_code=501, detail="Live tail tidak tersedia di mode multi-proses")
+    if app_state["cluster"] is not None:
+        raise HTTPException(status_code=501, detail="Live tail tidak tersedia di mode cluster")
+    topics = list(dict.fromkeys(topic))
+    cursor = after or request.headers.get("last-event-id")
+    positions = decode_tail_cursor(cursor) if cursor else {}
+    for name in topics:
+        if name not in positions:
+            positions[name] = await partition_for(name).storage.topic_tail(name)
+    positions = {name: positions[name] for name in topics}
+    
+    heartbeat = float(os.getenv("LIVE_TAIL_HEARTBEAT_S", "15"))
+    return StreamingResponse(
+        live_tail_stream(topics, positions, limit, heartbeat),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/metrics")
+async def get_metrics():
+    """Metrik operasional dalam format teks Prometheus."""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/stats")
-async def get_stats():
+async def get_stats(request: Request):
     """
     Menampilkan statistik operasional.
     'unique_processed' dan 'topics' diambil dari state yang persisten/di-load.
-    'received' dan 'duplicate_dropped' adalah in-memory dan akan reset saat restart.
+    'received', 'duplicate_dropped' dan counter retensi ('expired_*') adalah
+    in-memory dan akan reset saat restart; 'unique_processed' sudah dikurangi
+    key yang kedaluwarsa.
+    Di mode worker, nilai dibaca dari snapshot shared memory proses writer.
+    Di mode cluster, counter semua node dijumlahkan dan topik digabung;
+    node yang tidak bisa dihubungi dicantumkan di `cluster.unreachable`.
     """
-    uptime_delta = datetime.now() - app_state["start_time"]
+    if app_state["mode"] == "worker":
+        counters, start_time, topics = app_state["shared_stats"].read()
+        uptime = time.time() - start_time
+    else:
+        stats = app_state["stats"]
+        counters = {name: stats[name] for name in STAT_FIELDS[:-1]}
+        counters["queue_depth"] = sum(partition.queue.qsize() for partition in app_state["partitions"])
+        topics = list(stats["topics"])
+        uptime = (datetime.now() - app_state["start_time"]).total_seconds()
     
-    return {
-        "received": app_state["stats"]["received"],
-        "unique_processed": app_state["stats"]["unique_processed"],
-        "duplicate_dropped": app_state["stats"]["duplicate_dropped"],
-        "topics": list(app_state["stats"]["topics"]),
-        "uptime": f"{uptime_delta.total_seconds():.2f}s"
+    result = {
+        **counters,
+        "topics": topics,
+        "uptime": f"{uptime:.2f}s"
     }
+    cluster = local_only(request)
+    if cluster is not None:
+        return await cluster_stats(cluster, result)
+    return result
+
+async def cluster_stats(cluster: Cluster, local: dict) -> dict:
+    peers = [node for node in range(len(cluster.nodes)) if node != cluster.self_index]
+    results = await asyncio.gather(*(cluster.request(node, "GET", "/stats") for node in peers), return_exceptions=True)
+    
+    topics = set(local["topics"])
+    unreachable = []
+    for node, res in zip(peers, results):
+        if isinstance(res, Exception):
+            if not isinstance(res, NodeError):
+                raise res
+            unreachable.append(cluster.nodes[node])
+            continue
+        stats = res.json()
+        for name in STAT_FIELDS:
+            local[name] += stats[name]
+        topics.update(stats["topics"])
+    local["topics"] = sorted(topics)
+    local["cluster"] = {"nodes": len(cluster.nodes), "unreachable": unreachable}
+    return local
 
 if __name__ == "__main__":
     import uvicorn
-    init_db() 
     print("Menjalankan server Uvicorn di http://127.0.D0.1:8080")
     uvicorn.run(app, host="0.0.0.0", port=8080)
 
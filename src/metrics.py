@@ -0,0 +1,148 @@
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# --- Metrics (format teks Prometheus) ---
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class _Sharded:
+    """
+    Basis metrik yang dicatat tanpa lock: setiap thread menulis ke shard
+    miliknya sendiri (thread-local), dan shard baru hanya di-append ke daftar
+    (operasi atomik di CPython). Scrape menjumlahkan semua shard; hasilnya
+    bisa tertinggal satu-dua observasi dari thread lain, tetapi tidak pernah
+    kehilangan data.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+
+    def _new_shard(self):
+        raise NotImplementedError
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = self._new_shard()
+            self._shards.append(shard)
+            return shard
+
+class Histogram(_Sharded):
+    """Histogram dengan bucket tetap (detik). `observe` hanya bisect + dua penjumlahan."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__()
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_shard(self) -> List[float]:
+        # [hitungan per bucket ..., hitungan > bucket terakhir, jumlah nilai]
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value: float):
+        shard = self._shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """(hitungan per bucket termasuk +Inf, jumlah nilai), dijumlahkan dari semua shard."""
+        totals = [0] * (len(self.buckets) + 2)
+        for shard in list(self._shards):
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals[:-1], totals[-1]
+
+    def collect(self) -> List[str]:
+        counts, total = self.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _format_value(float(bound))
+            lines.append(f'{self.name}_bucket{{le="{le}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_format_value(total)}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+class CounterVec(_Sharded):
+    """Counter dengan satu label (misalnya per topik)."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, label: str):
+        super().__init__()
+        self.name = name
+        self.help = help
+        self.label = label
+
+    def _new_shard(self) -> Dict[str, int]:
+        return {}
+
+    def inc(self, label_value: str, amount: int = 1):
+        shard = self._shard()
+        shard[label_value] = shard.get(label_value, 0) + amount
+
+    def snapshot(self) -> Dict[str, int]:
+        totals = {}
+        for shard in list(self._shards):
+            for key, value in list(shard.items()):
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def collect(self) -> List[str]:
+        return [
+            f'{self.name}{{{self.label}="{_escape(key)}"}} {value}'
+            for key, value in sorted(self.snapshot().items())
+        ]
+
+class Callback:
+    """
+    Gauge/counter yang nilainya dibaca saat scrape dari state yang sudah ada
+    (queue, app_state), jadi tidak ada biaya apa pun di hot path.
+    `fn` mengembalikan angka, atau list (nilai_label, angka) jika `label` diisi.
+    """
+
+    def __init__(self, name: str, help: str, fn: Callable, label: str = None, kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.label = label
+        self.kind = kind
+
+    def collect(self) -> List[str]:
+        if self.label is None:
+            return [f"{self.name} {_format_value(self.fn())}"]
+        return [
+            f'{self.name}{{{self.label}="{_escape(str(key))}"}} {_format_value(value)}'
+            for key, value in self.fn()
+        ]
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+
+# --- Launcher Mode Multi-Proses ---
+#
+#   python -m src.multiproc --workers 4 --port 8080
+#
+# Menjalankan satu proses writer (pemilik SQLite: consumer, retensi, ingest
+# log) dan N worker HTTP uvicorn. Worker mem-parse & memvalidasi request
+# secara paralel, lalu meneruskan batch ke writer lewat Unix socket
+# (INGEST_SOCKET); /stats dibaca dari shared memory (SHARED_STATS_NAME).
+
+def run_writer():
+    """Entry point proses writer: menjalankan lifespan app tanpa server HTTP."""
+    os.environ["INGEST_MODE"] = "writer"
+    from src.main import app, lifespan
+
+    async def serve():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, stop.set)
+        # Ctrl+C mengenai seluruh process group; writer baru berhenti setelah
+        # worker HTTP selesai (SIGTERM dari launcher), agar tidak ada batch
+        # yang ditolak di tengah shutdown.
+        loop.add_signal_handler(signal.SIGINT, lambda: None)
+        async with lifespan(app):
+            await stop.wait()
+
+    asyncio.run(serve())
+
+def start_writer(timeout: float = 30.0) -> multiprocessing.Process:
+    """
+    Menjalankan proses writer (spawn, env diwarisi) dan menunggu socket
+    IPC-nya siap.
+    """
+    from src.main import ingest_socket_path
+
+    socket_path = ingest_socket_path()
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    process = multiprocessing.get_context("spawn").Process(target=run_writer, name="aggregator-writer")
+    process.start()
+
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(socket_path):
+        if not process.is_alive():
+            raise RuntimeError(f"Proses writer berhenti saat startup (exit code {process.exitcode})")
+        if time.monotonic() >= deadline:
+            process.terminate()
+            raise TimeoutError(f"Proses writer tidak siap dalam {timeout:.0f}s")
+        time.sleep(0.05)
+    return process
+
+def stop_writer(process: multiprocessing.Process, timeout: float = 30.0):
+    """SIGTERM ke writer; lifespan-nya menguras queue & menutup DB dengan rapi."""
+    if process.is_alive():
+        process.terminate()
+    process.join(timeout)
+    if process.is_alive():
+        print("[MULTIPROC] Writer tidak berhenti tepat waktu; di-kill.")
+        process.kill()
+        process.join()
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregator mode multi-proses (1 writer + N worker HTTP).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    writer = start_writer()
+    print(f"[MULTIPROC] Writer siap (pid {writer.pid}); menjalankan {args.workers} worker HTTP.")
+    try:
+        os.environ["INGEST_MODE"] = "worker"
+        uvicorn.run("src.main:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        stop_writer(writer)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import json
+import os
+import sqlite3
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# --- Index Field Payload (tabel index samping) ---
+
+PAYLOAD_INDEX_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS payload_index (
+        topic TEXT NOT NULL,
+        field TEXT NOT NULL,
+        value TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        event_id TEXT NOT NULL,
+        PRIMARY KEY (topic, field, value, timestamp, event_id)
+    ) WITHOUT ROWID
+    """,
+    # Untuk menghapus entri index saat retensi menghapus event (per topik, urut waktu).
+    "CREATE INDEX IF NOT EXISTS idx_payload_index_event ON payload_index (topic, timestamp, event_id)",
+    """
+    CREATE TABLE IF NOT EXISTS payload_index_fields (
+        topic TEXT NOT NULL,
+        field TEXT NOT NULL,
+        ready INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (topic, field)
+    )
+    """,
+)
+
+class FieldNotIndexed(Exception):
+    """Field tidak dideklarasikan di INDEXED_FIELDS untuk topik tersebut."""
+
+class IndexNotReady(Exception):
+    """Index field masih diisi dari event lama (backfill)."""
+
+def create_payload_index(conn: sqlite3.Connection):
+    for sql in PAYLOAD_INDEX_SQL:
+        conn.execute(sql)
+    conn.commit()
+
+def load_indexed_fields(raw: str = None) -> Dict[str, Tuple[str, ...]]:
+    """
+    Membaca INDEXED_FIELDS (JSON) dari env: {topic: [field, ...]}, misalnya
+        {"logs": ["level", "user.id"]}
+    Field memakai path bertitik ke dalam objek payload.
+    """
+    raw = os.getenv("INDEXED_FIELDS", "") if raw is None else raw
+    if not raw.strip():
+        return {}
+
+    config = json.loads(raw)
+    if not isinstance(config, dict):
+        raise ValueError("INDEXED_FIELDS harus berupa objek JSON {topic: [field, ...]}")
+    fields_by_topic = {}
+    for topic, fields in config.items():
+        if not isinstance(fields, list) or not all(isinstance(f, str) and f for f in fields):
+            raise ValueError(f"INDEXED_FIELDS['{topic}'] harus berupa list nama field")
+        if fields:
+            fields_by_topic[topic] = tuple(dict.fromkeys(fields))
+    return fields_by_topic
+
+def index_value(value) -> Optional[str]:
+    """
+    Nilai yang disimpan di index (dan dibandingkan dengan filter) sebagai
+    teks: string apa adanya, angka/boolean dalam bentuk JSON (`42`, `true`).
+    Objek, array, dan null tidak di-index.
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (bool, int, float)):
+        return json.dumps(value)
+    return None
+
+def field_values(payload: bytes, fields: Iterable[str]) -> List[Tuple[str, str]]:
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        return []
+    values = []
+    for field in fields:
+        value = data
+        for part in field.split("."):
+            if not isinstance(value, dict):
+                value = None
+                break
+            value = value.get(part)
+        text = index_value(value)
+        if text is not None:
+            values.append((field, text))
+    return values
+
+def index_rows(events: Iterable[Tuple[str, str, str, bytes]],
+               fields_by_topic: Dict[str, Tuple[str, ...]]) -> List[Tuple[str, str, str, str, str]]:
+    """
+    Baris index untuk (topic, event_id, timestamp, payload). Payload hanya
+    di-parse untuk topik yang punya field ter-index.
+    """
+    rows = []
+    for topic, event_id, timestamp, payload in events:
+        fields = fields_by_topic.get(topic)
+        if fields:
+            rows.extend((topic, field, value, timestamp, event_id) for field, value in field_values(payload, fields))
+    return rows
+
+def add_index_rows(cursor: sqlite3.Cursor, rows: List[Tuple[str, str, str, str, str]]):
+    if rows:
+        cursor.executemany(
+            "INSERT OR IGNORE INTO payload_index (topic, field, value, timestamp, event_id) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+
+# --- Sinkronisasi Deklarasi & Backfill (dijalankan di thread writer) ---
+
+def sync_index_fields(conn: sqlite3.Connection, fields_by_topic: Dict[str, Tuple[str, ...]],
+                      topics: Iterable[str]) -> List[Tuple[str, str]]:
+    """
+    Menyamakan katalog payload_index_fields dengan deklarasi untuk `topics`
+    (topik milik shard ini): field yang tidak lagi dideklarasikan dihapus
+    beserta entri index-nya, field baru didaftarkan sebagai belum siap.
+    Mengembalikan (topic, field) yang perlu di-backfill.
+    """
+    topics = set(topics)
+    wanted = {(topic, field) for topic, fields in fields_by_topic.items() if topic in topics for field in fields}
+    with conn:
+        existing = dict(((topic, field), ready) for topic, field, ready in
+                        conn.execute("SELECT topic, field, ready FROM payload_index_fields"))
+        for topic, field in existing.keys() - wanted:
+            conn.execute("DELETE FROM payload_index WHERE topic = ? AND field = ?", (topic, field))
+            conn.execute("DELETE FROM payload_index_fields WHERE topic = ? AND field = ?", (topic, field))
+        conn.executemany(
+            "INSERT OR IGNORE INTO payload_index_fields (topic, field, ready) VALUES (?, ?, 0)",
+            sorted(wanted - existing.keys())
+        )
+    return sorted(key for key in wanted if not existing.get(key))
+
+def backfill_index_field(conn: sqlite3.Connection, topic: str, field: str, after: Optional[Tuple[str, str]],
+                         limit: int, decode: Callable[[object], bytes]) -> Optional[Tuple[str, str]]:
+    """
+    Mengisi index satu field dari maksimal `limit` event lama (keyset
+    (timestamp, event_id) setelah `after`) dalam satu transaksi. Jika sudah
+    habis, field ditandai siap dan None dikembalikan; selain itu posisi
+    terakhir untuk langkah berikutnya.
+    """
+    sql = "SELECT event_id, timestamp, payload FROM events WHERE topic = ? AND timestamp IS NOT NULL"
+    params = [topic]
+    if after is not None:
+        sql += " AND (timestamp, event_id) > (?, ?)"
+        params.extend(after)
+    rows = conn.execute(sql + " ORDER BY timestamp, event_id LIMIT ?", params + [limit]).fetchall()
+
+    with conn:
+        add_index_rows(conn.cursor(), index_rows(
+            ((topic, event_id, timestamp, decode(payload)) for event_id, timestamp, payload in rows),
+            {topic: (field,)}
+        ))
+        if len(rows) < limit:
+            conn.execute("UPDATE payload_index_fields SET ready = 1 WHERE topic = ? AND field = ?", (topic, field))
+            return None
+    return rows[-1][1], rows[-1][0]
+
+# --- Query ---
+
+def parse_filters(raw: List[str]) -> List[Tuple[str, str]]:
+    """`field:value` -> (field, value). ValueError jika format salah."""
+    filters = []
+    for item in raw:
+        field, sep, value = item.partition(":")
+        if not sep or not field:
+            raise ValueError(f"filter '{item}' harus berformat field:value")
+        filters.append((field, value))
+    return filters
+
+def check_filters(conn: sqlite3.Connection, topic: str, filters: List[Tuple[str, str]]):
+    """Raise FieldNotIndexed / IndexNotReady jika ada field yang tidak bisa dipakai."""
+    for field, _ in filters:
+        row = conn.execute(
+            "SELECT ready FROM payload_index_fields WHERE topic = ? AND field = ?", (topic, field)
+        ).fetchone()
+        if row is None:
+            raise FieldNotIndexed(field)
+        if not row[0]:
+            raise IndexNotReady(field)
+
+def filtered_events_sql(topic: str, filters: List[Tuple[str, str]]) -> Tuple[str, List[str]]:
+    """
+    Query event lewat index: filter pertama dipakai sebagai range scan
+    (topic, field, value) yang sudah terurut (timestamp, event_id); filter
+    lainnya dicek dengan lookup primary key.
+    """
+    (field, value), rest = filters[0], filters[1:]
+    sql = (
+        "SELECT e.topic, e.event_id, e.timestamp, e.source, e.payload "
+        "FROM payload_index i JOIN events e ON e.topic = i.topic AND e.event_id = i.event_id "
+        "WHERE i.topic = ? AND i.field = ? AND i.value = ? AND e.timestamp IS NOT NULL"
+    )
+    params = [topic, field, value]
+    for field, value in rest:
+        sql += (
+            " AND EXISTS (SELECT 1 FROM payload_index j WHERE j.topic = i.topic AND j.field = ? AND j.value = ?"
+            " AND j.timestamp = i.timestamp AND j.event_id = i.event_id)"
+        )
+        params.extend((field, value))
+    return sql, params
@@ -0,0 +1,106 @@
+import json
+from typing import Any, List, Optional
+
+# --- Representasi Event Internal (hot path ingest) ---
+
+EVENT_FIELDS = ("topic", "event_id", "timestamp", "source")
+
+class EventValidationError(ValueError):
+    """
+    Record event tidak valid. `errors` berformat sama dengan error validasi
+    FastAPI/Pydantic (`loc`, `msg`, `type`) agar respons 422 tetap konsisten.
+    """
+
+    def __init__(self, errors: List[dict]):
+        super().__init__("; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in errors))
+        self.errors = errors
+
+class QueuedEvent:
+    """
+    Record ringkas untuk event yang menunggu di queue. Memakai `__slots__`
+    (tanpa `__dict__` per instance) dan menyimpan payload sebagai byte JSON
+    ringkas, bukan dict bersarang, sehingga backlog yang dalam tetap hemat memori.
+    """
+
+    __slots__ = ("topic", "event_id", "timestamp", "source", "payload", "log_offset", "log_index", "enqueued_at")
+
+    def __init__(self, topic: str, event_id: str, timestamp: str, source: str, payload: bytes,
+                 log_offset: Optional[int] = None, log_index: Optional[int] = None):
+        self.topic = topic
+        self.event_id = event_id
+        self.timestamp = timestamp
+        self.source = source
+        self.payload = payload
+        self.log_offset = log_offset
+        self.log_index = log_index
+        self.enqueued_at = 0.0  # time.monotonic() saat masuk queue partisi
+
+    @classmethod
+    def from_dict(cls, data: Any, loc: tuple = ()) -> "QueuedEvent":
+        """
+        Validasi cepat satu record hasil `json.loads` / msgpack: empat field
+        string dan `payload` berupa object. Payload langsung di-encode ke
+        JSON ringkas sekali, lalu dict-nya dibuang.
+        """
+        if type(data) is not dict:
+            raise EventValidationError([{"type": "model_type", "loc": loc, "msg": "Input should be an object"}])
+
+        topic = data.get("topic")
+        event_id = data.get("event_id")
+        timestamp = data.get("timestamp")
+        source = data.get("source")
+        payload = data.get("payload")
+        if not (type(topic) is str and type(event_id) is str and type(timestamp) is str
+                and type(source) is str and type(payload) is dict):
+            raise EventValidationError(_collect_errors(data, loc))
+
+        try:
+            raw = _encode_payload(payload)
+        except (TypeError, ValueError) as e:
+            raise EventValidationError([{"type": "json_type", "loc": loc + ("payload",), "msg": f"Payload tidak bisa di-encode sebagai JSON: {e}"}])
+        return cls(topic, event_id, timestamp, source, raw.encode())
+
+    def to_json(self) -> bytes:
+        """JSON event lengkap; byte payload disisipkan tanpa di-parse ulang."""
+        head = json.dumps({"topic": self.topic, "event_id": self.event_id, "timestamp": self.timestamp, "source": self.source})
+        return head[:-1].encode() + b', "payload": ' + self.payload + b"}"
+
+_encode_payload = json.JSONEncoder(separators=(",", ":")).encode
+
+def _collect_errors(data: dict, loc: tuple) -> List[dict]:
+    errors = []
+    for field in EVENT_FIELDS:
+        if type(data.get(field)) is not str:
+            errors.append(_field_error(data, field, loc, "string_type", "Input should be a valid string"))
+    if type(data.get("payload")) is not dict:
+        errors.append(_field_error(data, "payload", loc, "dict_type", "Input should be a valid dictionary"))
+    return errors
+
+def _field_error(data: dict, field: str, loc: tuple, error_type: str, msg: str) -> dict:
+    if field not in data:
+        return {"type": "missing", "loc": loc + (field,), "msg": "Field required"}
+    return {"type": error_type, "loc": loc + (field,), "msg": msg}
+
+def parse_event_batch(body: bytes) -> List[QueuedEvent]:
+    """
+    Mem-parse body `POST /publish` (array JSON event) langsung menjadi
+    QueuedEvent, tanpa membangun model Pydantic per event.
+    Raise EventValidationError dengan semua error per event.
+    """
+    try:
+        data = json.loads(body)
+    except ValueError as e:
+        raise EventValidationError([{"type": "json_invalid", "loc": ("body",), "msg": f"JSON decode error: {e}"}])
+    if type(data) is not list:
+        raise EventValidationError([{"type": "list_type", "loc": ("body",), "msg": "Input should be a valid list"}])
+
+    events = []
+    errors = []
+    for index, item in enumerate(data):
+        try:
+            events.append(QueuedEvent.from_dict(item, ("body", index)))
+        except EventValidationError as e:
+            errors.extend(e.errors)
+    if errors:
+        raise EventValidationError(errors)
+    return events
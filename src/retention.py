@@ -0,0 +1,212 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.dedup_cache import DedupIndex
+
+# --- Retensi & Kompaksi ---
+
+FIELDS = ("max_age_s", "max_events", "dedup_window_s")
+DEFAULT_TOPIC = "*"
+
+class RetentionPolicy:
+    """
+    Batas penyimpanan untuk satu topik (None = tanpa batas):
+        max_age_s      : isi event dihapus jika `timestamp`-nya lebih tua dari ini;
+                         key-nya tetap disimpan untuk dedup. Umur dihitung
+                         dari waktu UTC (offset zona waktu, `Z`, dan pecahan
+                         detik diperhitungkan); timestamp yang bukan
+                         ISO-8601 tidak pernah kedaluwarsa karena umur
+        max_events     : hanya `max_events` event terbaru (urut timestamp) yang disimpan
+        dedup_window_s : key dihapus `dedup_window_s` detik setelah diproses,
+                         bersama isi event-nya jika masih ada. Setelah itu
+                         event yang sama diterima lagi sebagai event baru.
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, max_age_s: float = None, max_events: int = None, dedup_window_s: float = None):
+        self.max_age_s = max_age_s
+        self.max_events = max_events
+        self.dedup_window_s = dedup_window_s
+
+def load_retention_policies(raw: str = None) -> Dict[str, RetentionPolicy]:
+    """
+    Membaca RETENTION_POLICIES (JSON) dari env, misalnya:
+        {"*": {"dedup_window_s": 2592000},
+         "logs": {"max_age_s": 86400, "max_events": 100000}}
+
+    Kunci "*" adalah default untuk semua topik; field milik topik tertentu
+    menimpa field default. Dedup window tidak boleh lebih pendek dari
+    max_age_s, karena key yang kedaluwarsa ikut menghapus event-nya.
+    """
+    raw = os.getenv("RETENTION_POLICIES", "") if raw is None else raw
+    if not raw.strip():
+        return {}
+
+    config = json.loads(raw)
+    if not isinstance(config, dict):
+        raise ValueError("RETENTION_POLICIES harus berupa objek JSON {topic: policy}")
+
+    default = config.get(DEFAULT_TOPIC, {})
+    policies = {}
+    for topic, fields in config.items():
+        if not isinstance(fields, dict):
+            raise ValueError(f"RETENTION_POLICIES['{topic}'] harus berupa objek JSON")
+        merged = dict(default, **fields)
+        unknown = set(merged) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"RETENTION_POLICIES['{topic}'] berisi field tidak dikenal: {sorted(unknown)}")
+        for name, value in merged.items():
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0):
+                raise ValueError(f"RETENTION_POLICIES['{topic}'].{name} harus angka >= 0")
+
+        policy = RetentionPolicy(**merged)
+        if policy.max_events is not None:
+            policy.max_events = int(policy.max_events)
+        if policy.dedup_window_s is not None and policy.max_age_s is not None and policy.dedup_window_s < policy.max_age_s:
+            raise ValueError(f"RETENTION_POLICIES['{topic}']: dedup_window_s harus >= max_age_s")
+        policies[topic] = policy
+    return policies
+
+def policy_for(policies: Dict[str, RetentionPolicy], topic: str) -> Optional[RetentionPolicy]:
+    return policies.get(topic) or policies.get(DEFAULT_TOPIC)
+
+# --- Job Reader ---
+
+def list_topics(conn: sqlite3.Connection) -> List[str]:
+    return [row[0] for row in conn.execute("SELECT topic FROM topic_stats")]
+
+def events_cutoff(conn: sqlite3.Connection, topic: str, max_events: int) -> Optional[Tuple[str, str]]:
+    """
+    Posisi (timestamp, event_id) terakhir di luar `max_events` event terbaru
+    topik ini: semua event pada/sebelum posisi ini boleh dihapus. None jika
+    tidak ada. Dihitung sekali per putaran di thread reader, lalu dihapus bertahap.
+    """
+    row = conn.execute(
+        "SELECT timestamp, event_id FROM events WHERE topic = ? AND timestamp IS NOT NULL "
+        "ORDER BY timestamp DESC, event_id DESC LIMIT 1 OFFSET ?",
+        (topic, max_events)
+    ).fetchone()
+    return tuple(row) if row is not None else None
+
+def age_cutoff(max_age_s: float, now: float = None) -> float:
+    """Batas umur sebagai Julian day UTC, satuan yang sama dengan julianday() SQLite."""
+    return ((time.time() if now is None else now) - max_age_s) / 86400.0 + 2440587.5
+
+def auto_vacuum_mode(conn: sqlite3.Connection) -> int:
+    """0 = none, 1 = full, 2 = incremental."""
+    return conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+
+# --- Job Writer ---
+
+# Waktu event dinormalisasi ke UTC; NULL untuk key saja atau timestamp yang
+# bukan ISO-8601. Harus identik dengan ekspresi index agar index dipakai.
+_EVENT_TIME_SQL = "julianday(timestamp)"
+
+def ensure_key_expiry_index(conn: sqlite3.Connection):
+    """Index untuk mencari key kedaluwarsa per topik tanpa memindai seluruh topik."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_topic_processed_at ON events (topic, processed_at)")
+    conn.commit()
+
+def ensure_event_age_index(conn: sqlite3.Connection):
+    """
+    Index waktu UTC event per topik untuk max_age_s. Urutan string
+    `timestamp` tidak sama dengan urutan waktu jika offset zona waktunya
+    berbeda, jadi umur dibandingkan lewat julianday(timestamp).
+    """
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_events_topic_age ON events (topic, {_EVENT_TIME_SQL})")
+    conn.commit()
+
+def delete_events_older_than(conn: sqlite3.Connection, topic: str, cutoff: float, limit: int) -> int:
+    """
+    Menghapus isi maksimal `limit` event topik ini yang waktunya sebelum
+    `cutoff` (Julian day UTC, lihat age_cutoff); barisnya tetap ada sebagai
+    key saja. Entri payload_index event tersebut ikut dihapus.
+    """
+    rows = conn.execute(
+        f"SELECT event_id, timestamp FROM events WHERE topic = ? AND {_EVENT_TIME_SQL} < ? LIMIT ?",
+        (topic, cutoff, limit)
+    ).fetchall()
+    if not rows:
+        return 0
+    with conn:
+        cursor = conn.cursor()
+        cursor.executemany("DELETE FROM payload_index WHERE topic = ? AND timestamp = ? AND event_id = ?",
+                           [(topic, timestamp, event_id) for event_id, timestamp in rows])
+        cursor.executemany("UPDATE events SET timestamp = NULL, source = NULL, payload = NULL "
+                           "WHERE topic = ? AND event_id = ?", [(topic, event_id) for event_id, _ in rows])
+    return len(rows)
+
+def delete_events_before(conn: sqlite3.Connection, topic: str, cutoff: Tuple[str, str], limit: int) -> int:
+    """
+    Menghapus isi maksimal `limit` event topik ini pada/sebelum `cutoff`;
+    barisnya tetap ada sebagai key saja. Entri payload_index event tersebut
+    ikut dihapus. Mengembalikan jumlah yang dihapus.
+    """
+    bound = conn.execute(
+        "SELECT timestamp, event_id FROM events WHERE topic = ? AND (timestamp, event_id) <= (?, ?) "
+        "ORDER BY timestamp, event_id LIMIT 1 OFFSET ?",
+        (topic, cutoff[0], cutoff[1], limit - 1)
+    ).fetchone()
+    bound = tuple(bound) if bound is not None else cutoff
+    with conn:
+        conn.execute(
+            "DELETE FROM payload_index WHERE topic = ? AND (timestamp, event_id) <= (?, ?)",
+            (topic, bound[0], bound[1])
+        )
+        cursor = conn.execute(
+            "UPDATE events SET timestamp = NULL, source = NULL, payload = NULL "
+            "WHERE topic = ? AND event_id IN ("
+            "SELECT event_id FROM events WHERE topic = ? AND (timestamp, event_id) <= (?, ?) "
+            "ORDER BY timestamp, event_id LIMIT ?)",
+            (topic, topic, cutoff[0], cutoff[1], limit)
+        )
+    return cursor.rowcount
+
+def expire_keys(conn: sqlite3.Connection, topic: str, window_s: float, limit: int,
+                dedup: Optional[DedupIndex] = None) -> Tuple[int, int, Optional[int]]:
+    """
+    Menghapus maksimal `limit` key topik ini yang diproses lebih dari
+    `window_s` detik lalu (beserta isi event-nya), dan mengurangi counter
+    topic_stats di transaksi yang sama (baris topik dihapus jika habis).
+    Key juga dibuang dari LRU dedup agar event tersebut bisa diterima lagi.
+
+    Mengembalikan (key_dihapus, event_dihapus, sisa_key_topik).
+    """
+    rows = conn.execute(
+        "SELECT event_id, timestamp FROM events WHERE topic = ? AND processed_at < datetime('now', ?) LIMIT ?",
+        (topic, f"-{window_s} seconds", limit)
+    ).fetchall()
+    if not rows:
+        return 0, 0, None
+    keys = [(topic, event_id) for event_id, _ in rows]
+    bodies = [(topic, timestamp, event_id) for event_id, timestamp in rows if timestamp is not None]
+    events_deleted = len(bodies)
+
+    with conn:
+        cursor = conn.cursor()
+        cursor.executemany("DELETE FROM events WHERE topic = ? AND event_id = ?", keys)
+        cursor.executemany("DELETE FROM payload_index WHERE topic = ? AND timestamp = ? AND event_id = ?", bodies)
+        cursor.execute("UPDATE topic_stats SET unique_count = unique_count - ? WHERE topic = ?", (len(keys), topic))
+        row = cursor.execute("SELECT unique_count FROM topic_stats WHERE topic = ?", (topic,)).fetchone()
+        remaining = row[0] if row else 0
+        if remaining <= 0:
+            cursor.execute("DELETE FROM topic_stats WHERE topic = ?", (topic,))
+
+    if dedup is not None:
+        for key in keys:
+            dedup.forget(key)
+    return len(keys), events_deleted, remaining
+
+def incremental_vacuum(conn: sqlite3.Connection, pages: int) -> int:
+    """
+    Mengembalikan maksimal `pages` halaman kosong ke OS. Memakai executescript
+    karena PRAGMA incremental_vacuum membebaskan satu halaman per step, dan
+    execute() hanya menjalankan satu step.
+    """
+    before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+    return before - conn.execute("PRAGMA freelist_count").fetchone()[0]
@@ -0,0 +1,132 @@
+import sqlite3
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+
+# --- Rollup Agregat (count per topik/source/bucket waktu) ---
+
+# Nama granularity -> lebar bucket dalam detik.
+GRANULARITIES = {"1s": 1, "1m": 60, "1h": 3600}
+
+ROLLUPS_TABLE_SQL = """
+CREATE TABLE event_rollups (
+    granularity INTEGER NOT NULL,
+    topic TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (granularity, topic, bucket, source)
+) WITHOUT ROWID
+"""
+
+# Query tanpa filter topik dibaca terurut bucket: index ini membuatnya cukup
+# seek ke `since` dan berhenti di LIMIT, alih-alih memindai semua baris
+# granularity lewat primary key (yang diawali topic).
+ROLLUPS_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_event_rollups_bucket
+ON event_rollups (granularity, bucket, topic, source)
+"""
+
+_UPSERT_SQL = (
+    "INSERT INTO event_rollups (granularity, topic, bucket, source, count) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT(granularity, topic, bucket, source) DO UPDATE SET count = count + excluded.count"
+)
+
+def parse_timestamp(value: str) -> Optional[float]:
+    """
+    Timestamp event (ISO-8601) -> epoch detik UTC. Tanpa zona waktu dianggap
+    UTC. None jika tidak bisa di-parse (event tetap disimpan, tetapi tidak
+    masuk rollup).
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def format_bucket(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def rollup_rows(events: Iterable[Tuple[str, str, str]]) -> List[Tuple[int, str, int, str, int]]:
+    """
+    Menghitung baris rollup dari (topic, source, timestamp) event baru.
+    Timestamp yang sama (umum dalam satu batch) hanya di-parse sekali.
+    """
+    per_timestamp = Counter(events)
+    buckets = Counter()
+    parsed = {}
+    for (topic, source, timestamp), count in per_timestamp.items():
+        if timestamp not in parsed:
+            parsed[timestamp] = parse_timestamp(timestamp)
+        epoch = parsed[timestamp]
+        if epoch is None:
+            continue
+        for width in GRANULARITIES.values():
+            buckets[(width, topic, int(epoch // width) * width, source)] += count
+    return [(width, topic, bucket, source, count) for (width, topic, bucket, source), count in buckets.items()]
+
+def apply_rollups(cursor: sqlite3.Cursor, events: Iterable[Tuple[str, str, str]]):
+    """Menambah counter rollup; dipanggil di dalam transaksi insert consumer."""
+    rows = rollup_rows(events)
+    if rows:
+        cursor.executemany(_UPSERT_SQL, rows)
+
+def create_event_rollups(conn: sqlite3.Connection):
+    """
+    Membuat tabel event_rollups dan mengisinya sekali dari event yang sudah
+    ada (satu transaksi). Setelah itu consumer memperbaruinya di transaksi
+    yang sama dengan insert.
+    """
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.execute(ROLLUPS_TABLE_SQL)
+        cursor.execute(ROLLUPS_INDEX_SQL)
+        rows = conn.execute("SELECT topic, source, timestamp FROM events WHERE timestamp IS NOT NULL")
+        total = 0
+        while True:
+            chunk = rows.fetchmany(10000)
+            if not chunk:
+                break
+            apply_rollups(cursor, chunk)
+            total += len(chunk)
+        if total:
+            print(f"Backfill event_rollups: {total} event dari events.")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def create_rollups_index(conn: sqlite3.Connection):
+    """Menambah index bucket ke tabel event_rollups dari versi sebelumnya."""
+    conn.execute(ROLLUPS_INDEX_SQL)
+    conn.commit()
+
+def query_rollups(conn: sqlite3.Connection, width: int, topics: Optional[List[str]], source: Optional[str],
+                  since: Optional[float], until: Optional[float], limit: int) -> List[tuple]:
+    """
+    Membaca bucket rollup dengan awal bucket di [since, until), terurut
+    (bucket, topic, source). Hanya menyentuh baris rollup, bukan events.
+    """
+    clauses = ["granularity = ?"]
+    params = [width]
+    if topics:
+        clauses.append(f"topic IN ({', '.join('?' * len(topics))})")
+        params.extend(topics)
+    if source is not None:
+        clauses.append("source = ?")
+        params.append(source)
+    if since is not None:
+        clauses.append("bucket >= ?")
+        params.append(int(since // width) * width)
+    if until is not None:
+        clauses.append("bucket < ?")
+        params.append(until)
+    params.append(limit)
+    return conn.execute(
+        f"SELECT bucket, topic, source, count FROM event_rollups WHERE {' AND '.join(clauses)} "
+        "ORDER BY bucket, topic, source LIMIT ?",
+        params
+    ).fetchall()
@@ -0,0 +1,107 @@
+import json
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence, Tuple
+
+# --- Statistik Bersama Antar Proses (shared memory + seqlock) ---
+
+STAT_FIELDS = (
+    "received", "unique_processed", "duplicate_dropped", "rejected",
+    "expired_events", "expired_keys", "queue_depth",
+)
+
+_SEQ = struct.Struct("<Q")
+_BODY = struct.Struct(f"<{len(STAT_FIELDS)}qdI")  # counter, start_time (epoch), panjang blob topik
+
+class SharedStats:
+    """
+    Snapshot /stats di shared memory, ditulis HANYA oleh proses writer dan
+    dibaca worker HTTP tanpa lock (seqlock):
+        writer : seq += 1 (ganjil) -> tulis data -> seq += 1 (genap)
+        reader : baca seq, salin data, baca seq lagi; ulangi jika ganjil/berubah
+    Daftar topik disimpan sebagai blob JSON setelah counter dan hanya ditulis
+    ulang jika berubah.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self._seq = 0
+        self._topics_blob = b"[]"
+        # Dipakai writer untuk menggabungkan update (lihat stats_changed di main).
+        self.pending = False
+        self.topic_count = -1
+
+    @classmethod
+    def create(cls, name: str, size: int = 1024 * 1024) -> "SharedStats":
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        stats = cls(shared_memory.SharedMemory(name=name, create=True, size=size), owner=True)
+        stats.write([0] * len(STAT_FIELDS), time.time(), [])
+        return stats
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedStats":
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            # Segmen milik writer tidak boleh didaftarkan ke resource_tracker
+            # oleh worker: tracker akan meng-unlink-nya saat worker keluar.
+            # (unregister setelahnya tidak cukup jika tracker dipakai bersama
+            # writer, karena registrasi milik writer ikut terhapus.)
+            from multiprocessing import resource_tracker
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype: None
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+        return cls(shm, owner=False)
+
+    def write(self, counters: Sequence[int], start_time: float, topics: Optional[List[str]] = None):
+        """Menulis snapshot baru. `topics` None = daftar topik tidak berubah."""
+        buf = self.shm.buf
+        if topics is not None:
+            blob = json.dumps(topics, separators=(",", ":")).encode()
+            limit = len(buf) - _SEQ.size - _BODY.size
+            if len(blob) > limit:
+                print(f"[STATS] Daftar topik ({len(blob)} byte) melebihi shared memory; dipotong.")
+            while len(blob) > limit:
+                topics = topics[: len(topics) // 2]
+                blob = json.dumps(topics, separators=(",", ":")).encode()
+            self._topics_blob = blob
+
+        self._seq += 1
+        _SEQ.pack_into(buf, 0, self._seq)
+        _BODY.pack_into(buf, _SEQ.size, *counters, start_time, len(self._topics_blob))
+        if topics is not None:
+            offset = _SEQ.size + _BODY.size
+            buf[offset:offset + len(self._topics_blob)] = self._topics_blob
+        self._seq += 1
+        _SEQ.pack_into(buf, 0, self._seq)
+
+    def read(self) -> Tuple[dict, float, List[str]]:
+        """Mengembalikan (counter per nama, start_time, topik) yang konsisten satu sama lain."""
+        buf = self.shm.buf
+        offset = _SEQ.size + _BODY.size
+        while True:
+            (before,) = _SEQ.unpack_from(buf, 0)
+            if before % 2:
+                time.sleep(0)
+                continue
+            *counters, start_time, topics_len = _BODY.unpack_from(buf, _SEQ.size)
+            blob = bytes(buf[offset:offset + topics_len])
+            (after,) = _SEQ.unpack_from(buf, 0)
+            if before == after:
+                return dict(zip(STAT_FIELDS, counters)), start_time, json.loads(blob)
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
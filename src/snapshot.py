@@ -0,0 +1,406 @@
+"""
+Snapshot tabel `events` (isi event + key dedup) ke file segmen terkompresi
+ber-checksum, dan import massal segmen tersebut ke SQLite.
+
+Jalankan dari root proyek (DATABASE_FILE & CONSUMER_PARTITIONS dari env):
+    python -m src.snapshot export /backup/snap-1
+    python -m src.snapshot verify /backup/snap-1
+    DATABASE_FILE=/data/baru.db python -m src.snapshot import /backup/snap-1
+"""
+import argparse
+import json
+import os
+import sqlite3
+import struct
+import time
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.db import Database
+from src.main import (
+    app_state, configure_payload_storage, decode_stored_payload, encode_payload_for_storage,
+    init_db, partition_index, shard_path,
+)
+from src.payload_index import add_index_rows, index_rows, load_indexed_fields
+from src.rollups import apply_rollups
+
+# --- Format Segmen ---
+
+# Header: magic, versi, jumlah baris, panjang body mentah, panjang body
+# terkompresi, crc32 body mentah. Body (zlib) berisi baris berurutan: 6
+# panjang field lalu byte-nya; panjang NULL_LEN = kolom NULL (baris key saja).
+_MAGIC = b"AGSN"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBIQQI")
+_ROW = struct.Struct("<6I")
+NULL_LEN = 0xFFFFFFFF
+
+MANIFEST = "manifest.json"
+
+# (topic, event_id, timestamp, source, payload_bytes, processed_at); payload
+# disimpan sebagai byte JSON asli (tidak terkompresi per baris), sehingga
+# setting PAYLOAD_COMPRESSION sumber dan tujuan boleh berbeda.
+SnapshotRow = Tuple[str, str, Optional[str], Optional[str], Optional[bytes], Optional[str]]
+
+class SnapshotError(Exception):
+    """Manifest/segmen hilang, rusak, atau checksum tidak cocok."""
+
+def _field(value) -> Tuple[int, bytes]:
+    if value is None:
+        return NULL_LEN, b""
+    if not isinstance(value, bytes):
+        value = value.encode()
+    return len(value), value
+
+def encode_rows(rows: List[SnapshotRow]) -> bytes:
+    pack = _ROW.pack
+    parts = []
+    for topic, event_id, timestamp, source, payload, processed_at in rows:
+        topic, event_id = topic.encode(), event_id.encode()
+        if timestamp is not None and source is not None and payload is not None and processed_at is not None:
+            timestamp, source, processed_at = timestamp.encode(), source.encode(), processed_at.encode()
+            parts.append(pack(len(topic), len(event_id), len(timestamp), len(source), len(payload), len(processed_at)))
+            parts += (topic, event_id, timestamp, source, payload, processed_at)
+        else:
+            fields = [_field(value) for value in (timestamp, source, payload, processed_at)]
+            parts.append(pack(len(topic), len(event_id), *(length for length, _ in fields)))
+            parts += (topic, event_id)
+            parts += (value for _, value in fields)
+    return b"".join(parts)
+
+def decode_rows(data: bytes, count: int) -> List[SnapshotRow]:
+    unpack_from, size = _ROW.unpack_from, _ROW.size
+    pos = 0
+    rows = []
+    for _ in range(count):
+        lengths = unpack_from(data, pos)
+        pos += size
+        fields = []
+        for length in lengths:
+            if length == NULL_LEN:
+                fields.append(None)
+            else:
+                fields.append(data[pos:pos + length])
+                pos += length
+        topic, event_id, timestamp, source, payload, processed_at = fields
+        rows.append((
+            topic.decode(), event_id.decode(),
+            timestamp if timestamp is None else timestamp.decode(),
+            source if source is None else source.decode(),
+            payload,
+            processed_at if processed_at is None else processed_at.decode(),
+        ))
+    if pos != len(data):
+        raise SnapshotError("panjang body segmen tidak sesuai jumlah baris")
+    return rows
+
+def write_segment(path: str, rows: List[SnapshotRow], level: int) -> Dict:
+    raw = encode_rows(rows)
+    body = zlib.compress(raw, level)
+    crc = zlib.crc32(raw)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(rows), len(raw), len(body), crc))
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    return {"file": os.path.basename(path), "rows": len(rows), "bytes": _HEADER.size + len(body), "crc32": crc}
+
+def read_segment(path: str, expected: Dict = None, decode: bool = True) -> Optional[List[SnapshotRow]]:
+    """
+    Membaca dan memverifikasi satu segmen (header, kecocokan dengan entri
+    manifest, crc32). `decode=False` hanya memverifikasi.
+    """
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise SnapshotError(f"{path}: header terpotong")
+        magic, version, count, raw_len, body_len, crc = _HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION:
+            raise SnapshotError(f"{path}: format tidak dikenal (magic={magic!r}, versi={version})")
+        body = f.read(body_len)
+    if len(body) != body_len:
+        raise SnapshotError(f"{path}: body terpotong")
+    if expected is not None and (expected["rows"] != count or expected["crc32"] != crc):
+        raise SnapshotError(f"{path}: tidak cocok dengan manifest")
+    try:
+        raw = zlib.decompress(body)
+    except zlib.error as e:
+        raise SnapshotError(f"{path}: body rusak ({e})")
+    if len(raw) != raw_len or zlib.crc32(raw) != crc:
+        raise SnapshotError(f"{path}: checksum tidak cocok")
+    return decode_rows(raw, count) if decode else None
+
+# --- Export ---
+
+def shard_paths(database_file: str, count: int) -> List[str]:
+    return [shard_path(database_file, index, count) for index in range(count)]
+
+def open_snapshot(path: str) -> sqlite3.Connection:
+    """
+    Koneksi read-only dengan transaksi baca yang sudah dimulai: di mode WAL
+    semua SELECT berikutnya melihat isi DB pada titik ini, sementara
+    consumer tetap menulis (ingest tidak dijeda).
+    """
+    uri = Path(path).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 5000")
+    conn.execute("BEGIN")
+    conn.execute("SELECT COUNT(*) FROM topic_stats").fetchone()
+    return conn
+
+def open_snapshots(paths: List[str], lock_timeout_ms: int = 5000) -> List[sqlite3.Connection]:
+    """
+    Membuka transaksi baca semua shard pada SATU titik waktu. Dengan lebih
+    dari satu shard, lock tulis (`BEGIN IMMEDIATE`) semua shard diambil
+    dulu sehingga tidak ada commit di shard mana pun selama transaksi baca
+    dibuka satu per satu; lock dilepas sebelum baris mulai dibaca. Consumer
+    aggregator hanya tertahan beberapa milidetik (menunggu lewat
+    busy_timeout writer-nya).
+    """
+    if len(paths) == 1:
+        return [open_snapshot(paths[0])]
+
+    fences = []
+    connections = []
+    try:
+        for path in paths:
+            fence = sqlite3.connect(path, isolation_level=None, timeout=lock_timeout_ms / 1000)
+            fences.append(fence)
+            fence.execute("BEGIN IMMEDIATE")
+        for path in paths:
+            connections.append(open_snapshot(path))
+        return connections
+    except BaseException:
+        for conn in connections:
+            conn.close()
+        raise
+    finally:
+        for fence in fences:
+            if fence.in_transaction:
+                fence.execute("ROLLBACK")
+            fence.close()
+
+def snapshot_rows(conn: sqlite3.Connection, fetch_size: int = 10000) -> Iterator[SnapshotRow]:
+    cursor = conn.execute(
+        "SELECT topic, event_id, timestamp, source, payload, processed_at FROM events ORDER BY topic, event_id"
+    )
+    while True:
+        batch = cursor.fetchmany(fetch_size)
+        if not batch:
+            return
+        for topic, event_id, timestamp, source, payload, processed_at in batch:
+            yield (topic, event_id, timestamp, source,
+                   None if payload is None else decode_stored_payload(payload), processed_at)
+
+def export_snapshot(paths: List[str], out_dir: str, segment_rows: int = 100000, level: int = 6) -> Dict:
+    """
+    Menulis semua baris `events` dari shard `paths` ke `out_dir` sebagai
+    segmen berisi maksimal `segment_rows` baris. Snapshot semua shard
+    dibuka bersamaan di bawah lock tulis semua shard (open_snapshots), jadi
+    hasilnya satu titik waktu yang konsisten lintas shard.
+    Manifest ditulis terakhir (atomik); folder tanpa manifest berarti
+    export tidak selesai.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if os.path.exists(os.path.join(out_dir, MANIFEST)):
+        raise SnapshotError(f"{out_dir} sudah berisi snapshot")
+
+    connections = open_snapshots(paths)
+    segments = []
+    topics = defaultdict(int)
+    try:
+        buffer = []
+        for conn in connections:
+            for row in snapshot_rows(conn):
+                topics[row[0]] += 1
+                buffer.append(row)
+                if len(buffer) >= segment_rows:
+                    segments.append(write_segment(os.path.join(out_dir, f"segment-{len(segments):05d}.agsn"), buffer, level))
+                    buffer = []
+        if buffer:
+            segments.append(write_segment(os.path.join(out_dir, f"segment-{len(segments):05d}.agsn"), buffer, level))
+    finally:
+        for conn in connections:
+            conn.close()
+
+    manifest = {
+        "version": _VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "rows": sum(segment["rows"] for segment in segments),
+        "topics": dict(sorted(topics.items())),
+        "segments": segments,
+    }
+    tmp_path = os.path.join(out_dir, MANIFEST + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(out_dir, MANIFEST))
+    return manifest
+
+# --- Import ---
+
+def read_manifest(snapshot_dir: str) -> Dict:
+    path = os.path.join(snapshot_dir, MANIFEST)
+    if not os.path.exists(path):
+        raise SnapshotError(f"{snapshot_dir}: manifest tidak ada (export belum selesai?)")
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != _VERSION:
+        raise SnapshotError(f"{snapshot_dir}: versi manifest {manifest.get('version')} tidak didukung")
+    return manifest
+
+def iter_segments(snapshot_dir: str, manifest: Dict) -> Iterator[List[SnapshotRow]]:
+    for segment in manifest["segments"]:
+        yield read_segment(os.path.join(snapshot_dir, segment["file"]), segment)
+
+def verify_snapshot(snapshot_dir: str) -> Dict:
+    """Memverifikasi manifest dan checksum semua segmen tanpa men-decode baris."""
+    manifest = read_manifest(snapshot_dir)
+    for segment in manifest["segments"]:
+        read_segment(os.path.join(snapshot_dir, segment["file"]), segment, decode=False)
+    if sum(segment["rows"] for segment in manifest["segments"]) != manifest["rows"]:
+        raise SnapshotError(f"{snapshot_dir}: jumlah baris manifest tidak konsisten")
+    return manifest
+
+def _write_rows(conn: sqlite3.Connection, rows: List[SnapshotRow], probe: bool) -> List[SnapshotRow]:
+    """
+    `probe=False`: semua baris ditulis sekaligus dengan `executemany` dan
+    key yang sudah ada membatalkan transaksi (IntegrityError). `probe=True`:
+    `INSERT OR IGNORE` per baris + cek `changes()`. Mengembalikan baris baru.
+    """
+    values = [
+        (topic, event_id, timestamp, source,
+         None if payload is None else encode_payload_for_storage(payload), processed_at)
+        for topic, event_id, timestamp, source, payload, processed_at in rows
+    ]
+    fresh = []
+    with conn:
+        cursor = conn.cursor()
+        if not probe:
+            cursor.executemany(
+                "INSERT INTO events (topic, event_id, timestamp, source, payload, processed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                values
+            )
+            fresh = rows
+        else:
+            for row, value in zip(rows, values):
+                cursor.execute(
+                    "INSERT OR IGNORE INTO events (topic, event_id, timestamp, source, payload, processed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    value
+                )
+                if cursor.rowcount:
+                    fresh.append(row)
+        if not fresh:
+            return fresh
+
+        per_topic = {}
+        for topic, _, _, _, _, processed_at in fresh:
+            count, first, last = per_topic.get(topic, (0, processed_at, processed_at))
+            per_topic[topic] = (count + 1, min(first, processed_at), max(last, processed_at))
+        cursor.executemany(
+            "INSERT INTO topic_stats (topic, unique_count, first_seen, last_seen) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(topic) DO UPDATE SET unique_count = unique_count + excluded.unique_count, "
+            "first_seen = MIN(first_seen, excluded.first_seen), last_seen = MAX(last_seen, excluded.last_seen)",
+            [(topic, count, first, last) for topic, (count, first, last) in per_topic.items()]
+        )
+        bodies = [row for row in fresh if row[2] is not None]
+        apply_rollups(cursor, [(topic, source, timestamp) for topic, _, timestamp, source, _, _ in bodies])
+        if app_state["indexed_fields"]:
+            add_index_rows(cursor, index_rows(
+                ((topic, event_id, timestamp, payload) for topic, event_id, timestamp, _, payload, _ in bodies),
+                app_state["indexed_fields"]
+            ))
+    return fresh
+
+def import_rows(conn: sqlite3.Connection, rows: List[SnapshotRow]) -> int:
+    """
+    Memasukkan baris snapshot dalam satu transaksi; key yang sudah ada
+    dilewati, jadi import bisa diulang. Untuk baris baru, topic_stats,
+    rollup, dan index field payload diperbarui di transaksi yang sama
+    seperti di consumer. Batch dicoba dulu tanpa probe (DB tujuan biasanya
+    kosong); jika ada key yang sudah ada, batch diulang dengan probe per
+    baris. Mengembalikan jumlah baris baru.
+    """
+    try:
+        return len(_write_rows(conn, rows, probe=False))
+    except sqlite3.IntegrityError:
+        return len(_write_rows(conn, rows, probe=True))
+
+def import_snapshot(snapshot_dir: str, paths: List[str], batch_rows: int = 50000) -> Tuple[int, int]:
+    """
+    Memuat snapshot ke shard `paths` (jumlah partisi boleh berbeda dari
+    sumber: setiap baris dirutekan ulang per hash topik), langsung ke
+    SQLite tanpa lewat queue. Semua segmen diverifikasi dulu sebelum ada
+    yang ditulis. Jalankan saat aggregator tujuan berhenti; Bloom filter
+    dedup dibangun ulang dari tabel events saat startup berikutnya.
+
+    Mengembalikan (baris dibaca, baris baru).
+    """
+    manifest = verify_snapshot(snapshot_dir)
+
+    configure_payload_storage()
+    app_state["indexed_fields"] = load_indexed_fields()
+    databases = []
+    try:
+        for path in paths:
+            db = Database(path, read_pool_size=1)
+            init_db(db.open_writer())
+            databases.append(db)
+
+        total = inserted = 0
+        pending = [[] for _ in databases]
+        for rows in iter_segments(snapshot_dir, manifest):
+            for row in rows:
+                index = partition_index(row[0], len(databases))
+                pending[index].append(row)
+                if len(pending[index]) >= batch_rows:
+                    inserted += import_rows(databases[index].writer, pending[index])
+                    pending[index] = []
+            total += len(rows)
+        for db, rows in zip(databases, pending):
+            if rows:
+                inserted += import_rows(db.writer, rows)
+    finally:
+        for db in databases:
+            db.close()
+    return total, inserted
+
+# --- CLI ---
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_cmd = commands.add_parser("export", help="tulis snapshot dari DB yang sedang berjalan")
+    export_cmd.add_argument("out_dir")
+    export_cmd.add_argument("--segment-rows", type=int, default=100000)
+    export_cmd.add_argument("--level", type=int, default=6, help="level kompresi zlib (1-9)")
+    import_cmd = commands.add_parser("import", help="muat snapshot ke DB (aggregator harus berhenti)")
+    import_cmd.add_argument("snapshot_dir")
+    import_cmd.add_argument("--batch-rows", type=int, default=50000, help="baris per transaksi")
+    verify_cmd = commands.add_parser("verify", help="cek manifest & checksum semua segmen")
+    verify_cmd.add_argument("snapshot_dir")
+    args = parser.parse_args()
+
+    database_file = os.getenv("DATABASE_FILE", "aggregator.db")
+    paths = shard_paths(database_file, max(1, int(os.getenv("CONSUMER_PARTITIONS", "1"))))
+    started = time.perf_counter()
+
+    if args.command == "export":
+        manifest = export_snapshot(paths, args.out_dir, args.segment_rows, args.level)
+        size = sum(segment["bytes"] for segment in manifest["segments"])
+        print(f"[SNAPSHOT] {manifest['rows']} baris, {len(manifest['topics'])} topik, "
+              f"{len(manifest['segments'])} segmen ({size / 1e6:.1f} MB) dalam {time.perf_counter() - started:.1f}s.")
+    elif args.command == "import":
+        total, inserted = import_snapshot(args.snapshot_dir, paths, args.batch_rows)
+        print(f"[SNAPSHOT] {total} baris dibaca, {inserted} baru, {total - inserted} sudah ada "
+              f"dalam {time.perf_counter() - started:.1f}s.")
+    else:
+        manifest = verify_snapshot(args.snapshot_dir)
+        print(f"[SNAPSHOT] OK: {len(manifest['segments'])} segmen, {manifest['rows']} baris.")
+
+if __name__ == "__main__":
+    main()
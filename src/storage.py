@@ -0,0 +1,60 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from src.records import QueuedEvent
+
+# --- Antarmuka Storage Engine (dedup + penyimpanan event per partisi) ---
+
+STORAGE_ENGINES = ("sqlite", "log")
+
+# Baris hasil scan: (topic, event_id, timestamp, source, payload_bytes)
+EventRow = Tuple[str, str, str, str, bytes]
+
+class StorageEngine:
+    """
+    Penyimpanan event satu partisi: dedup (insert-if-absent per batch),
+    scan satu topik terurut (timestamp, event_id), dan counter per topik.
+
+    Engine memiliki thread-nya sendiri: `insert_if_absent` menjadwalkan
+    batch ke satu thread writer secara sinkron (urutan batch = urutan
+    pemanggilan) dan mengembalikan future; batch yang sudah dijadwalkan
+    pasti ditulis sebelum `close()` selesai. Pembacaan berjalan di thread
+    pool, jadi event loop tidak pernah menunggu disk.
+
+    Fitur yang bergantung pada SQL (retensi, rollup /aggregate, filter
+    field payload, snapshot, mode multi-proses) hanya tersedia jika
+    `sql_features` True.
+    """
+
+    name = None
+    sql_features = False
+
+    def insert_if_absent(self, events: List[QueuedEvent], dedup=None,
+                         log_position: Optional[Tuple[int, int]] = None) -> "asyncio.Future[List[bool]]":
+        """
+        Menyimpan event yang key (topic, event_id)-nya belum ada, dalam satu
+        batch atomik bersama `log_position` (posisi ingest log berikutnya).
+        Hasil: True per event baru, False per duplikat (termasuk duplikat
+        di dalam batch yang sama).
+        """
+        raise NotImplementedError
+
+    def scan_topic(self, topic: str, after: Optional[Tuple[str, str]] = None, since: Optional[str] = None,
+                   until: Optional[str] = None, limit: Optional[int] = None) -> "asyncio.Future[List[EventRow]]":
+        """Event topik setelah keyset `after`, dalam [since, until), terurut (timestamp, event_id)."""
+        raise NotImplementedError
+
+    def topic_tail(self, topic: str) -> "asyncio.Future[Tuple[str, str]]":
+        """Posisi (timestamp, event_id) event terakhir topik, atau ("", "") jika kosong."""
+        raise NotImplementedError
+
+    def topic_counts(self) -> Dict[str, int]:
+        """Jumlah event unik per topik (dipanggil saat startup)."""
+        raise NotImplementedError
+
+    def log_position(self) -> Optional[Tuple[int, int]]:
+        """Posisi ingest log terakhir yang di-commit bersama batch, None jika belum ada."""
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
@@ -0,0 +1,196 @@
+import json
+import zlib
+from typing import Any, AsyncIterator, Iterator, Tuple
+
+# Dependensi opsional: msgpack (format body) dan zstandard (Content-Encoding: zstd)
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# --- Streaming Ingest (NDJSON / msgpack, gzip / zstd) ---
+
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq", "text/plain")
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+class UnsupportedStream(Exception):
+    """Format body atau Content-Encoding tidak didukung (atau dependensinya tidak terpasang)."""
+
+class StreamTooLarge(Exception):
+    """Satu record melebihi batas ukuran baris, atau body melebihi batas ukurannya."""
+
+class RecordError:
+    """Record yang gagal di-decode; diteruskan ke pemanggil agar bisa dilaporkan per baris."""
+
+    __slots__ = ("message",)
+
+    def __init__(self, message: str):
+        self.message = message
+
+# Hasil dekompresi dikeluarkan per potongan kecil agar satu chunk kecil
+# yang mengembang besar (zip bomb) tidak pernah ditampung utuh di memori;
+# batas baris & batas body dicek per potongan.
+DECOMPRESS_PIECE_BYTES = 64 * 1024
+# zstandard tidak punya `max_length`: input dipecah kecil-kecil. Satu blok
+# zstd (header 3 byte + 1 byte RLE) maksimal 128 KiB, jadi 128 byte input
+# menghasilkan paling banyak ~4 MiB.
+ZSTD_INPUT_SLICE_BYTES = 128
+
+def _zlib_pieces(decompressor):
+    def decompress(chunk: bytes) -> Iterator[bytes]:
+        while chunk:
+            piece = decompressor.decompress(chunk, DECOMPRESS_PIECE_BYTES)
+            chunk = decompressor.unconsumed_tail
+            if piece:
+                yield piece
+    return decompress
+
+def _zstd_pieces(decompressor):
+    def decompress(chunk: bytes) -> Iterator[bytes]:
+        view = memoryview(chunk)
+        for start in range(0, len(view), ZSTD_INPUT_SLICE_BYTES):
+            piece = decompressor.decompress(view[start:start + ZSTD_INPUT_SLICE_BYTES])
+            if piece:
+                yield piece
+    return decompress
+
+def make_decompressor(content_encoding: str):
+    """
+    Mengembalikan fungsi `chunk -> Iterator[bytes]` untuk Content-Encoding
+    yang diminta; setiap potongan hasil dekompresi berukuran terbatas.
+    """
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding in ("", "identity"):
+        return lambda chunk: iter((chunk,))
+    if encoding in ("gzip", "x-gzip"):
+        return _zlib_pieces(zlib.decompressobj(16 + zlib.MAX_WBITS))
+    if encoding == "deflate":
+        return _zlib_pieces(zlib.decompressobj())
+    if encoding == "zstd":
+        if zstandard is None:
+            raise UnsupportedStream("Content-Encoding zstd membutuhkan paket 'zstandard'")
+        return _zstd_pieces(zstandard.ZstdDecompressor().decompressobj())
+    raise UnsupportedStream(f"Content-Encoding '{encoding}' tidak didukung")
+
+def stream_format(content_type: str) -> str:
+    media_type = (content_type or "application/x-ndjson").split(";")[0].strip().lower()
+    if media_type in NDJSON_TYPES:
+        return "ndjson"
+    if media_type in MSGPACK_TYPES:
+        if msgpack is None:
+            raise UnsupportedStream("Body msgpack membutuhkan paket 'msgpack'")
+        return "msgpack"
+    raise UnsupportedStream(f"Content-Type '{media_type}' tidak didukung, gunakan NDJSON atau msgpack")
+
+class NDJSONDecoder:
+    """
+    Memecah aliran byte menjadi record JSON per baris secara inkremental.
+    Baris kosong dilewati tetapi tetap dihitung untuk nomor baris.
+
+    Sisa baris yang belum lengkap disimpan di bytearray dan hanya bagian
+    baru yang dicari newline-nya, sehingga baris panjang yang datang dalam
+    banyak chunk tetap linear. Baris ditolak begitu melebihi batasnya.
+    """
+
+    def __init__(self, max_line_bytes: int):
+        self.max_line_bytes = max_line_bytes
+        self.line_no = 0
+        self._buffer = bytearray()
+        self._scanned = 0  # byte awal _buffer yang sudah pasti tanpa newline
+
+    def feed(self, data: bytes) -> Iterator[Tuple[int, Any, int]]:
+        buffer = self._buffer
+        buffer += data
+        start = 0
+        while True:
+            end = buffer.find(b"\n", max(start, self._scanned))
+            if end < 0:
+                break
+            self._check_length(end - start)
+            yield from self._decode(buffer[start:end])
+            start = end + 1
+        del buffer[:start]
+        self._scanned = len(buffer)
+        self._check_length(len(buffer))
+
+    def finish(self) -> Iterator[Tuple[int, Any, int]]:
+        line, self._buffer, self._scanned = self._buffer, bytearray(), 0
+        yield from self._decode(line)
+
+    def _check_length(self, length: int):
+        if length > self.max_line_bytes:
+            raise StreamTooLarge(f"baris {self.line_no + 1} melebihi {self.max_line_bytes} byte")
+
+    def _decode(self, line: bytearray):
+        self.line_no += 1
+        if not line.strip():
+            return
+        try:
+            yield self.line_no, json.loads(line), len(line)
+        except ValueError as e:
+            yield self.line_no, RecordError(f"JSON tidak valid: {e}"), len(line)
+
+class MsgpackDecoder:
+    """
+    Memecah aliran msgpack (object berurutan) menjadi record; nomor "baris"
+    adalah urutan record.
+    """
+
+    def __init__(self, max_line_bytes: int):
+        self.line_no = 0
+        self._unpacker_limit = max(max_line_bytes, 1024 * 1024) * 4
+        self._unpacker = msgpack.Unpacker(raw=False, max_buffer_size=self._unpacker_limit)
+
+    def feed(self, data: bytes) -> Iterator[Tuple[int, Any, int]]:
+        try:
+            self._unpacker.feed(data)
+        except msgpack.BufferFull:
+            raise StreamTooLarge(f"record {self.line_no + 1} melebihi {self._unpacker_limit} byte")
+        before = self._unpacker.tell()
+        try:
+            for record in self._unpacker:
+                self.line_no += 1
+                after = self._unpacker.tell()
+                yield self.line_no, record, after - before
+                before = after
+        except (ValueError, msgpack.UnpackException) as e:
+            raise UnsupportedStream(f"Body msgpack rusak setelah record {self.line_no}: {e}")
+
+    def finish(self) -> Iterator[Tuple[int, Any, int]]:
+        return iter(())
+
+async def iter_records(chunks: AsyncIterator[bytes], content_type: str, content_encoding: str,
+                       max_line_bytes: int, max_body_bytes: int = 0) -> AsyncIterator[Tuple[int, Any, int]]:
+    """
+    Menghasilkan (nomor_baris, record_atau_RecordError, ukuran_byte) dari body
+    request yang masih mengalir, tanpa pernah menampung seluruh body.
+    `max_body_bytes` (0 = tanpa batas) membatasi ukuran body setelah
+    dekompresi; melewatinya menghasilkan StreamTooLarge.
+    """
+    decompress = make_decompressor(content_encoding)
+    decoder = MsgpackDecoder(max_line_bytes) if stream_format(content_type) == "msgpack" else NDJSONDecoder(max_line_bytes)
+    total = 0
+
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        pieces = decompress(chunk)
+        while True:
+            try:
+                data = next(pieces, None)
+            except Exception as e:
+                raise UnsupportedStream(f"Body terkompresi rusak: {e}")
+            if data is None:
+                break
+            total += len(data)
+            if max_body_bytes and total > max_body_bytes:
+                raise StreamTooLarge(f"body melebihi {max_body_bytes} byte setelah dekompresi")
+            for item in decoder.feed(data):
+                yield item
+    for item in decoder.finish():
+        yield item
@@ -0,0 +1,116 @@
+import sqlite3
+import time
+
+def make_event(event_id: str, topic: str, source: str, timestamp: str):
+    return {"topic": topic, "event_id": event_id, "timestamp": timestamp, "source": source, "payload": {}}
+
+# Tes 37
+def test_aggregate_counts_per_bucket_from_rollups(test_client):
+    """
+    Tes [Agregat]: /aggregate menghitung event unik per bucket waktu, topik,
+    dan source (duplikat tidak dihitung), dengan filter rentang waktu dan
+    granularity 1s/1m/1h.
+    """
+    events = [
+        make_event("a-1", "agg", "web", "2025-01-01T10:00:05Z"),
+        make_event("a-2", "agg", "web", "2025-01-01T10:00:40Z"),
+        make_event("a-3", "agg", "api", "2025-01-01T10:00:59.9+00:00"),
+        make_event("a-4", "agg", "web", "2025-01-01T12:01:00+02:00"),  # = 10:01:00 UTC
+        make_event("a-5", "agg", "web", "2025-01-01T11:30:00"),        # tanpa zona = UTC
+        make_event("b-1", "other", "web", "2025-01-01T10:00:10Z"),
+        make_event("c-1", "agg", "web", "bukan-timestamp"),
+    ]
+    assert test_client.post("/publish", json=events + events[:2]).status_code == 200
+    time.sleep(0.1)
+
+    res = test_client.get("/aggregate?topic=agg&granularity=1m")
+    assert res.status_code == 200
+    assert res.json() == {
+        "granularity": "1m",
+        "buckets": [
+            {"bucket": "2025-01-01T10:00:00Z", "topic": "agg", "source": "api", "count": 1},
+            {"bucket": "2025-01-01T10:00:00Z", "topic": "agg", "source": "web", "count": 2},
+            {"bucket": "2025-01-01T10:01:00Z", "topic": "agg", "source": "web", "count": 1},
+            {"bucket": "2025-01-01T11:30:00Z", "topic": "agg", "source": "web", "count": 1},
+        ],
+        "truncated": False,
+    }
+
+    hourly = test_client.get("/aggregate?granularity=1h&source=web").json()["buckets"]
+    assert [(b["bucket"], b["topic"], b["count"]) for b in hourly] == [
+        ("2025-01-01T10:00:00Z", "agg", 3),
+        ("2025-01-01T10:00:00Z", "other", 1),
+        ("2025-01-01T11:00:00Z", "agg", 1),
+    ]
+
+    ranged = test_client.get("/aggregate", params={
+        "topic": ["agg", "other"], "granularity": "1s",
+        "since": "2025-01-01T10:00:10Z", "until": "2025-01-01T10:01:00Z", "limit": 2,
+    }).json()
+    assert [(b["bucket"], b["topic"]) for b in ranged["buckets"]] == [
+        ("2025-01-01T10:00:10Z", "other"), ("2025-01-01T10:00:40Z", "agg"),
+    ]
+    assert ranged["truncated"] is True
+
+    assert test_client.get("/aggregate?granularity=5m").status_code == 422
+    assert test_client.get("/aggregate?since=kemarin").status_code == 400
+
+# Tes 38
+def test_rollups_backfilled_for_existing_database(tmp_path):
+    """
+    Tes [Agregat]: database yang dibuat sebelum ada tabel rollup diisi
+    sekali dari tabel events saat dibuka.
+    """
+    from src.main import init_db, process_batch_in_db
+    from src.records import QueuedEvent
+    from src.rollups import query_rollups
+
+    conn = sqlite3.connect(tmp_path / "old.db")
+    init_db(conn)
+    process_batch_in_db(conn, [
+        QueuedEvent("t", f"e-{i}", f"2025-01-01T00:00:0{i % 2}Z", "s", b"{}") for i in range(5)
+    ])
+    conn.execute("DROP TABLE event_rollups")
+    conn.commit()
+
+    init_db(conn)
+    assert query_rollups(conn, 1, ["t"], None, None, None, 10) == [(1735689600, "t", "s", 3), (1735689601, "t", "s", 2)]
+    assert query_rollups(conn, 3600, None, "s", None, None, 10) == [(1735689600, "t", "s", 5)]
+    conn.close()
+
+# Tes 58
+def test_unfiltered_rollup_query_cost_flat_as_old_buckets_grow(tmp_path):
+    """
+    Tes [Agregat]: query rollup tanpa filter topik/source (rentang `since`
+    terbaru, maupun tanpa rentang) memakai index (granularity, bucket, ...)
+    sehingga jumlah langkah VM SQLite tidak bertambah walau bucket lama
+    menumpuk 10x. Database lama tanpa index mendapatkannya saat dibuka.
+    """
+    from src.main import init_db
+    from src.rollups import ROLLUPS_TABLE_SQL, query_rollups
+
+    recent = 1735689600
+
+    def steps(old_buckets: int):
+        conn = sqlite3.connect(tmp_path / f"rollups-{old_buckets}.db")
+        conn.execute(ROLLUPS_TABLE_SQL)  # layout sebelum ada index bucket
+        conn.executemany(
+            "INSERT INTO event_rollups VALUES (1, ?, ?, 's', 1)",
+            [(f"t{i % 20}", recent - old_buckets + i) for i in range(old_buckets)]
+            + [(f"t{i % 20}", recent + i) for i in range(50)]
+        )
+        conn.commit()
+        init_db(conn)
+
+        counted = []
+        conn.set_progress_handler(lambda: counted.append(1), 1)
+        latest = query_rollups(conn, 1, None, None, recent, None, 100)
+        oldest = query_rollups(conn, 1, None, None, None, None, 10)
+        conn.set_progress_handler(None, 0)
+        conn.close()
+        assert len(latest) == 50 and latest[0][0] == recent
+        assert [row[0] for row in oldest] == list(range(recent - old_buckets, recent - old_buckets + 10))
+        return len(counted)
+
+    small, large = steps(2000), steps(20000)
+    assert large < small * 1.2, (small, large)
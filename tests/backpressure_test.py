@@ -0,0 +1,128 @@
+import asyncio
+import time
+import pytest
+from fastapi.testclient import TestClient
+from src.event_queue import BatchTooLarge, BoundedEventQueue, QueueFull, admit_all
+from tests.conftest import create_test_event
+
+# Tes 14
+def test_bounded_queue_policies():
+    """
+    Tes [Backpressure]: batas event & byte ditegakkan sesuai policy (lewat
+    admit_all / room_for + reserve, seperti admit_batch), policy block
+    menunggu sampai ada ruang, dan umur item tertua dilacak queue sendiri.
+    """
+    async def scenario():
+        reject = BoundedEventQueue(max_events=3, max_bytes=1000, policy="reject", block_timeout=0)
+        await admit_all([(reject, 2)], 100)
+        assert reject.reserved_events == 2
+        for i in range(2):
+            reject.put_nowait(i, 100, reserved=True)
+        assert (reject.reserved_events, reject.qsize(), reject.size_bytes) == (0, 2, 200)
+        with pytest.raises(QueueFull) as exc:
+            await admit_all([(reject, 2)], 100)
+        assert exc.value.retry_after >= 1
+        with pytest.raises(BatchTooLarge):
+            await admit_all([(reject, 4)], 1)
+        with pytest.raises(BatchTooLarge):
+            await admit_all([(reject, 1)], 5000) # melebihi batas byte
+
+        partial = BoundedEventQueue(max_events=10, max_bytes=250, policy="partial", block_timeout=0)
+        assert partial.room_for(5, 100) == 2 # dibatasi byte, bukan jumlah
+        partial.reserve(2, 100)
+        assert partial.room_for(5, 100) == 0
+        partial.unreserve(2, 100)
+        assert partial.room_for(5, 100) == 2
+
+        block = BoundedEventQueue(max_events=1, max_bytes=1000, policy="block", block_timeout=2)
+        assert block.oldest_enqueued_at() is None
+        before = time.monotonic()
+        block.put_nowait("a", 10)
+        assert before <= block.oldest_enqueued_at() <= time.monotonic()
+        asyncio.get_running_loop().call_later(0.05, block.get_nowait)
+        await admit_all([(block, 1)], 10)
+        assert block.size_bytes == 0 and block.oldest_enqueued_at() is None
+
+    asyncio.run(scenario())
+
+# Tes 15
+def test_publish_partial_and_rejected_batches(monkeypatch, tmp_path):
+    """
+    Tes [Backpressure]: POST /publish melaporkan penerimaan sebagian
+    (policy partial) dan 413 untuk batch yang tidak akan pernah muat.
+    """
+    monkeypatch.setenv("DATABASE_FILE", str(tmp_path / "bp.db"))
+    monkeypatch.setenv("QUEUE_MAX_EVENTS", "5")
+
+    from src.main import app
+
+    batch = [create_test_event(f"bp-{i}") for i in range(8)]
+
+    monkeypatch.setenv("QUEUE_POLICY", "partial")
+    with TestClient(app) as client:
+        res = client.post("/publish", json=batch)
+        assert res.status_code == 200
+        assert res.json() == {"status": "events partially queued", "count": 5, "rejected": 3}
+        stats = client.get("/stats").json()
+        assert stats["received"] == 5
+        assert stats["rejected"] == 3
+
+    monkeypatch.setenv("QUEUE_POLICY", "reject")
+    with TestClient(app) as client:
+        res = client.post("/publish", json=batch)
+        assert res.status_code == 413
+
+# Tes 53
+def test_concurrent_multi_partition_publish_respects_bound(monkeypatch, tmp_path):
+    """
+    Tes [Backpressure]: banyak publisher bersamaan dengan batch yang
+    tersebar ke dua partisi (policy block) tidak pernah membuat queue
+    partisi mana pun melewati QUEUE_MAX_EVENTS.
+    """
+    import threading
+    import time
+    from src.main import SQLiteEngine, app
+
+    monkeypatch.setenv("DATABASE_FILE", str(tmp_path / "bp_concurrent.db"))
+    monkeypatch.setenv("CONSUMER_PARTITIONS", "2")
+    monkeypatch.setenv("CONSUMER_BATCH_SIZE", "10")
+    monkeypatch.setenv("QUEUE_MAX_EVENTS", "40")
+    monkeypatch.setenv("QUEUE_POLICY", "block")
+    monkeypatch.setenv("QUEUE_BLOCK_TIMEOUT_S", "10")
+
+    peaks = []
+    original_put = BoundedEventQueue.put_nowait
+
+    def recording_put(self, item, size=0, reserved=False):
+        original_put(self, item, size, reserved)
+        peaks.append(self.qsize())
+
+    original_insert = SQLiteEngine.insert_if_absent
+
+    async def slow_insert(self, events, dedup=None, log_position=None):
+        await asyncio.sleep(0.02)  # consumer lambat: queue selalu hampir penuh
+        return await original_insert(self, events, dedup, log_position)
+
+    monkeypatch.setattr(BoundedEventQueue, "put_nowait", recording_put)
+    monkeypatch.setattr(SQLiteEngine, "insert_if_absent", slow_insert)
+
+    with TestClient(app) as client:
+        def publisher(worker: int):
+            for round_no in range(6):
+                # 15 event ke partisi 0 dan 15 ke partisi 1
+                batch = [create_test_event(f"w{worker}-{round_no}-{i}", topic=("bp-d", "bp-a")[i % 2]) for i in range(30)]
+                assert client.post("/publish", json=batch).status_code == 200
+
+        threads = [threading.Thread(target=publisher, args=(worker,)) for worker in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for _ in range(200):
+            if client.get("/stats").json()["unique_processed"] == 6 * 6 * 30:
+                break
+            time.sleep(0.05)
+        assert client.get("/stats").json()["unique_processed"] == 6 * 6 * 30
+
+    assert max(peaks) <= 40
@@ -0,0 +1,85 @@
+import os
+import time
+from fastapi.testclient import TestClient
+from tests.conftest import create_test_event
+
+# Tes 8
+def test_process_batch_reports_exact_duplicates(tmp_path):
+    """
+    Tes [Group Commit]: satu batch berisi duplikat internal dan duplikat
+    terhadap data lama harus menghasilkan status per-event yang tepat.
+    """
+    os.environ["DATABASE_FILE"] = str(tmp_path / "batch.db")
+    try:
+        from src.main import open_database, process_batch_in_db
+        from src.records import QueuedEvent
+
+        db = open_database()
+        e1 = QueuedEvent.from_dict(create_test_event("b-1"))
+        e2 = QueuedEvent.from_dict(create_test_event("b-2"))
+        e3 = QueuedEvent.from_dict(create_test_event("b-3"))
+
+        assert process_batch_in_db(db.writer, [e1]) == [True]
+        assert process_batch_in_db(db.writer, [e1, e2, e2, e3, e1]) == [False, True, False, True, False]
+        db.close()
+    finally:
+        del os.environ["DATABASE_FILE"]
+
+# Tes 9
+def test_consumer_batches_respect_config(monkeypatch, tmp_path):
+    """
+    Tes [Group Commit]: dengan CONSUMER_BATCH_SIZE kecil, batch besar tetap
+    diproses tuntas dan statistik unik/duplikat tetap tepat.
+    """
+    monkeypatch.setenv("CONSUMER_BATCH_SIZE", "7")
+    monkeypatch.setenv("CONSUMER_BATCH_WAIT_MS", "1")
+    monkeypatch.setenv("DATABASE_FILE", str(tmp_path / "batch_cfg.db"))
+
+    from src.main import app
+
+    events = [create_test_event(f"cfg-{i % 40}") for i in range(100)] # 40 unik, 60 duplikat
+    with TestClient(app) as client:
+        assert client.post("/publish", json=events).status_code == 200
+
+        time.sleep(0.3)
+
+        stats = client.get("/stats").json()
+        assert stats["received"] == 100
+        assert stats["unique_processed"] == 40
+        assert stats["duplicate_dropped"] == 60
+        assert len(client.get("/events?topic=test-topic").json()["events"]) == 40
+
+# Tes 51
+def test_failed_batch_is_retried_not_dropped(monkeypatch, tmp_path):
+    """
+    Tes [Group Commit]: batch yang gagal ditulis diulang dengan backoff,
+    bukan dibuang sebagai duplikat; statistik baru maju setelah berhasil.
+    """
+    monkeypatch.setenv("CONSUMER_RETRY_MAX_S", "0.1")
+    monkeypatch.setenv("DATABASE_FILE", str(tmp_path / "retry.db"))
+
+    import asyncio
+    from src.main import SQLiteEngine, app
+
+    failures = [RuntimeError("disk I/O error"), RuntimeError("disk I/O error")]
+    original = SQLiteEngine.insert_if_absent
+
+    def flaky_insert(self, events, dedup=None, log_position=None):
+        if failures:
+            future = asyncio.get_running_loop().create_future()
+            future.set_exception(failures.pop())
+            return future
+        return original(self, events, dedup, log_position)
+
+    monkeypatch.setattr(SQLiteEngine, "insert_if_absent", flaky_insert)
+
+    with TestClient(app) as client:
+        assert client.post("/publish", json=[create_test_event(f"r-{i}") for i in range(10)]).status_code == 200
+        for _ in range(100):
+            stats = client.get("/stats").json()
+            if stats["unique_processed"] == 10:
+                break
+            time.sleep(0.05)
+        assert not failures
+        assert stats["unique_processed"] == 10
+        assert stats["duplicate_dropped"] == 0
@@ -0,0 +1,159 @@
+import socket
+import time
+from collections import Counter
+import httpx
+import pytest
+
+def free_base_port(count: int) -> int:
+    """Port awal dengan `count` port berurutan yang bebas di 127.0.0.1."""
+    for base in range(20000, 40000, 97):
+        sockets = []
+        try:
+            for port in range(base, base + count):
+                sock = socket.socket()
+                sockets.append(sock)
+                sock.bind(("127.0.0.1", port))
+            return base
+        except OSError:
+            continue
+        finally:
+            for sock in sockets:
+                sock.close()
+    pytest.skip("tidak ada port bebas untuk cluster lokal")
+
+# Tes 48
+def test_hash_ring_balance_and_stability():
+    """
+    Tes [Cluster]: kepemilikan key deterministik, terbagi cukup rata, dan
+    menambah node keempat hanya memindahkan sekitar 1/4 key (semuanya ke
+    node baru).
+    """
+    from src.cluster import HashRing, node_urls
+
+    keys = [(f"topic-{i % 8}", f"{i:09d}") for i in range(40000)]
+    three = HashRing(node_urls(3, 8081))
+    four = HashRing(node_urls(4, 8081))
+    assert [three.owner(*key) for key in keys[:100]] == [HashRing(node_urls(3, 8081)).owner(*key) for key in keys[:100]]
+
+    counts = Counter(four.owner(*key) for key in keys)
+    assert min(counts.values()) > 0.8 * len(keys) / 4
+
+    moved = [key for key in keys if three.owner(*key) != four.owner(*key)]
+    assert 0.15 * len(keys) < len(moved) < 0.35 * len(keys)
+    assert all(four.owner(*key) == 3 for key in moved)
+
+# Tes 49
+def test_cluster_publish_dedup_and_fan_out(tmp_path):
+    """
+    Tes [Cluster]: tiga proses node lokal. Publish ke node mana pun
+    diteruskan ke pemilik key, sehingga duplikat yang dikirim lewat node
+    berbeda tetap terdeteksi; /stats, /events (halaman + NDJSON), dan
+    /aggregate dari node mana pun melihat data seluruh cluster.
+    """
+    from src.cluster import FORWARDED_HEADER, node_urls, start_nodes, stop_nodes
+
+    secret = "pytest-cluster-secret"
+    base = free_base_port(3)
+    nodes = start_nodes(3, base, str(tmp_path), env={"CLUSTER_SECRET": secret})
+    urls = node_urls(3, base)
+    try:
+        events = [
+            {"topic": f"c{i % 2}", "event_id": f"e{i}", "timestamp": f"2025-01-01T00:00:{i % 60:02d}Z",
+             "source": "pytest", "payload": {"i": i}}
+            for i in range(300)
+        ]
+        with httpx.Client(timeout=10) as client:
+            assert client.post(urls[0] + "/publish", json=events).json() == {"status": "events queued", "count": 300}
+            assert client.post(urls[1] + "/publish", json=events[:100]).status_code == 200
+            res = client.post(urls[2] + "/publish/stream", content="\n".join(
+                '{"topic": "c0", "event_id": "e0", "timestamp": "2025-01-01T00:00:00Z", "source": "s", "payload": {}}'
+                for _ in range(2)
+            ))
+            assert res.json()["accepted"] == 2
+
+            for _ in range(100):
+                stats = client.get(urls[2] + "/stats").json()
+                if stats["unique_processed"] + stats["duplicate_dropped"] == 402:
+                    break
+                time.sleep(0.05)
+            assert stats["unique_processed"] == 300 and stats["duplicate_dropped"] == 102
+            assert stats["topics"] == ["c0", "c1"] and stats["cluster"] == {"nodes": 3, "unreachable": []}
+
+            # Setiap node hanya menyimpan key miliknya.
+            local = [client.get(url + "/stats", headers={FORWARDED_HEADER: secret}).json() for url in urls]
+            assert sum(s["unique_processed"] for s in local) == 300
+            assert all(s["unique_processed"] > 50 for s in local)
+
+            # Klien luar tidak bisa memalsukan header forward untuk melewati ring.
+            forged = client.post(urls[0] + "/publish", json=events[:1], headers={FORWARDED_HEADER: "1"})
+            assert forged.status_code == 403
+
+            pages, cursor = [], None
+            while True:
+                params = {"topic": "c0", "limit": 40, **({"after": cursor} if cursor else {})}
+                page = client.get(urls[1] + "/events", params=params).json()
+                pages.extend(page["events"])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            assert len(pages) == 150 and len({e["event_id"] for e in pages}) == 150
+            assert pages == sorted(pages, key=lambda e: (e["timestamp"], e["event_id"]))
+            assert client.get(urls[0] + "/events", params={"topic": "c1", "format": "ndjson"}).text.count("\n") == 150
+
+            agg = client.get(urls[0] + "/aggregate", params={"granularity": "1h"}).json()
+            assert [(b["topic"], b["count"]) for b in agg["buckets"]] == [("c0", 150), ("c1", 150)]
+            assert client.get(urls[0] + "/events/stream", params={"topic": "c0"}).status_code == 501
+
+        # Node yang mati: publish yang butuh node itu ditolak 503 agar dikirim ulang.
+        stop_nodes(nodes[2:])
+        with httpx.Client(timeout=10) as client:
+            res = client.post(urls[0] + "/publish", json=[dict(e, event_id=f"late-{i}") for i, e in enumerate(events[:30])])
+            assert res.status_code == 503 and res.headers["retry-after"] == "1"
+            assert client.get(urls[0] + "/stats").json()["cluster"]["unreachable"] == [urls[2]]
+    finally:
+        stop_nodes(nodes)
+
+# Tes 54
+def test_peer_forwarder_coalesces_concurrent_sub_batches():
+    """
+    Tes [Cluster]: sub-batch yang menunggu saat request ke node tujuan
+    sedang berjalan digabung menjadi satu POST, dan jumlah diterima
+    (prefix, policy partial) dibagi ke setiap pemanggil sesuai urutan.
+    """
+    import asyncio
+    from src.cluster import PeerForwarder
+    from src.records import QueuedEvent
+
+    class FakeResponse:
+        def __init__(self, count):
+            self.count = count
+
+        def json(self):
+            return {"count": self.count}
+
+    class FakeCluster:
+        nodes = ["http://peer"]
+
+        def __init__(self):
+            self.bodies = []
+
+        async def request(self, node, method, path, content, headers):
+            self.bodies.append(content.count(b'"event_id"'))
+            await asyncio.sleep(0.01)
+            return FakeResponse(min(self.bodies[-1], 7))
+
+    def batch(prefix, count):
+        return [QueuedEvent("t", f"{prefix}-{i}", "2025-01-01T00:00:00Z", "s", b"{}") for i in range(count)]
+
+    async def scenario():
+        cluster = FakeCluster()
+        forwarder = PeerForwarder(cluster, 0, max_events=100, max_inflight=1)
+        first = asyncio.ensure_future(forwarder.publish(batch("b0", 4)))
+        await asyncio.sleep(0.001)  # request pertama sudah berjalan
+        results = await asyncio.gather(first, *(forwarder.publish(batch(f"b{i}", 4)) for i in range(1, 4)))
+        await forwarder.close()
+        return cluster.bodies, results
+
+    bodies, results = asyncio.run(scenario())
+    assert bodies == [4, 12]            # request pertama langsung, sisanya digabung
+    assert results == [4, 4, 3, 0]      # prefix 7 dari gabungan 12 event
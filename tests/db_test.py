@@ -0,0 +1,32 @@
+import sqlite3
+import pytest
+from src.db import Database
+
+# Tes 10
+def test_database_uses_wal_and_readonly_pool(tmp_path):
+    """
+    Tes [Connection Manager]: writer memakai WAL + synchronous=NORMAL,
+    dan koneksi pool reader benar-benar read-only.
+    """
+    db = Database(str(tmp_path / "pool.db"), read_pool_size=2)
+    writer = db.open_writer()
+    writer.execute("CREATE TABLE t (x INTEGER)")
+    writer.commit()
+    db.open_readers()
+
+    assert writer.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert writer.execute("PRAGMA synchronous").fetchone()[0] == 1 # NORMAL
+
+    with db.reader() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO t VALUES (1)")
+
+    # Transaksi writer yang masih terbuka tidak memblokir reader (WAL)
+    writer.execute("INSERT INTO t VALUES (1)")
+    with db.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    writer.commit()
+    with db.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+
+    db.close()
@@ -0,0 +1,58 @@
+from src.dedup_cache import BloomFilter, DedupIndex, LRUCache, MAYBE, NEW, SEEN
+from src.db import Database
+from tests.conftest import create_test_event
+
+# Tes 12
+def test_lru_and_bloom_bounds():
+    """
+    Tes [Dedup Cache]: LRU membuang key paling lama, Bloom filter
+    tidak pernah false negative dan ukurannya mengikuti kapasitas/FP rate.
+    """
+    lru = LRUCache(2)
+    lru.add("a")
+    lru.add("b")
+    assert "a" in lru # "a" jadi paling baru dipakai
+    lru.add("c")
+    assert "b" not in lru
+    assert "a" in lru and "c" in lru
+
+    bloom = BloomFilter(capacity=1000, fp_rate=0.01)
+    keys = [("t", str(i)) for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    assert bloom.size_bytes < 2000 # ~12 bit per key
+    false_positives = sum(("t", f"x{i}") in bloom for i in range(10000))
+    assert false_positives < 300
+
+    index = DedupIndex(lru_size=10, bloom_capacity=100, fp_rate=0.01)
+    assert index.lookup(("t", "1")) == NEW
+    index.add(("t", "1"))
+    assert index.lookup(("t", "1")) == SEEN
+    index.lru.discard(("t", "1"))
+    assert index.lookup(("t", "1")) == MAYBE
+
+# Tes 13
+def test_stale_bloom_never_drops_or_loses_events(tmp_path):
+    """
+    Tes [Dedup Cache]: jika Bloom filter (keliru) menyatakan key lama sebagai
+    baru, batch diulang dengan probe penuh sehingga hasil tetap tepat.
+    """
+    from src.main import init_db, process_batch_in_db
+    from src.records import QueuedEvent
+
+    db = Database(str(tmp_path / "cache.db"))
+    init_db(db.open_writer())
+
+    old = QueuedEvent.from_dict(create_test_event("old-1"))
+    new = QueuedEvent.from_dict(create_test_event("new-1"))
+    assert process_batch_in_db(db.writer, [old]) == [True]
+
+    empty_index = DedupIndex(lru_size=10, bloom_capacity=100, fp_rate=0.01) # tidak di-load dari DB
+    assert process_batch_in_db(db.writer, [old, new, new], empty_index) == [False, True, False]
+    assert empty_index.lookup(("test-topic", "old-1")) == SEEN
+    assert process_batch_in_db(db.writer, [new, old], empty_index) == [False, False]
+
+    count = db.writer.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+    assert count == 2
+    db.close()
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from fastapi.testclient import TestClient
+from src.ingest_log import IngestLog
+from tests.conftest import create_test_event
+
+# Tes 16
+def test_ingest_log_segments_group_sync_and_torn_tail(monkeypatch, tmp_path):
+    """
+    Tes [Durable Ingest]: record bisa dibaca ulang setelah reopen, segmen
+    berganti sesuai ukuran, record terpotong di ujung dibuang, dan segmen
+    yang sudah di-commit dihapus di luar event loop.
+    """
+    log_dir = str(tmp_path / "log")
+
+    async def write_records():
+        log = IngestLog(log_dir, segment_bytes=64)
+        log.open()
+        offsets = [log.append(f"record-{i}".encode()) for i in range(5)]
+        # Lima penunggu berbagi fsync yang sama
+        await asyncio.gather(*(log.sync(offset) for offset in offsets))
+        assert log.durable_offset == 5
+        log.close()
+
+    asyncio.run(write_records())
+    assert len(os.listdir(log_dir)) > 1
+
+    # Simulasi crash di tengah penulisan record berikutnya
+    last_segment = sorted(os.listdir(log_dir))[-1]
+    with open(os.path.join(log_dir, last_segment), "ab") as f:
+        f.write(b"\x05\x00\x00")
+
+    log = IngestLog(log_dir, segment_bytes=64)
+    log.open()
+    assert log.next_offset == 5
+    assert [data for _, data in log.read_from(3)] == [b"record-3", b"record-4"]
+
+    # Unlink segmen berjalan di thread executor, bukan di event loop.
+    removed_in = []
+    original_remove = os.remove
+
+    def tracked_remove(path):
+        removed_in.append(threading.current_thread() is threading.main_thread())
+        original_remove(path)
+
+    monkeypatch.setattr(os, "remove", tracked_remove)
+    asyncio.run(log.truncate_before(4))
+    assert removed_in and not any(removed_in)
+    assert [offset for offset, _ in log.read_from(0)][0] <= 4
+    assert [offset for offset, _ in log.read_from(0)][-1] == 4
+    log.close()
+
+# Tes 17
+def test_acked_events_replayed_after_crash(monkeypatch, tmp_path):
+    """
+    Tes [Durable Ingest]: event yang sudah di-ack (ada di log) tetapi belum
+    diproses saat crash di-replay pada startup berikutnya, tepat satu kali.
+    """
+    db_path = str(tmp_path / "durable.db")
+    monkeypatch.setenv("DATABASE_FILE", db_path)
+    monkeypatch.setenv("DURABLE_ACK", "1")
+
+    from src.main import app
+
+    with TestClient(app) as client:
+        res = client.post("/publish", json=[create_test_event("d-1"), create_test_event("d-2")])
+        assert res.status_code == 200
+        time.sleep(0.1)
+        assert client.get("/stats").json()["unique_processed"] == 2
+
+    # Crash: batch sudah tertulis di log (sudah di-ack) tetapi consumer belum sempat memprosesnya
+    log = IngestLog(db_path + ".ingest")
+    log.open()
+    log.append(json.dumps([create_test_event("d-3"), create_test_event("d-1")]).encode())
+    log.close()
+
+    with TestClient(app) as client:
+        time.sleep(0.1)
+        stats = client.get("/stats").json()
+        assert stats["unique_processed"] == 3
+        assert stats["duplicate_dropped"] == 1
+
+    # Restart berikutnya tidak me-replay ulang yang sudah di-commit
+    with TestClient(app) as client:
+        time.sleep(0.1)
+        stats = client.get("/stats").json()
+        assert stats["received"] == 0
+        assert stats["unique_processed"] == 3
+
+# Tes 50
+def test_ingest_log_truncated_only_after_durable_commit(monkeypatch, tmp_path):
+    """
+    Tes [Durable Ingest]: pada mode durable-ack writer SQLite memakai
+    synchronous=FULL (commit di-fsync), dan saat ingest log dipotong semua
+    event di segmen yang dibuang sudah terbaca dari file DB.
+    """
+    db_path = str(tmp_path / "durable.db")
+    monkeypatch.setenv("DATABASE_FILE", db_path)
+    monkeypatch.setenv("DURABLE_ACK", "1")
+    monkeypatch.setenv("INGEST_LOG_SEGMENT_BYTES", "512")
+
+    import sqlite3
+    from src.main import app, app_state
+
+    truncations = []
+    original = IngestLog.truncate_before
+
+    def checked_truncate(self, offset):
+        expected = [e["event_id"] for start, data in self.read_from(0) if start < offset for e in json.loads(data)]
+        with sqlite3.connect(db_path) as conn:
+            stored = {row[0] for row in conn.execute("SELECT event_id FROM events")}
+        truncations.append((offset, set(expected) <= stored))
+        return original(self, offset)
+
+    monkeypatch.setattr(IngestLog, "truncate_before", checked_truncate)
+
+    with TestClient(app) as client:
+        writer = app_state["partitions"][0].db.writer
+        assert writer.execute("PRAGMA synchronous").fetchone()[0] == 2  # FULL
+        for i in range(20):
+            assert client.post("/publish", json=[create_test_event(f"t-{i}-{j}") for j in range(5)]).status_code == 200
+        for _ in range(100):
+            if client.get("/stats").json()["unique_processed"] == 100:
+                break
+            time.sleep(0.05)
+        assert client.get("/stats").json()["unique_processed"] == 100
+
+    assert truncations and all(ok for _, ok in truncations)
+    assert len(os.listdir(db_path + ".ingest")) < 20
@@ -0,0 +1,61 @@
+import json
+import time
+from fastapi.testclient import TestClient
+from tests.conftest import create_test_event
+
+def make_events(n: int):
+    events = []
+    for i in range(n):
+        event = create_test_event(f"q-{i:03d}")
+        event["timestamp"] = f"2025-01-01T00:00:{i:02d}Z"
+        events.append(event)
+    return events
+
+# Tes 19
+def test_events_keyset_pagination_and_time_filters(test_client: TestClient):
+    """
+    Tes [GET /events]: halaman keyset (limit/after) menutup seluruh topik
+    tanpa duplikat, dan filter since/until membatasi rentang waktu.
+    """
+    assert test_client.post("/publish", json=make_events(25)).status_code == 200
+    time.sleep(0.2)
+
+    seen, cursor = [], None
+    while True:
+        url = "/events?topic=test-topic&limit=10" + (f"&after={cursor}" if cursor else "")
+        data = test_client.get(url).json()
+        seen.extend(event["event_id"] for event in data["events"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"q-{i:03d}" for i in range(25)]
+
+    data = test_client.get("/events?topic=test-topic&since=2025-01-01T00:00:05Z&until=2025-01-01T00:00:08Z").json()
+    assert [event["event_id"] for event in data["events"]] == ["q-005", "q-006", "q-007"]
+
+    assert test_client.get("/events?topic=test-topic&after=bukan-cursor").status_code == 400
+
+# Tes 20
+def test_events_ndjson_stream_and_index_usage(test_client: TestClient):
+    """
+    Tes [GET /events]: format=ndjson mengalirkan satu event per baris, dan
+    query memakai index (topic, timestamp, event_id), bukan full scan.
+    """
+    assert test_client.post("/publish", json=make_events(12)).status_code == 200
+    time.sleep(0.2)
+
+    res = test_client.get("/events?topic=test-topic&format=ndjson&since=2025-01-01T00:00:02Z")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    assert [event["event_id"] for event in lines] == [f"q-{i:03d}" for i in range(2, 12)]
+    assert lines[0]["payload"] == {"test_id": "q-002"}
+
+    from src.main import partition_for
+    with partition_for("test-topic").db.reader() as conn:
+        plan = " ".join(row[-1] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM events WHERE topic = ? AND timestamp IS NOT NULL AND timestamp >= ? ORDER BY timestamp, event_id",
+            ("test-topic", "2025")
+        ))
+    assert "idx_events_topic_time" in plan
+    assert "TEMP B-TREE" not in plan
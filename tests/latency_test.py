@@ -0,0 +1,38 @@
+import time
+from fastapi.testclient import TestClient
+from tests.conftest import create_test_event
+
+def p99(samples):
+    ordered = sorted(samples)
+    return ordered[int(len(ordered) * 0.99) - 1]
+
+def timed_stats(client: TestClient) -> float:
+    start = time.perf_counter()
+    assert client.get("/stats").status_code == 200
+    return time.perf_counter() - start
+
+# Tes 11
+def test_stats_latency_flat_while_consumer_saturated(test_client: TestClient):
+    """
+    Tes [Responsivitas]: p99 latensi GET /stats saat consumer sibuk menulis
+    ke SQLite (di thread writer) tetap datar dibanding saat idle.
+    """
+    idle = [timed_stats(test_client) for _ in range(100)]
+
+    total = 0
+    for batch_no in range(20):
+        batch = [create_test_event(f"lat-{batch_no}-{i}") for i in range(1000)]
+        for event in batch:
+            event["payload"]["blob"] = "x" * 2048
+        assert test_client.post("/publish", json=batch).status_code == 200
+        total += len(batch)
+
+    busy = []
+    deadline = time.monotonic() + 60
+    while test_client.get("/stats").json()["unique_processed"] < total:
+        assert time.monotonic() < deadline, "Consumer tidak selesai memproses batch dalam 60 detik"
+        busy.append(timed_stats(test_client))
+
+    print(f"/stats p99 idle={p99(idle) * 1000:.2f}ms busy={p99(busy) * 1000:.2f}ms ({len(busy)} sampel)")
+    assert len(busy) >= 20, "Consumer selesai sebelum latensi sempat diukur"
+    assert p99(busy) < max(p99(idle) * 5, 0.05)
@@ -0,0 +1,74 @@
+import json
+import threading
+import time
+from tests.conftest import create_test_event
+
+def parse_sse(text: str):
+    """Mengembalikan list (id, event, data) dari body SSE."""
+    frames = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if fields:
+            frames.append((fields.get("id"), fields.get("event"), fields.get("data")))
+    return frames
+
+# Tes 33
+def test_broadcaster_slow_consumer_policies():
+    """
+    Tes [Live Tail]: buffer per subscriber terbatas; policy drop_oldest
+    membuang item lama, policy disconnect menandai subscriber overflow.
+    """
+    from src.live_tail import Broadcaster
+
+    dropping = Broadcaster(buffer_size=2, policy="drop_oldest")
+    sub = dropping.subscribe(["a", "b"])
+    for i in range(5):
+        dropping.publish("a", lambda i=i: i)
+    dropping.publish("c", lambda: "tidak ada subscriber")
+    assert list(sub.buffer) == [3, 4]
+    assert sub.dropped == 3
+
+    strict = Broadcaster(buffer_size=2, policy="disconnect")
+    slow = strict.subscribe(["a"])
+    for i in range(3):
+        strict.publish("a", lambda i=i: i)
+    assert slow.overflowed and not slow.buffer
+
+    strict.unsubscribe(slow)
+    dropping.unsubscribe(sub)
+    assert strict.by_topic == {} and dropping.by_topic == {}
+
+# Tes 34
+def test_live_tail_pushes_new_events_and_resumes_from_cursor(test_client):
+    """
+    Tes [Live Tail]: stream SSE hanya mengirim event unik yang baru di-commit
+    (duplikat tidak), dan cursor `id` bisa dipakai untuk melanjutkan lewat
+    backfill dari SQLite.
+    """
+    old = create_test_event("old", "tail")
+    assert test_client.post("/publish", json=[old]).status_code == 200
+    time.sleep(0.1)
+
+    new = [create_test_event("new-1", "tail"), create_test_event("new-2", "tail")]
+    def publish_later():
+        time.sleep(0.3)
+        test_client.post("/publish", json=[old, new[0]])
+        time.sleep(0.1)
+        test_client.post("/publish", json=[new[1], create_test_event("other", "other-topic")])
+
+    publisher = threading.Thread(target=publish_later)
+    publisher.start()
+    res = test_client.get("/events/stream?topic=tail&limit=2")
+    publisher.join()
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+    frames = parse_sse(res.text)
+    assert [json.loads(data)["event_id"] for _, _, data in frames] == ["new-1", "new-2"]
+    assert json.loads(frames[0][2])["payload"] == new[0]["payload"]
+
+    # Lanjut dari event pertama: sisa event diambil dari SQLite.
+    res = test_client.get("/events/stream?topic=tail&limit=1", headers={"Last-Event-ID": frames[0][0]})
+    assert [json.loads(data)["event_id"] for _, _, data in parse_sse(res.text)] == ["new-2"]
+
+    assert test_client.get("/events/stream?topic=tail&after=bukan-cursor").status_code == 400
@@ -0,0 +1,60 @@
+import threading
+import time
+from tests.conftest import create_test_event
+
+# Tes 31
+def test_histogram_shards_sum_across_threads():
+    """
+    Tes [Metrics]: observasi dari banyak thread (shard masing-masing) dijumlahkan
+    saat render, dengan bucket kumulatif format Prometheus.
+    """
+    from src.metrics import CounterVec, Histogram, Registry
+
+    registry = Registry()
+    hist = registry.register(Histogram("test_seconds", "Tes.", buckets=(0.01, 0.1)))
+    counter = registry.register(CounterVec("test_total", "Tes.", "topic"))
+
+    def work():
+        for _ in range(1000):
+            hist.observe(0.005)
+            hist.observe(0.05)
+            hist.observe(1.0)
+            counter.inc('a"b')
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    lines = registry.render().splitlines()
+    assert "# TYPE test_seconds histogram" in lines
+    assert 'test_seconds_bucket{le="0.01"} 4000' in lines
+    assert 'test_seconds_bucket{le="0.1"} 8000' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 12000' in lines
+    assert "test_seconds_count 12000" in lines
+    assert 'test_total{topic="a\\"b"} 4000' in lines
+
+# Tes 32
+def test_metrics_endpoint_reports_latency_and_topic_counters(test_client):
+    """
+    Tes [Metrics]: /metrics memuat histogram publish/commit/transaksi, gauge
+    queue, dan counter unik/duplikat per topik.
+    """
+    events = [create_test_event("m-1", "metrics-topic"), create_test_event("m-2", "metrics-topic")]
+    assert test_client.post("/publish", json=events + [events[0]]).status_code == 200
+    time.sleep(0.1)
+
+    res = test_client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    lines = res.text.splitlines()
+
+    assert 'aggregator_events_unique_total{topic="metrics-topic"} 2' in lines
+    assert 'aggregator_events_duplicate_total{topic="metrics-topic"} 1' in lines
+    assert 'aggregator_event_queue_depth{partition="0"} 0' in lines
+    assert 'aggregator_event_queue_oldest_age_seconds{partition="0"} 0' in lines
+    for name in ("aggregator_publish_duration_seconds", "aggregator_enqueue_to_commit_seconds",
+                 "aggregator_sqlite_transaction_seconds"):
+        count = next(line for line in lines if line.startswith(f"{name}_count "))
+        assert int(count.split()[1]) >= 1
@@ -0,0 +1,46 @@
+import sqlite3
+import time
+from fastapi.testclient import TestClient
+from tests.conftest import create_test_event
+
+# Tes 30
+def test_split_tables_migrated_to_single_events_table(monkeypatch, tmp_path):
+    """
+    Tes [Skema Satu Tabel]: database layout lama (dedup_store + processed_events)
+    dimigrasi ke tabel `events` saat startup. Key tanpa event tetap menjadi
+    key dedup, dan event lama tetap terbaca.
+    """
+    db_path = tmp_path / "legacy.db"
+    monkeypatch.setenv("DATABASE_FILE", str(db_path))
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE dedup_store (topic TEXT, event_id TEXT, processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (topic, event_id))")
+    conn.execute("CREATE TABLE processed_events (topic TEXT, event_id TEXT, timestamp TEXT, source TEXT, payload TEXT, UNIQUE(topic, event_id))")
+    conn.executemany("INSERT INTO dedup_store (topic, event_id) VALUES (?, ?)", [("test-topic", "kept"), ("test-topic", "key-only")])
+    conn.execute("INSERT INTO processed_events VALUES ('test-topic', 'kept', '2024-01-01T00:00:00Z', 'old', '{\"a\": 1}')")
+    conn.commit()
+    conn.close()
+
+    from src.main import app
+
+    with TestClient(app) as client:
+        stats = client.get("/stats").json()
+        assert stats["unique_processed"] == 2
+        assert stats["topics"] == ["test-topic"]
+
+        events = client.get("/events?topic=test-topic").json()["events"]
+        assert [(e["event_id"], e["payload"]) for e in events] == [("kept", {"a": 1})]
+
+        res = client.post("/publish", json=[create_test_event("key-only"), create_test_event("new")])
+        assert res.status_code == 200
+        time.sleep(0.1)
+        stats = client.get("/stats").json()
+        assert stats["unique_processed"] == 3
+        assert stats["duplicate_dropped"] == 1
+
+    conn = sqlite3.connect(db_path)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    without_rowid = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'events'").fetchone()[0]
+    conn.close()
+    assert "dedup_store" not in tables and "processed_events" not in tables
+    assert "WITHOUT ROWID" in without_rowid
@@ -0,0 +1,83 @@
+import os
+import time
+import uuid
+from fastapi.testclient import TestClient
+from tests.conftest import create_test_event
+
+# Tes 35
+def test_ipc_batch_roundtrip_and_shared_stats():
+    """
+    Tes [Multi-Proses]: encoding batch biner IPC mempertahankan semua field
+    (termasuk payload bytes apa adanya), dan snapshot SharedStats yang ditulis
+    writer terbaca utuh oleh proses lain yang meng-attach segmen yang sama.
+    """
+    from src.ipc import decode_batch, encode_batch
+    from src.records import QueuedEvent
+    from src.shared_stats import STAT_FIELDS, SharedStats
+
+    events = [
+        QueuedEvent("topik-ü", "id-1", "2025-01-01T00:00:00Z", "src", b'{"a": 1}'),
+        QueuedEvent("t", "id-2", "2025-01-01T00:00:01Z", "", b"{}"),
+    ]
+    decoded = decode_batch(encode_batch(events))
+    assert [(e.topic, e.event_id, e.timestamp, e.source, e.payload) for e in decoded] == \
+        [(e.topic, e.event_id, e.timestamp, e.source, e.payload) for e in events]
+
+    name = f"aggregator-test-{uuid.uuid4().hex[:8]}"
+    owner = SharedStats.create(name)
+    try:
+        reader = SharedStats.attach(name)
+        owner.write(list(range(len(STAT_FIELDS))), 123.5, ["a", "b"])
+        owner.write([7] * len(STAT_FIELDS), 124.0)  # topik tidak berubah
+        counters, start_time, topics = reader.read()
+        assert counters == dict.fromkeys(STAT_FIELDS, 7)
+        assert start_time == 124.0 and topics == ["a", "b"]
+        reader.close()
+    finally:
+        owner.close()
+
+# Tes 36
+def test_worker_forwards_to_writer_process(tmp_path):
+    """
+    Tes [Multi-Proses]: worker HTTP (INGEST_MODE=worker) meneruskan batch ke
+    proses writer terpisah; dedup tetap terpusat di writer, /stats dibaca
+    dari shared memory, dan /events membaca SQLite langsung secara read-only.
+    """
+    from src.multiproc import start_writer, stop_writer
+
+    env = {
+        "DATABASE_FILE": str(tmp_path / "mp.db"),
+        "INGEST_SOCKET": str(tmp_path / "mp.sock"),
+        "SHARED_STATS_NAME": f"aggregator-test-{uuid.uuid4().hex[:8]}",
+    }
+    os.environ.update(env)
+    writer = start_writer()
+    try:
+        os.environ["INGEST_MODE"] = "worker"
+        from src.main import app
+        with TestClient(app) as client:
+            events = [create_test_event("mp-1", "mp"), create_test_event("mp-2", "mp")]
+            res = client.post("/publish", json=events + [events[0]])
+            assert res.status_code == 200
+            assert res.json()["count"] == 3
+
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                stats = client.get("/stats").json()
+                if stats["unique_processed"] + stats["duplicate_dropped"] == 3:
+                    break
+                time.sleep(0.05)
+            assert stats["received"] == 3
+            assert stats["unique_processed"] == 2
+            assert stats["duplicate_dropped"] == 1
+            assert stats["topics"] == ["mp"]
+
+            res = client.get("/events?topic=mp")
+            assert [event["event_id"] for event in res.json()["events"]] == ["mp-1", "mp-2"]
+            assert client.get("/events/stream?topic=mp").status_code == 501
+    finally:
+        del os.environ["INGEST_MODE"]
+        stop_writer(writer)
+        for key in env:
+            del os.environ[key]
+    assert writer.exitcode == 0
@@ -0,0 +1,41 @@
+import time
+from fastapi.testclient import TestClient
+from tests.conftest import create_test_event
+
+# Tes 18
+def test_partitioned_consumers_shard_by_topic(monkeypatch, tmp_path):
+    """
+    Tes [Partisi]: event dirutekan ke shard per hash topik, /events membaca
+    shard yang tepat, dan /stats (termasuk setelah restart) teragregasi.
+    """
+    monkeypatch.setenv("DATABASE_FILE", str(tmp_path / "sharded.db"))
+    monkeypatch.setenv("CONSUMER_PARTITIONS", "3")
+    monkeypatch.setenv("DURABLE_ACK", "1")
+
+    from src.main import app, partition_index
+
+    topics = [f"topic-{i}" for i in range(8)]
+    events = [create_test_event(f"p-{i}", topic=topics[i % len(topics)]) for i in range(40)]
+
+    with TestClient(app) as client:
+        assert client.post("/publish", json=events + events[:10]).status_code == 200
+        time.sleep(0.2)
+
+        stats = client.get("/stats").json()
+        assert stats["unique_processed"] == 40
+        assert stats["duplicate_dropped"] == 10
+        assert sorted(stats["topics"]) == sorted(topics)
+        for topic in topics:
+            assert len(client.get(f"/events?topic={topic}").json()["events"]) == 5
+
+    used_shards = {partition_index(topic, 3) for topic in topics}
+    for index in used_shards:
+        assert (tmp_path / f"sharded.p{index}.db").exists()
+    assert not (tmp_path / "sharded.db").exists()
+
+    with TestClient(app) as client:
+        time.sleep(0.1)
+        stats = client.get("/stats").json()
+        assert stats["received"] == 0 # tidak ada replay ulang dari ingest log
+        assert stats["unique_processed"] == 40
+        assert sorted(stats["topics"]) == sorted(topics)
@@ -0,0 +1,105 @@
+import json
+import sqlite3
+import time
+from fastapi.testclient import TestClient
+
+def make_event(event_id: str, topic: str, payload: dict, second: int = 0):
+    return {
+        "topic": topic, "event_id": event_id, "timestamp": f"2025-01-01T00:00:{second:02d}Z",
+        "source": "pytest", "payload": payload,
+    }
+
+def wait_ready(client: TestClient, url: str):
+    for _ in range(100):
+        res = client.get(url)
+        if res.status_code != 503:
+            return res
+        time.sleep(0.05)
+    return res
+
+# Tes 41
+def test_events_filtered_by_indexed_payload_fields(monkeypatch, tmp_path):
+    """
+    Tes [Index Payload]: GET /events?where=field:value hanya mengembalikan
+    event yang cocok (beberapa filter = AND), urut & bisa dipaginasi dengan
+    cursor yang sama; field yang tidak dideklarasikan ditolak (400), dan
+    entri index ikut dihapus saat retensi membuang isi event.
+    """
+    monkeypatch.setenv("DATABASE_FILE", str(tmp_path / "index.db"))
+    monkeypatch.setenv("INDEXED_FIELDS", json.dumps({"logs": ["level", "user.id"]}))
+    from src.main import app
+
+    levels = ["error", "info", "warn"]
+    events = [
+        make_event(f"e-{i:02d}", "logs", {"level": levels[i % 3], "user": {"id": i % 2}}, second=i)
+        for i in range(30)
+    ]
+    events.append(make_event("other", "metrics", {"level": "error"}))
+    with TestClient(app) as client:
+        assert client.post("/publish", json=events + events[:3]).status_code == 200
+        time.sleep(0.1)
+
+        errors = wait_ready(client, "/events?topic=logs&where=level:error").json()["events"]
+        assert [e["event_id"] for e in errors] == [f"e-{i:02d}" for i in range(0, 30, 3)]
+        assert errors[0]["payload"] == {"level": "error", "user": {"id": 0}}
+
+        seen, cursor = [], None
+        while True:
+            params = {"topic": "logs", "where": ["level:error", "user.id:1"], "limit": 2}
+            if cursor:
+                params["after"] = cursor
+            data = client.get("/events", params=params).json()
+            seen.extend(e["event_id"] for e in data["events"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == ["e-03", "e-09", "e-15", "e-21", "e-27"]
+
+        ndjson = client.get("/events?topic=logs&where=level:warn&since=2025-01-01T00:00:20Z&format=ndjson")
+        assert [json.loads(line)["event_id"] for line in ndjson.text.splitlines()] == ["e-20", "e-23", "e-26", "e-29"]
+
+        assert client.get("/events?topic=logs&where=level:debug").json()["events"] == []
+        assert client.get("/events?topic=logs&where=source:web").status_code == 400
+        assert client.get("/events?topic=metrics&where=level:error").status_code == 400
+        assert client.get("/events?topic=logs&where=level").status_code == 400
+        assert client.get("/events?topic=logs&where=level:error&format=ndjson").status_code == 200
+
+    from src.retention import delete_events_before
+    conn = sqlite3.connect(tmp_path / "index.db")
+    assert delete_events_before(conn, "logs", ("2025-01-01T00:00:09Z", "e-09"), 5) == 5
+    assert conn.execute("SELECT COUNT(*) FROM payload_index WHERE timestamp < '2025-01-01T00:00:05Z'").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM payload_index WHERE timestamp >= '2025-01-01T00:00:05Z'").fetchone()[0] == 50
+    conn.close()
+
+# Tes 42
+def test_payload_index_backfilled_when_field_declared_later(monkeypatch, tmp_path):
+    """
+    Tes [Index Payload]: field yang baru dideklarasikan setelah event
+    tersimpan diisi dari event lama di background (bertahap per batch),
+    dan field yang tidak lagi dideklarasikan dihapus dari index.
+    """
+    monkeypatch.setenv("DATABASE_FILE", str(tmp_path / "backfill.db"))
+    monkeypatch.setenv("PAYLOAD_INDEX_BACKFILL_BATCH", "7")
+    from src.main import app
+
+    events = [make_event(f"b-{i:02d}", "jobs", {"status": "failed" if i % 4 == 0 else "ok", "code": i % 4}, second=i)
+              for i in range(40)]
+    with TestClient(app) as client:
+        assert client.post("/publish", json=events).status_code == 200
+        time.sleep(0.1)
+        assert client.get("/events?topic=jobs&where=status:failed").status_code == 400
+
+    monkeypatch.setenv("INDEXED_FIELDS", json.dumps({"jobs": ["status", "code"]}))
+    with TestClient(app) as client:
+        res = wait_ready(client, "/events?topic=jobs&where=status:failed&where=code:0&limit=100")
+        assert res.status_code == 200
+        assert [e["event_id"] for e in res.json()["events"]] == [f"b-{i:02d}" for i in range(0, 40, 4)]
+
+    monkeypatch.setenv("INDEXED_FIELDS", json.dumps({"jobs": ["status"]}))
+    with TestClient(app) as client:
+        assert wait_ready(client, "/events?topic=jobs&where=code:0").status_code == 400
+        assert len(client.get("/events?topic=jobs&where=status:ok&limit=100").json()["events"]) == 30
+
+    conn = sqlite3.connect(tmp_path / "backfill.db")
+    assert conn.execute("SELECT DISTINCT field FROM payload_index").fetchall() == [("status",)]
+    conn.close()
@@ -0,0 +1,39 @@
+import time
+from fastapi.testclient import TestClient
+from tests.conftest import create_test_event
+
+# Tes 21
+def test_compressed_and_legacy_payloads_round_trip(monkeypatch, tmp_path):
+    """
+    Tes [Payload Raw]: payload besar disimpan sebagai BLOB zlib, payload kecil
+    dan baris lama (TEXT hasil json.dumps biasa) tetap terbaca identik.
+    """
+    monkeypatch.setenv("DATABASE_FILE", str(tmp_path / "payload.db"))
+    monkeypatch.setenv("PAYLOAD_COMPRESSION", "zlib")
+    monkeypatch.setenv("PAYLOAD_COMPRESSION_MIN_BYTES", "256")
+
+    from src.main import app, partition_for
+
+    big = create_test_event("big")
+    big["payload"] = {"text": "ü" * 2000, "nested": {"list": [1, 2.5, None, True]}}
+    small = create_test_event("small")
+
+    with TestClient(app) as client:
+        assert client.post("/publish", json=[big, small]).status_code == 200
+        time.sleep(0.1)
+
+        writer = partition_for("test-topic").db.writer
+        writer.execute(
+            "INSERT INTO events (topic, event_id, timestamp, source, payload) VALUES ('test-topic', 'legacy', '2000-01-01T00:00:00Z', 'old', ?)",
+            ('{"a": 1, "b": [1, 2]}',)
+        )
+        writer.commit()
+
+        types = dict(writer.execute("SELECT event_id, typeof(payload) FROM events"))
+        assert types == {"big": "blob", "small": "text", "legacy": "text"}
+
+        events = {e["event_id"]: e for e in client.get("/events?topic=test-topic").json()["events"]}
+        assert events["big"]["payload"] == big["payload"]
+        assert events["small"]["payload"] == small["payload"]
+        assert events["legacy"]["payload"] == {"a": 1, "b": [1, 2]}
+        assert events["big"]["source"] == "pytest"
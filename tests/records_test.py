@@ -0,0 +1,35 @@
+from fastapi.testclient import TestClient
+from src.records import QueuedEvent
+from tests.conftest import create_test_event
+
+# Tes 24
+def test_publish_validation_errors_match_fastapi_format(test_client: TestClient):
+    """
+    Tes [Validasi Cepat]: body tidak valid tetap dijawab 422 dengan format
+    error FastAPI (loc per event/field), dan skema body tetap ada di OpenAPI.
+    """
+    bad = create_test_event("bad-1")
+    del bad["timestamp"]
+    bad["source"] = 123
+    res = test_client.post("/publish", json=[create_test_event("ok-1"), bad])
+    assert res.status_code == 422
+    locs = [err["loc"] for err in res.json()["detail"]]
+    assert locs == [["body", 1, "timestamp"], ["body", 1, "source"]]
+    assert res.json()["detail"][0]["type"] == "missing"
+
+    assert test_client.post("/publish", content=b"{bukan json").status_code == 422
+    assert test_client.get("/stats").json()["received"] == 0
+
+    schema = test_client.get("/openapi.json").json()
+    body = schema["paths"]["/publish"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+    assert body["items"]["required"] == ["topic", "event_id", "timestamp", "source", "payload"]
+
+# Tes 25
+def test_queued_event_is_compact():
+    """
+    Tes [Validasi Cepat]: QueuedEvent tanpa __dict__ dan payload disimpan
+    sebagai byte JSON ringkas.
+    """
+    event = QueuedEvent.from_dict(create_test_event("slim-1"))
+    assert not hasattr(event, "__dict__")
+    assert event.payload == b'{"test_id":"slim-1"}'
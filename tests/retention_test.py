@@ -0,0 +1,130 @@
+import json
+import sqlite3
+import time
+import pytest
+from fastapi.testclient import TestClient
+from tests.conftest import create_test_event
+
+# Tes 28
+def test_retention_policies_merge_default_and_validate():
+    """
+    Tes [Retensi]: field topik menimpa default "*", dan konfigurasi yang
+    tidak valid ditolak saat startup.
+    """
+    from src.retention import load_retention_policies, policy_for
+
+    policies = load_retention_policies(json.dumps({
+        "*": {"dedup_window_s": 600},
+        "logs": {"max_events": 10},
+    }))
+    logs = policy_for(policies, "logs")
+    assert (logs.max_age_s, logs.max_events, logs.dedup_window_s) == (None, 10, 600)
+    assert policy_for(policies, "other").dedup_window_s == 600
+    assert load_retention_policies("") == {}
+
+    with pytest.raises(ValueError):
+        load_retention_policies(json.dumps({"logs": {"max_age_s": 60, "dedup_window_s": 30}}))
+    with pytest.raises(ValueError):
+        load_retention_policies(json.dumps({"logs": {"max_rows": 10}}))
+    with pytest.raises(ValueError):
+        load_retention_policies(json.dumps({"logs": {"max_events": -1}}))
+
+# Tes 29
+def test_retention_deletes_expired_rows_and_keeps_stats_consistent(monkeypatch, tmp_path):
+    """
+    Tes [Retensi]: max_events & max_age_s memangkas isi event, dedup
+    window menghapus key (event yang sama diterima lagi), dan /stats tetap
+    konsisten dengan isi DB setelah restart.
+    """
+    db_path = tmp_path / "retention.db"
+    monkeypatch.setenv("DATABASE_FILE", str(db_path))
+    monkeypatch.setenv("RETENTION_INTERVAL_S", "0.05")
+    monkeypatch.setenv("RETENTION_POLICIES", json.dumps({
+        "capped": {"max_events": 2},
+        "aging": {"max_age_s": 3600},
+        "short": {"dedup_window_s": 60},
+    }))
+
+    from src.main import app, partition_for
+
+    capped = [create_test_event(f"c-{i}", "capped") for i in range(4)]
+    for i, event in enumerate(capped):
+        event["timestamp"] = f"2030-01-01T00:00:0{i}Z"
+    stale = create_test_event("stale", "aging")
+    stale["timestamp"] = "2000-01-01T00:00:00Z"
+    fresh = create_test_event("fresh", "aging")
+    short = [create_test_event("s-1", "short"), create_test_event("s-2", "short")]
+
+    with TestClient(app) as client:
+        assert client.post("/publish", json=capped + [stale, fresh] + short).status_code == 200
+        time.sleep(0.1)
+
+        writer = partition_for("short").db.writer
+        writer.execute("UPDATE events SET processed_at = '2000-01-01 00:00:00' WHERE topic = 'short'")
+        writer.commit()
+        time.sleep(0.3)
+
+        ids = lambda topic: [e["event_id"] for e in client.get(f"/events?topic={topic}").json()["events"]]
+        assert ids("capped") == ["c-2", "c-3"]
+        assert ids("aging") == ["fresh"]
+        assert ids("short") == []
+
+        stats = client.get("/stats").json()
+        assert stats["unique_processed"] == 6
+        assert stats["expired_keys"] == 2
+        assert stats["expired_events"] == 5
+        assert sorted(stats["topics"]) == ["aging", "capped"]
+
+        # Key kedaluwarsa: event yang sama diterima lagi sebagai event baru.
+        assert client.post("/publish", json=[short[0]]).status_code == 200
+        time.sleep(0.1)
+        assert ids("short") == ["s-1"]
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    conn.close()
+
+    monkeypatch.delenv("RETENTION_POLICIES")
+    with TestClient(app) as client:
+        stats = client.get("/stats").json()
+        assert stats["unique_processed"] == 7
+        assert sorted(stats["topics"]) == ["aging", "capped", "short"]
+
+# Tes 59
+def test_retention_max_age_compares_utc_time(tmp_path):
+    """
+    Tes [Retensi]: max_age_s membandingkan waktu UTC, bukan string
+    timestamp: offset zona waktu (+07:00), `Z`, dan pecahan detik
+    diperhitungkan, dan pencarian memakai index waktu per topik.
+    """
+    from datetime import datetime, timezone
+    from src.main import init_db, process_batch_in_db
+    from src.records import QueuedEvent
+    from src.retention import age_cutoff, delete_events_older_than, ensure_event_age_index
+
+    conn = sqlite3.connect(tmp_path / "age.db")
+    init_db(conn)
+    ensure_event_age_index(conn)
+    process_batch_in_db(conn, [QueuedEvent("t", event_id, timestamp, "s", b"{}") for event_id, timestamp in [
+        ("offset-old", "2025-01-01T09:30:00+07:00"),   # 02:30Z: string lebih besar dari cutoff, tetapi lebih tua
+        ("z-old", "2025-01-01T02:59:59.500Z"),
+        ("naive-old", "2025-01-01T02:00:00"),
+        ("fraction-new", "2025-01-01T03:00:00.250Z"),  # string lebih kecil dari "...03:00:00Z" tanpa pecahan
+        ("offset-new", "2025-01-01T00:00:00-05:00"),   # 05:00Z: string lebih kecil, tetapi lebih baru
+        ("not-iso", "yesterday"),
+    ]])
+
+    now = datetime(2025, 1, 1, 4, 0, tzinfo=timezone.utc).timestamp()
+    cutoff = age_cutoff(3600, now)  # batas 03:00:00Z
+    plan = " ".join(row[-1] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT event_id FROM events WHERE topic = 't' AND julianday(timestamp) < ?", (cutoff,)
+    ))
+    assert "idx_events_topic_age" in plan
+
+    assert delete_events_older_than(conn, "t", cutoff, 2) == 2
+    assert delete_events_older_than(conn, "t", cutoff, 2) == 1
+    assert delete_events_older_than(conn, "t", cutoff, 2) == 0
+    remaining = conn.execute("SELECT event_id FROM events WHERE timestamp IS NOT NULL ORDER BY event_id").fetchall()
+    assert [row[0] for row in remaining] == ["fraction-new", "not-iso", "offset-new"]
+    assert conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 6
+    conn.close()
@@ -0,0 +1,71 @@
+import os
+import time
+from fastapi.testclient import TestClient
+from tests.conftest import create_test_event
+
+# Tes 39
+def test_shutdown_drains_queue_before_exit(tmp_path):
+    """
+    Tes [Graceful Shutdown]: event yang masih di queue saat shutdown
+    di-commit dulu (drain) sebelum aplikasi berhenti, tanpa checkpoint.
+    """
+    os.environ["DATABASE_FILE"] = str(tmp_path / "drain.db")
+    os.environ["CONSUMER_BATCH_WAIT_MS"] = "50"
+    from src.main import app, checkpoint_path
+    try:
+        with TestClient(app) as client:
+            events = [create_test_event(f"d-{i}", "drain") for i in range(2000)]
+            assert client.post("/publish", json=events).status_code == 200
+
+        assert not os.path.exists(checkpoint_path())
+        with TestClient(app) as client:
+            assert client.get("/stats").json()["unique_processed"] == 2000
+    finally:
+        del os.environ["CONSUMER_BATCH_WAIT_MS"]
+        del os.environ["DATABASE_FILE"]
+
+# Tes 40
+def test_shutdown_checkpoints_leftovers_and_restores_on_startup(tmp_path):
+    """
+    Tes [Graceful Shutdown]: setelah queue ditutup, /publish mengembalikan
+    503; event yang tidak sempat di-commit sebelum batas drain disimpan ke
+    file checkpoint, lalu dimuat ulang dan di-commit saat startup berikutnya
+    sebelum traffic dilayani.
+    """
+    os.environ["DATABASE_FILE"] = str(tmp_path / "checkpoint.db")
+    os.environ["SHUTDOWN_DRAIN_TIMEOUT_S"] = "0.1"
+    from src.main import app, app_state, checkpoint_path
+    try:
+        events = [create_test_event(f"c-{i}", "ckpt") for i in range(3)]
+        with TestClient(app) as client:
+            # Consumer dihentikan agar event tertahan di queue sampai shutdown.
+            def stop_consumers():
+                for partition in app_state["partitions"]:
+                    partition.consumer_task.cancel()
+            client.portal.call(stop_consumers)
+
+            assert client.post("/publish", json=events + events[:1]).status_code == 200
+            time.sleep(0.1)
+            assert client.get("/stats").json()["queue_depth"] == 4
+
+            def close_queues():
+                for partition in app_state["partitions"]:
+                    partition.queue.close()
+            client.portal.call(close_queues)
+            res = client.post("/publish", json=[create_test_event("late", "ckpt")])
+            assert res.status_code == 503
+            assert res.headers["Retry-After"] == "1"
+
+        assert os.path.exists(checkpoint_path())
+
+        with TestClient(app) as client:
+            assert not os.path.exists(checkpoint_path())
+            stats = client.get("/stats").json()
+            assert stats["unique_processed"] == 3
+            assert stats["duplicate_dropped"] == 1
+            assert stats["queue_depth"] == 0
+            ids = [event["event_id"] for event in client.get("/events?topic=ckpt").json()["events"]]
+            assert sorted(ids) == ["c-0", "c-1", "c-2"]
+    finally:
+        del os.environ["SHUTDOWN_DRAIN_TIMEOUT_S"]
+        del os.environ["DATABASE_FILE"]
@@ -0,0 +1,168 @@
+import os
+import sqlite3
+import time
+import pytest
+from fastapi.testclient import TestClient
+from tests.conftest import create_test_event
+
+def all_rows(paths):
+    rows = []
+    for path in paths:
+        conn = sqlite3.connect(path)
+        rows.extend(conn.execute("SELECT topic, event_id, timestamp, source, payload, processed_at FROM events"))
+        conn.close()
+    return sorted(rows)
+
+# Tes 43
+def test_snapshot_export_import_roundtrip(monkeypatch, tmp_path):
+    """
+    Tes [Snapshot]: export dari aggregator yang sedang berjalan lalu import
+    ke node baru (jumlah partisi berbeda) menghasilkan isi events, key
+    dedup, dan statistik yang sama; import ulang tidak menambah apa pun.
+    """
+    from src.snapshot import export_snapshot, import_snapshot, shard_paths
+
+    monkeypatch.setenv("DATABASE_FILE", str(tmp_path / "src.db"))
+    monkeypatch.setenv("PAYLOAD_COMPRESSION", "zlib")
+    monkeypatch.setenv("PAYLOAD_COMPRESSION_MIN_BYTES", "64")
+    from src.main import app
+
+    events = [create_test_event(f"s-{i}", f"topic-{i % 3}") for i in range(500)]
+    events[0]["payload"] = {"big": "x" * 200}
+    with TestClient(app) as client:
+        assert client.post("/publish", json=events).status_code == 200
+        time.sleep(0.2)
+        # Baris key saja (isi sudah dihapus retensi) tetap ikut sebagai key dedup.
+        conn = sqlite3.connect(tmp_path / "src.db", timeout=5)
+        conn.execute("UPDATE events SET timestamp = NULL, source = NULL, payload = NULL WHERE event_id = 's-1'")
+        conn.commit()
+        conn.close()
+        manifest = export_snapshot(shard_paths(str(tmp_path / "src.db"), 1), str(tmp_path / "snap"), segment_rows=120)
+        assert client.post("/publish", json=[create_test_event("after-export", "topic-0")]).status_code == 200
+        time.sleep(0.1)
+        source_stats = client.get("/stats").json()
+
+    assert manifest["rows"] == 500
+    assert len(manifest["segments"]) == 5
+    assert sum(manifest["topics"].values()) == 500
+
+    # Event setelah snapshot dibuka tidak ikut.
+    conn = sqlite3.connect(tmp_path / "src.db")
+    conn.execute("DELETE FROM events WHERE event_id = 'after-export'")
+    conn.execute("UPDATE topic_stats SET unique_count = unique_count - 1 WHERE topic = 'topic-0'")
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setenv("PAYLOAD_COMPRESSION", "none")
+    target = shard_paths(str(tmp_path / "dst.db"), 2)
+    assert import_snapshot(str(tmp_path / "snap"), target, batch_rows=100) == (500, 500)
+    assert import_snapshot(str(tmp_path / "snap"), target) == (500, 0)
+
+    source = all_rows([tmp_path / "src.db"])
+    imported = all_rows(target)
+    assert [row[:4] + row[5:] for row in imported] == [row[:4] + row[5:] for row in source]
+    assert all(isinstance(row[4], str) for row in imported if row[2] is not None)
+
+    monkeypatch.setenv("DATABASE_FILE", str(tmp_path / "dst.db"))
+    monkeypatch.setenv("CONSUMER_PARTITIONS", "2")
+    with TestClient(app) as client:
+        stats = client.get("/stats").json()
+        assert stats["unique_processed"] == source_stats["unique_processed"] - 1
+        assert sorted(stats["topics"]) == ["topic-0", "topic-1", "topic-2"]
+        res = client.get("/events?topic=topic-0&limit=1").json()["events"][0]
+        assert res["event_id"] == "s-0" and res["payload"] == {"big": "x" * 200}
+
+        assert client.post("/publish", json=events[:10]).status_code == 200
+        time.sleep(0.1)
+        assert client.get("/stats").json()["duplicate_dropped"] == 10
+
+        # Rollup dibangun ulang hanya dari event yang masih punya isi (tanpa s-1).
+        agg = client.get("/aggregate?topic=topic-1&granularity=1h").json()
+        assert sum(bucket["count"] for bucket in agg["buckets"]) == len([e for e in events if e["topic"] == "topic-1"]) - 1
+
+# Tes 44
+def test_snapshot_rejects_corrupt_or_incomplete_segments(tmp_path):
+    """
+    Tes [Snapshot]: segmen yang rusak atau export tanpa manifest ditolak
+    sebelum ada baris yang ditulis ke database tujuan.
+    """
+    from src.main import init_db, process_batch_in_db
+    from src.records import QueuedEvent
+    from src.snapshot import MANIFEST, SnapshotError, export_snapshot, import_snapshot
+
+    conn = sqlite3.connect(tmp_path / "src.db")
+    init_db(conn)
+    process_batch_in_db(conn, [QueuedEvent("t", f"e-{i}", "2025-01-01T00:00:00Z", "s", b'{"i": 1}') for i in range(50)])
+    conn.close()
+
+    snap = tmp_path / "snap"
+    manifest = export_snapshot([str(tmp_path / "src.db")], str(snap), segment_rows=20)
+    with pytest.raises(SnapshotError):
+        export_snapshot([str(tmp_path / "src.db")], str(snap))
+
+    segment = snap / manifest["segments"][-1]["file"]
+    data = bytearray(segment.read_bytes())
+    data[-5] ^= 0xFF
+    segment.write_bytes(bytes(data))
+    with pytest.raises(SnapshotError):
+        import_snapshot(str(snap), [str(tmp_path / "dst.db")])
+    assert not os.path.exists(tmp_path / "dst.db")
+
+    os.remove(snap / MANIFEST)
+    with pytest.raises(SnapshotError):
+        import_snapshot(str(snap), [str(tmp_path / "dst.db")])
+
+# Tes 55
+def test_snapshot_export_consistent_across_shards(monkeypatch, tmp_path):
+    """
+    Tes [Snapshot]: writer yang terus meng-commit pasangan event (shard 0
+    lalu shard 1) tidak pernah terlihat "shard 1 lebih baru dari shard 0"
+    di hasil export, karena transaksi baca semua shard dibuka pada satu
+    titik waktu.
+    """
+    import threading
+    import src.snapshot
+    from src.main import init_db
+    from src.snapshot import export_snapshot, shard_paths
+
+    original_open = src.snapshot.open_snapshot
+
+    def slow_open(path):
+        conn = original_open(path)
+        time.sleep(0.02)  # perlebar jarak antar pembukaan transaksi baca
+        return conn
+
+    monkeypatch.setattr(src.snapshot, "open_snapshot", slow_open)
+
+    paths = shard_paths(str(tmp_path / "multi.db"), 2)
+    writers = []
+    for path in paths:
+        conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        conn.execute("PRAGMA journal_mode = WAL")
+        init_db(conn)
+        writers.append(conn)
+
+    stop = threading.Event()
+
+    def write_pairs():
+        i = 0
+        while not stop.is_set():
+            for topic, conn in zip(("left", "right"), writers):
+                with conn:
+                    conn.execute("INSERT INTO events (topic, event_id, timestamp, source, payload) "
+                                 "VALUES (?, ?, '2025-01-01T00:00:00Z', 's', '{}')", (topic, f"p-{i:07d}"))
+            i += 1
+
+    thread = threading.Thread(target=write_pairs)
+    thread.start()
+    try:
+        for attempt in range(5):
+            time.sleep(0.02)
+            topics = export_snapshot(paths, str(tmp_path / f"snap-{attempt}"))["topics"]
+            # Paling banyak satu pasangan yang baru tertulis di shard 0.
+            assert topics.get("left", 0) - topics.get("right", 0) in (0, 1)
+    finally:
+        stop.set()
+        thread.join()
+        for conn in writers:
+            conn.close()
@@ -0,0 +1,100 @@
+import gzip
+import json
+import time
+import pytest
+from fastapi.testclient import TestClient
+from tests.conftest import create_test_event
+
+# Tes 22
+def test_ndjson_stream_with_per_line_errors(test_client: TestClient):
+    """
+    Tes [Streaming Ingest]: NDJSON (gzip) diproses per baris; baris rusak
+    dilaporkan dengan nomor barisnya tanpa menggagalkan baris lain.
+    """
+    lines = [json.dumps(create_test_event(f"s-{i}")) for i in range(10)]
+    lines.insert(3, "{bukan json")
+    lines.insert(6, json.dumps({"topic": "test-topic", "event_id": "tanpa-field-lain"}))
+    lines.insert(8, "")
+    lines.append(lines[0]) # duplikat
+    body = gzip.compress(("\n".join(lines) + "\n").encode())
+
+    res = test_client.post(
+        "/publish/stream",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"},
+    )
+    assert res.status_code == 200
+    data = res.json()
+    assert data["accepted"] == 11
+    assert data["rejected"] == 2
+    assert [err["line"] for err in data["errors"]] == [4, 7]
+    assert "JSON tidak valid" in data["errors"][0]["error"]
+    assert "timestamp" in data["errors"][1]["error"]
+
+    time.sleep(0.2)
+    stats = test_client.get("/stats").json()
+    assert stats["unique_processed"] == 10
+    assert stats["duplicate_dropped"] == 1
+
+    res = test_client.post("/publish/stream", content=b"x", headers={"Content-Type": "text/csv"})
+    assert res.status_code == 415
+
+# Tes 23
+def test_msgpack_zstd_stream(test_client: TestClient):
+    """
+    Tes [Streaming Ingest]: body msgpack dengan Content-Encoding zstd
+    (dependensi opsional).
+    """
+    msgpack = pytest.importorskip("msgpack")
+    zstandard = pytest.importorskip("zstandard")
+
+    raw = b"".join(msgpack.packb(create_test_event(f"m-{i}")) for i in range(25))
+    res = test_client.post(
+        "/publish/stream",
+        content=zstandard.ZstdCompressor().compress(raw),
+        headers={"Content-Type": "application/msgpack", "Content-Encoding": "zstd"},
+    )
+    assert res.status_code == 200
+    assert res.json()["accepted"] == 25
+
+    time.sleep(0.2)
+    events = test_client.get("/events?topic=test-topic").json()["events"]
+    assert len(events) == 25
+
+# Tes 52
+def test_stream_limits_report_accepted(test_client: TestClient, monkeypatch):
+    """
+    Tes [Streaming Ingest]: baris yang terpotong di banyak chunk tetap
+    di-decode; body gzip yang mengembang melewati STREAM_MAX_BODY_BYTES,
+    baris yang terlalu panjang, dan record msgpack yang melebihi buffer
+    ditolak 413 dengan jumlah event yang sudah diterima.
+    """
+    from src.stream_ingest import NDJSONDecoder, StreamTooLarge
+
+    decoder = NDJSONDecoder(max_line_bytes=64)
+    line = json.dumps({"a": "x" * 40}).encode() + b"\n"
+    records = [item for i in range(0, len(line) * 3, 7) for item in decoder.feed((line * 3)[i:i + 7])]
+    assert [(no, rec) for no, rec, _ in records] == [(1, {"a": "x" * 40}), (2, {"a": "x" * 40}), (3, {"a": "x" * 40})]
+    with pytest.raises(StreamTooLarge):
+        for i in range(10):
+            list(decoder.feed(b"y" * 10))
+
+    monkeypatch.setenv("STREAM_INGEST_BATCH", "5")
+    monkeypatch.setenv("STREAM_MAX_BODY_BYTES", str(1024 * 1024))
+    good = "".join(json.dumps(create_test_event(f"z-{i}")) + "\n" for i in range(10)).encode()
+    bomb = gzip.compress(good + b"\n" * (64 * 1024 * 1024))  # ~64 KiB terkompresi
+    res = test_client.post("/publish/stream", content=bomb,
+                           headers={"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"})
+    assert res.status_code == 413
+    assert res.json()["detail"]["accepted"] == 10
+
+    monkeypatch.setenv("STREAM_MAX_BODY_BYTES", "0")
+    res = test_client.post("/publish/stream", content=good + b"x" * (2 * 1024 * 1024))
+    assert res.status_code == 413
+    assert res.json()["detail"]["accepted"] == 10
+
+    msgpack = pytest.importorskip("msgpack")
+    res = test_client.post("/publish/stream", content=msgpack.packb({"blob": "x" * (5 * 1024 * 1024)}),
+                           headers={"Content-Type": "application/msgpack"})
+    assert res.status_code == 413
+    assert res.json()["detail"]["accepted"] == 0
@@ -0,0 +1,67 @@
+import sqlite3
+import time
+from fastapi.testclient import TestClient
+from tests.conftest import create_test_event
+
+# Tes 26
+def test_topic_stats_updated_with_inserts(monkeypatch, tmp_path):
+    """
+    Tes [Startup O(1)]: consumer memperbarui topic_stats di transaksi yang sama
+    dengan insert (duplikat tidak dihitung), dan stats setelah restart dibaca
+    dari tabel tersebut.
+    """
+    db_path = tmp_path / "topic_stats.db"
+    monkeypatch.setenv("DATABASE_FILE", str(db_path))
+
+    from src.main import app
+
+    events = [create_test_event("a-1", "alpha"), create_test_event("a-2", "alpha"), create_test_event("b-1", "beta")]
+
+    with TestClient(app) as client:
+        assert client.post("/publish", json=events + [events[0]]).status_code == 200
+        time.sleep(0.1)
+
+    conn = sqlite3.connect(db_path)
+    rows = dict(conn.execute("SELECT topic, unique_count FROM topic_stats"))
+    first_seen, last_seen = conn.execute("SELECT first_seen, last_seen FROM topic_stats WHERE topic = 'alpha'").fetchone()
+    conn.close()
+    assert rows == {"alpha": 2, "beta": 1}
+    assert first_seen is not None and first_seen <= last_seen
+
+    with TestClient(app) as client:
+        stats = client.get("/stats").json()
+        assert stats["unique_processed"] == 3
+        assert sorted(stats["topics"]) == ["alpha", "beta"]
+
+        # Index dedup dimuat di background; duplikat tetap terdeteksi.
+        assert client.post("/publish", json=[events[2], create_test_event("b-2", "beta")]).status_code == 200
+        time.sleep(0.1)
+        stats = client.get("/stats").json()
+        assert stats["unique_processed"] == 4
+        assert stats["duplicate_dropped"] == 1
+
+# Tes 27
+def test_topic_stats_backfilled_from_existing_dedup_store(tmp_path):
+    """
+    Tes [Startup O(1)]: database lama tanpa topic_stats diisi sekali dari
+    dedup_store saat skema dibuka.
+    """
+    from src.main import init_db
+
+    conn = sqlite3.connect(tmp_path / "legacy.db")
+    conn.execute("CREATE TABLE dedup_store (topic TEXT, event_id TEXT, processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (topic, event_id))")
+    conn.executemany(
+        "INSERT INTO dedup_store (topic, event_id, processed_at) VALUES (?, ?, ?)",
+        [("alpha", "1", "2024-01-01 00:00:00"), ("alpha", "2", "2024-01-03 00:00:00"), ("beta", "1", "2024-01-02 00:00:00")]
+    )
+    conn.commit()
+
+    init_db(conn)
+    init_db(conn)  # backfill hanya sekali
+
+    rows = conn.execute("SELECT topic, unique_count, first_seen, last_seen FROM topic_stats ORDER BY topic").fetchall()
+    conn.close()
+    assert rows == [
+        ("alpha", 2, "2024-01-01 00:00:00", "2024-01-03 00:00:00"),
+        ("beta", 1, "2024-01-02 00:00:00", "2024-01-02 00:00:00"),
+    ]